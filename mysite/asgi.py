@@ -1,7 +1,10 @@
 """
-ASGI config for bookRev project.
+ASGI config for mysite project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server to get the benefit of reviews.async_views, e.g.
+
+    uvicorn mysite.asgi:application --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bookRev.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
 
 application = get_asgi_application()
@@ -63,6 +63,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Serves collected, hashed (and pre-compressed) static files when DEBUG is off
+    "reviews.staticfiles.StaticFilesMiddleware",
+    # Serves cached pages to anonymous visitors before the rest of the stack
+    # runs; outside compression, so pages are cached already compressed
+    "reviews.page_cache.PageCacheMiddleware",
+    # Compresses HTML/JSON/CSV responses, so it has to wrap everything below
+    "reviews.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -73,17 +80,38 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "mysite.urls"
 
+# Template profile
+# Templates are parsed once per process by the cached loader. With
+# TEMPLATE_PRECOMPILE every reviews template is compiled (and so validated)
+# at startup; TEMPLATE_TIMING logs each template's render time.
+TEMPLATE_PRECOMPILE = config("TEMPLATE_PRECOMPILE", default=not DEBUG, cast=bool)
+TEMPLATE_TIMING = config("TEMPLATE_TIMING", default=False, cast=bool)
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": (
+            "reviews.template_tools.TimedDjangoTemplates"
+            if TEMPLATE_TIMING
+            else "django.template.backends.django.DjangoTemplates"
+        ),
         "DIRS": [os.path.join(BASE_DIR, "templates")],
-        "APP_DIRS": True,
+        # APP_DIRS is replaced by the app_directories loader below
+        "APP_DIRS": False,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
         },
     },
 ]
@@ -102,6 +130,53 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. django.core.cache.backends.redis.RedisCache) in production so
+# page-cache purges reach every worker (checked by reviews.W002).
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default="bookrev"),
+    }
+}
+
+# Full-page cache for anonymous visitors (reviews.page_cache). Off by default
+# outside DEBUG unless the cache is shared: with one local-memory cache per
+# worker, purges never reach the other workers and they serve stale pages
+# until PAGE_CACHE_TIMEOUT. Forcing it on anyway is reported by reviews.W002.
+PAGE_CACHE_ENABLED = config(
+    "PAGE_CACHE_ENABLED",
+    default=DEBUG or not CACHES["default"]["BACKEND"].endswith("LocMemCache"),
+    cast=bool,
+)
+if not PAGE_CACHE_ENABLED:
+    MIDDLEWARE.remove("reviews.page_cache.PageCacheMiddleware")
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=600, cast=int)
+PAGE_CACHE_IGNORED_PARAMS = ["fbclid", "gclid"]
+
+# Session profile. "cached_db" reads sessions from the cache and writes
+# through to the database; "signed_cookies" keeps them in the browser, so
+# there is no session storage at all. Either way anonymous visitors never
+# touch the session table: they don't get a session until something is
+# stored in it, and flash messages travel in their own cookie.
+SESSION_PROFILE = config("SESSION_PROFILE", default="cached_db")
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}[SESSION_PROFILE]
+MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Change feed (/api/changes/): besides staff sessions, requests sending
+# "Authorization: Bearer <token>" with one of these tokens may read it
+CHANGE_FEED_TOKENS = config("CHANGE_FEED_TOKENS", default="", cast=Csv())
+
+# Response compression (reviews.compression); content types are in that module
+COMPRESSION_MIN_SIZE = config("COMPRESSION_MIN_SIZE", default=512, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,7 +217,18 @@ STATIC_URL = "static/"
 
 # Define STATIC_ROOT (required for collectstatic)
 # This is the ABSOLUTE path to the directory where all static files will be collected.
-STATIC_ROOT = [os.path.join(BASE_DIR, "staticfiles")]
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+
+# collectstatic minifies, fingerprints (content hash in the file name) and
+# pre-compresses every asset; see reviews/staticfiles.py.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "reviews.staticfiles.HashedCompressedStaticFilesStorage",
+    },
+}
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -172,3 +258,12 @@ LOGGING = {
         },
     },
 }
+
+# Background jobs (reviews.jobs / manage.py run_jobs)
+# Maximum number of jobs from each queue that may run at the same time.
+REVIEWS_JOB_QUEUE_LIMITS = {
+    "data": 1,  # Imports and exports
+    "bulk": 2,  # Bulk admin actions
+}
+# Seconds a running job stays leased to its worker without a heartbeat
+REVIEWS_JOB_LEASE_SECONDS = 300
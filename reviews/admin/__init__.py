@@ -1,7 +1,10 @@
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
 
-from reviews.models import Book, Review, Contributor, BookContributor, Publisher
+from reviews.models import (
+    Book, Review, Contributor, BookContributor, Publisher, Job,
+    PublisherMonthlyRollup, ContributorMonthlyRollup,
+)
 
 from .site import admin_site
 from .book import BookAdmin
@@ -9,6 +12,8 @@ from .publisher import PublisherAdmin
 from .contributor import ContributorAdmin
 from .review import ReviewAdmin
 from .book_contributor import BookContributorAdmin
+from .job import JobAdmin
+from .rollup import PublisherMonthlyRollupAdmin, ContributorMonthlyRollupAdmin
 
 
 # Register models to the custom admin site
@@ -18,6 +23,9 @@ admin_site.register(Contributor, ContributorAdmin)
 admin_site.register(Review, ReviewAdmin)
 admin_site.register(BookContributor, BookContributorAdmin)
 admin_site.register(Publisher, PublisherAdmin)
+admin_site.register(Job, JobAdmin)
+admin_site.register(PublisherMonthlyRollup, PublisherMonthlyRollupAdmin)
+admin_site.register(ContributorMonthlyRollup, ContributorMonthlyRollupAdmin)
 
 # Register Django's default auth models
 admin_site.register(User, UserAdmin)
@@ -0,0 +1,69 @@
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.urls import reverse
+from django.utils.html import format_html
+
+from reviews import bulk
+from reviews.jobs import enqueue
+from reviews.models import Publisher
+
+
+class PublisherActionForm(ActionForm):
+    """Action bar form with the extra input needed by reassign_publisher."""
+
+    # A plain id input: a <select> of every publisher would defeat the point
+    publisher_id = forms.IntegerField(required=False, min_value=1, label="Target publisher ID")
+
+
+def queue_bulk_job(modeladmin, request, queryset, task, **params):
+    """
+    Queue `task` for the selected rows and tell the user where to follow it.
+
+    With "select all" the changelist's filter querystring is queued rather
+    than its primary keys, and the worker applies it (see reviews.bulk).
+    """
+    if request.POST.get("select_across") == "1":
+        params["query"] = bulk.changelist_selection(request, queryset)
+        count = queryset.count()
+    else:
+        params["ids"] = list(queryset.order_by().values_list("pk", flat=True))
+        count = len(params["ids"])
+    job = enqueue(task, created_by=request.user, queue="bulk", **params)
+    url = reverse(f"{modeladmin.admin_site.name}:reviews_job_change", args=[job.pk])
+    modeladmin.message_user(
+        request,
+        format_html('Queued background job <a href="{}">#{}</a> for {} rows.', url, job.pk, count),
+    )
+    return job
+
+
+@admin.action(description="Delete selected reviews in the background", permissions=["delete"])
+def delete_reviews_in_background(modeladmin, request, queryset):
+    queue_bulk_job(modeladmin, request, queryset, bulk.delete_reviews)
+
+
+@admin.action(description="Delete selected books in the background", permissions=["delete"])
+def delete_books_in_background(modeladmin, request, queryset):
+    queue_bulk_job(modeladmin, request, queryset, bulk.delete_books)
+
+
+@admin.action(description="Delete selected publishers in the background", permissions=["delete"])
+def delete_publishers_in_background(modeladmin, request, queryset):
+    queue_bulk_job(modeladmin, request, queryset, bulk.delete_publishers)
+
+
+@admin.action(description="Recompute ratings of selected books in the background", permissions=["change"])
+def recompute_ratings(modeladmin, request, queryset):
+    queue_bulk_job(modeladmin, request, queryset, bulk.recompute_ratings)
+
+
+@admin.action(description="Reassign selected books to the target publisher", permissions=["change"])
+def reassign_publisher(modeladmin, request, queryset):
+    form = modeladmin.action_form(request.POST, auto_id=None)
+    form.fields["action"].choices = modeladmin.get_action_choices(request)
+    publisher_id = form.cleaned_data["publisher_id"] if form.is_valid() else None
+    if publisher_id is None or not Publisher.objects.filter(pk=publisher_id).exists():
+        modeladmin.message_user(request, "Enter a valid target publisher ID.", messages.ERROR)
+        return
+    queue_bulk_job(modeladmin, request, queryset, bulk.reassign_publisher, publisher_id=publisher_id)
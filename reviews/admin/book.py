@@ -1,11 +1,42 @@
 from django.contrib import admin
 
-from reviews.models import Book
+from reviews.models import Book, BookContributor
 
+from .actions import PublisherActionForm, delete_books_in_background, reassign_publisher, recompute_ratings
+from .base import LargeTableAdmin
 
-class BookAdmin(admin.ModelAdmin):
+
+class BookContributorInline(admin.TabularInline):
+    model = BookContributor
+    extra = 0
+    # Search-backed select instead of a <select> listing every contributor
+    autocomplete_fields = ("contributor",)
+
+
+class BookAdmin(LargeTableAdmin):
     ## These variables represent components that are displayed under the book model in the admin page
     # date_hierarchy = "publication_date"
-    list_display = ("title", "isbn")
-    list_filter = ("publisher", "publication_date")
-    search_fields = ("title", "isbn", "publisher__name")
+    list_display = ("title", "isbn", "publisher", "average_rating", "review_count")
+    list_select_related = ("publisher",)
+    # No publisher filter: its sidebar lists every publisher on every page.
+    # Search by publisher name instead; ?publisher__id__exact=<pk> links work.
+    list_filter = ("publication_date",)
+    # Prefix (^) and exact (=) lookups can use the title/isbn/name indexes,
+    # unlike the default icontains which scans the whole table.
+    search_fields = ("^title", "=isbn", "^publisher__name")
+    autocomplete_fields = ("publisher",)
+    inlines = (BookContributorInline,)
+    action_form = PublisherActionForm
+    actions = (delete_books_in_background, reassign_publisher, recompute_ratings)
+
+    def get_queryset(self, request):
+        # Ratings for the whole page come from the changelist query itself
+        return super().get_queryset(request).with_ratings()
+
+    @admin.display(description="Rating", ordering="avg_rating")
+    def average_rating(self, obj):
+        return None if obj.avg_rating is None else round(obj.avg_rating, 1)
+
+    @admin.display(description="Reviews", ordering="review_count")
+    def review_count(self, obj):
+        return obj.review_count
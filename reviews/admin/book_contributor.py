@@ -1,6 +1,9 @@
-from django.contrib import admin
-from reviews.models import BookContributor
+from .base import LargeTableAdmin
 
 
-class BookContributorAdmin(admin.ModelAdmin):
-    pass  # Add customizations as needed
+class BookContributorAdmin(LargeTableAdmin):
+    list_display = ("book", "contributor", "role")
+    # BookContributor.__str__ reads both the book and the contributor
+    list_select_related = ("book", "contributor")
+    list_filter = ("role",)
+    autocomplete_fields = ("book", "contributor")
@@ -1,6 +1,6 @@
-from django.contrib import admin
-from reviews.models import Contributor
+from .base import LargeTableAdmin
 
 
-class ContributorAdmin(admin.ModelAdmin):
-    pass  # Add customizations as needed
+class ContributorAdmin(LargeTableAdmin):
+    list_display = ("last_names", "first_names", "email")
+    search_fields = ("^last_names", "^first_names")
@@ -0,0 +1,70 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.auth import get_permission_codename
+from django.db.models import F, Q
+from django.utils import timezone
+
+from reviews.jobs import expired_jobs
+from reviews.models import Job
+from reviews.tasks import ADMIN_TASKS
+
+
+class JobForm(forms.ModelForm):
+    """Add form limited to the tasks that are safe to start from the admin."""
+
+    task = forms.ChoiceField(choices=[(path, label) for path, (label, _) in ADMIN_TASKS.items()])
+
+    class Meta:
+        model = Job
+        fields = ("task", "params", "priority", "max_attempts")
+
+
+@admin.action(description="Requeue selected jobs", permissions=("requeue",))
+def requeue_jobs(modeladmin, request, queryset):
+    # Running jobs are left alone while their worker keeps the lease alive
+    updated = queryset.filter(
+        ~Q(status=Job.Status.RUNNING) | Q(pk__in=expired_jobs().values("pk"))
+    ).update(
+        status=Job.Status.PENDING,
+        max_attempts=F("attempts") + 1,
+        locked_until=None,
+        run_after=timezone.now(),
+        progress=0,
+    )
+    modeladmin.message_user(request, f"Requeued {updated} jobs.")
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Background jobs: queue admin tasks and follow their progress."""
+
+    form = JobForm
+    list_display = (
+        "pk", "task", "queue", "priority", "status", "attempts",
+        "progress", "total", "created_by", "date_created", "date_finished",
+    )
+    list_filter = ("status", "queue")
+    list_select_related = ("created_by",)
+    actions = (requeue_jobs,)
+    readonly_fields = (
+        "task", "params", "queue", "priority", "status", "attempts", "max_attempts",
+        "run_after", "locked_until", "progress", "total", "message",
+        "created_by", "date_created", "date_started", "date_finished",
+    )
+
+    def get_readonly_fields(self, request, obj=None):
+        # Only the add form is editable; existing jobs are a record of work
+        return self.readonly_fields if obj else ()
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_requeue_permission(self, request):
+        # Job pages are read-only for everyone (see above); requeueing is
+        # for users with the model's change permission
+        opts = self.opts
+        return request.user.has_perm(f"{opts.app_label}.{get_permission_codename('change', opts)}")
+
+    def save_model(self, request, obj, form, change):
+        obj.queue = ADMIN_TASKS[obj.task][1]
+        obj.created_by = request.user
+        super().save_model(request, obj, form, change)
@@ -1,6 +1,8 @@
-from django.contrib import admin
-from reviews.models import Publisher
+from .actions import delete_publishers_in_background
+from .base import LargeTableAdmin
 
 
-class PublisherAdmin(admin.ModelAdmin):
-    pass  # Add customizations as needed
+class PublisherAdmin(LargeTableAdmin):
+    list_display = ("name", "website", "email")
+    search_fields = ("^name",)
+    actions = (delete_publishers_in_background,)
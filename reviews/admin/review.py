@@ -1,7 +1,17 @@
-from django.contrib import admin
+from .actions import delete_reviews_in_background
+from .base import LargeTableAdmin
 
 # from reviews.models import Review
 
 
-class ReviewAdmin(admin.ModelAdmin):
-    list_display = ("book", "date_created", "date_edited")
+class ReviewAdmin(LargeTableAdmin):
+    list_display = ("book", "creator", "rating", "date_created", "date_edited")
+    # Review.__str__ and the "book" column need the book and creator rows,
+    # so join them in the changelist query instead of one query per row.
+    list_select_related = ("book", "creator")
+    list_filter = ("rating",)
+    search_fields = ("^book__title", "=creator__username")
+    # Book and User can have hundreds of thousands of rows; the autocomplete
+    # widget fetches a page of matches from the search endpoint on demand.
+    autocomplete_fields = ("book", "creator")
+    actions = (delete_reviews_in_background,)
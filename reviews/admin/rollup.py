@@ -0,0 +1,36 @@
+from django.contrib import admin
+
+
+class RollupAdmin(admin.ModelAdmin):
+    """Read-only reporting dashboard; the rows are written by `manage.py build_rollups`."""
+
+    list_display_links = None
+    list_filter = ("month",)
+    date_hierarchy = "month"
+    ordering = ("-month", "-review_count")
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Average rating")
+    def average(self, obj):
+        return None if obj.average_rating is None else round(obj.average_rating, 2)
+
+
+class PublisherMonthlyRollupAdmin(RollupAdmin):
+    list_display = ("month", "publisher", "review_count", "average")
+    list_select_related = ("publisher",)
+    search_fields = ("^publisher__name",)
+
+
+class ContributorMonthlyRollupAdmin(RollupAdmin):
+    list_display = ("month", "contributor", "review_count", "average")
+    list_select_related = ("contributor",)
+    search_fields = ("^contributor__last_names",)
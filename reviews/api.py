@@ -0,0 +1,270 @@
+"""
+Read-only JSON API for books, reviews and search.
+
+Responses are built straight from `values()` rows, and only the columns
+needed for the requested `?fields=` are selected. Lists use cursor
+pagination on the primary key: pass the `next_cursor` of one page as
+`?cursor=` to get the next one. /api/changes/ pages through the change
+outbox (reviews.outbox) the same way, by event sequence number. Its
+payloads carry e-mail addresses and user names, so it is only served to
+staff sessions and to `Authorization: Bearer <token>` requests with one
+of settings.CHANGE_FEED_TOKENS.
+"""
+import hmac
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_GET
+
+from . import conditional, outbox
+from .forms.forms import SearchForm
+from .models import STAR_FIELDS, Book, BookContributor, Review
+from .search import search_filter
+from .utils import rating_stats
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Feed consumers want large pages: events are small and read in seq order
+MAX_CHANGES_LIMIT = 1000
+
+# API field -> columns selected with values()
+BOOK_COLUMNS = {
+    "id": ("pk",),
+    "title": ("title",),
+    "isbn": ("isbn",),
+    "publication_date": ("publication_date",),
+    "publisher": ("publisher_id", "publisher__name"),
+    "rating": ("avg_rating", "review_count"),
+    "rating_stats": tuple(STAR_FIELDS.values()),
+    "contributors": (),  # Loaded with one extra query per page
+}
+DEFAULT_BOOK_FIELDS = ("id", "title", "isbn", "publication_date", "publisher")
+
+REVIEW_COLUMNS = {
+    "id": ("pk",),
+    "book": ("book_id",),
+    "rating": ("rating",),
+    "content": ("content",),
+    "creator": ("creator__username",),
+    "date_created": ("date_created",),
+    "date_edited": ("date_edited",),
+}
+DEFAULT_REVIEW_FIELDS = ("id", "rating", "content", "creator", "date_created")
+
+
+class ApiError(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _feed_client_allowed(request):
+    if request.user.is_active and request.user.is_staff:
+        return True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    return any(
+        hmac.compare_digest(token.encode(), allowed.encode())
+        for allowed in getattr(settings, "CHANGE_FEED_TOKENS", ()) if allowed
+    )
+
+
+def _parse_fields(request, columns, default):
+    fields = request.GET.get("fields")
+    if not fields:
+        return list(default)
+    fields = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(fields) - set(columns))
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(columns)}.")
+    return fields
+
+
+def _parse_int(request, name, default=None):
+    value = request.GET.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"'{name}' must be an integer.")
+
+
+def _parse_limit(request):
+    return max(1, min(_parse_int(request, "limit", DEFAULT_LIMIT), MAX_LIMIT))
+
+
+def _select(queryset, fields, columns):
+    """Restrict `queryset` to the columns behind `fields` (always including pk)."""
+    selected = {"pk"}
+    for field in fields:
+        selected.update(columns[field])
+    return queryset.values(*selected)
+
+
+def _paginate(queryset, request, descending=False):
+    """Return (rows, next_cursor) for one page of a pk-ordered queryset."""
+    cursor = _parse_int(request, "cursor")
+    limit = _parse_limit(request)
+    if cursor is not None:
+        queryset = queryset.filter(**{"pk__lt" if descending else "pk__gt": cursor})
+    rows = list(queryset.order_by("-pk" if descending else "pk")[:limit + 1])
+    next_cursor = rows[limit - 1]["pk"] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _contributors_by_book(book_ids):
+    rows = (
+        BookContributor.objects
+        .filter(book_id__in=book_ids)
+        .values("book_id", "role", "contributor_id",
+                "contributor__first_names", "contributor__last_names")
+    )
+    contributors = {}
+    for row in rows:
+        contributors.setdefault(row["book_id"], []).append({
+            "id": row["contributor_id"],
+            "name": f'{row["contributor__first_names"]} {row["contributor__last_names"]}',
+            "role": row["role"],
+        })
+    return contributors
+
+
+def _book_queryset(fields, queryset=None):
+    queryset = Book.objects.all() if queryset is None else queryset
+    if "rating" in fields:
+        queryset = queryset.with_ratings()
+    return _select(queryset, fields, BOOK_COLUMNS)
+
+
+def _serialize_books(rows, fields):
+    contributors = _contributors_by_book([row["pk"] for row in rows]) if "contributors" in fields else {}
+    items = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == "id":
+                item["id"] = row["pk"]
+            elif field == "publisher":
+                item["publisher"] = {"id": row["publisher_id"], "name": row["publisher__name"]}
+            elif field == "rating":
+                item["rating"] = {"average": row["avg_rating"], "count": row["review_count"]}
+            elif field == "rating_stats":
+                histogram = {stars: row[name] for stars, name in STAR_FIELDS.items()}
+                item["rating_stats"] = {"histogram": histogram, **(rating_stats(histogram) or {})}
+            elif field == "contributors":
+                item["contributors"] = contributors.get(row["pk"], [])
+            else:
+                item[field] = row[field]
+        items.append(item)
+    return items
+
+
+def _serialize_reviews(rows, fields):
+    return [
+        {
+            field: row[REVIEW_COLUMNS[field][0]]
+            for field in fields
+        }
+        for row in rows
+    ]
+
+
+def _parse_ids(request):
+    try:
+        ids = [int(pk) for pk in request.GET["ids"].split(",") if pk.strip()]
+    except ValueError:
+        raise ApiError("'ids' must be a comma separated list of integers.")
+    if len(ids) > MAX_LIMIT:
+        raise ApiError(f"At most {MAX_LIMIT} ids can be looked up at once.")
+    return ids
+
+
+@require_GET
+@condition(etag_func=conditional.api_book_list_etag, last_modified_func=conditional.api_book_list_last_modified)
+def book_list(request):
+    """
+    GET /api/books/?fields=title,rating&cursor=&limit=
+    GET /api/books/?ids=1,2,3 for a bulk lookup (no pagination).
+    """
+    try:
+        fields = _parse_fields(request, BOOK_COLUMNS, DEFAULT_BOOK_FIELDS)
+        if "ids" in request.GET:
+            ids = _parse_ids(request)
+            rows = list(_book_queryset(fields, Book.objects.filter(pk__in=ids)).order_by("pk"))
+            return JsonResponse({"results": _serialize_books(rows, fields)})
+        rows, next_cursor = _paginate(_book_queryset(fields), request)
+    except ApiError as e:
+        return _error(str(e))
+    return JsonResponse({"results": _serialize_books(rows, fields), "next_cursor": next_cursor})
+
+
+@require_GET
+@condition(etag_func=conditional.api_book_reviews_etag, last_modified_func=conditional.api_book_reviews_last_modified)
+def book_reviews(request, pk):
+    """GET /api/books/<pk>/reviews/?fields=&cursor=&limit= (newest first)."""
+    if not Book.objects.filter(pk=pk).exists():
+        return _error("Book not found.", status=404)
+    try:
+        fields = _parse_fields(request, REVIEW_COLUMNS, DEFAULT_REVIEW_FIELDS)
+        queryset = _select(Review.objects.filter(book_id=pk), fields, REVIEW_COLUMNS)
+        rows, next_cursor = _paginate(queryset, request, descending=True)
+    except ApiError as e:
+        return _error(str(e))
+    return JsonResponse({"results": _serialize_reviews(rows, fields), "next_cursor": next_cursor})
+
+
+@require_GET
+def book_search(request):
+    """GET /api/search/?search=...&search_book_by=title&search_book_by=isbn&fields=..."""
+    form = SearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    try:
+        fields = _parse_fields(request, BOOK_COLUMNS, DEFAULT_BOOK_FIELDS)
+        matches = Book.objects.filter(
+            search_filter(form.cleaned_data["search"].strip(), form.cleaned_data["search_book_by"])
+        )
+        # Filter through a pk subquery so contributor joins can't duplicate
+        # rows or inflate the rating aggregate.
+        queryset = _book_queryset(fields, Book.objects.filter(pk__in=matches.values("pk")))
+        rows, next_cursor = _paginate(queryset, request)
+    except ApiError as e:
+        return _error(str(e))
+    return JsonResponse({"results": _serialize_books(rows, fields), "next_cursor": next_cursor})
+
+
+@require_GET
+@never_cache
+def changes(request):
+    """
+    GET /api/changes/?cursor=<seq>&limit=&models=book,review (oldest first).
+
+    `next_cursor` is always set: pass it back to poll for later changes.
+    `has_more` says whether another page is ready right now.
+    """
+    if not _feed_client_allowed(request):
+        response = _error("Authentication required.", status=401)
+        response["WWW-Authenticate"] = 'Bearer realm="changes"'
+        return response
+    try:
+        cursor = max(_parse_int(request, "cursor", 0), 0)
+        limit = max(1, min(_parse_int(request, "limit", DEFAULT_LIMIT), MAX_CHANGES_LIMIT))
+        models = [name.strip() for name in request.GET.get("models", "").split(",") if name.strip()]
+        unknown = sorted(set(models) - set(outbox.MODEL_NAMES))
+        if unknown:
+            raise ApiError(f"Unknown models: {', '.join(unknown)}. Choose from: {', '.join(outbox.MODEL_NAMES)}.")
+    except ApiError as e:
+        return _error(str(e))
+    events = outbox.changes_after(cursor, limit + 1, models)
+    has_more = len(events) > limit
+    events = events[:limit]
+    return JsonResponse({
+        "results": [outbox.serialize(event) for event in events],
+        "next_cursor": events[-1].seq if events else cursor,
+        "has_more": has_more,
+    })
@@ -1,10 +1,25 @@
 from django.apps import AppConfig
+from django.conf import settings
 from django.contrib.admin.apps import AdminConfig
 
 
 class ReviewsConfig(AppConfig):
     name = "reviews"
 
+    def ready(self):
+        # Connect the model signal handlers and register system checks
+        from . import checks, signals  # noqa: F401
+
+        if getattr(settings, "TEMPLATE_PRECOMPILE", False):
+            # Parse every template now so requests never hit the filesystem
+            # or the template parser; a broken template stops startup.
+            from django.core.exceptions import ImproperlyConfigured
+            from .template_tools import precompile_templates
+
+            errors = precompile_templates()
+            if errors:
+                raise ImproperlyConfigured(f"Invalid templates: {errors}")
+
 
 class ReviewsAdminConfig(AdminConfig):
     default_site = "reviews.admin.BookRevAdminSite"
@@ -0,0 +1,115 @@
+"""
+Async versions of the read-heavy views, meant to be served by an ASGI server
+(see mysite/asgi.py).
+
+Every row a template needs is fetched before rendering, so no lazy ORM
+access happens inside the event loop. The queries are awaited one after
+another: Django's async ORM runs them through thread-sensitive
+sync_to_async(), on one shared thread, so gathering them would not make
+them overlap. What these views gain is that the event loop serves other
+requests while a query runs.
+"""
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+
+from reviews.forms.forms import SearchForm
+from .models import Book, Review
+from .recommendations import similar_books
+from .search import search_books
+
+AUTOCOMPLETE_LIMIT = 10
+
+
+async def _load_user(request):
+    # The auth context processor reads request.user; resolve it up front so
+    # the template doesn't query the session and user tables synchronously.
+    request.user = await request.auser()
+
+
+async def _fetch(queryset):
+    return [obj async for obj in queryset]
+
+
+async def book_list(request):
+    """Async version of views.book_list."""
+    books = await _fetch(Book.objects.select_related('publisher').with_ratings())
+    await _load_user(request)
+
+    book_list = [
+        {
+            "book": book,
+            "book_pub": book.publisher,
+            "book_pub_date": book.publication_date,
+            # Same rounding as utils.average_rating
+            "book_rating": round(book.avg_rating) if book.review_count else None,
+            "number_of_reviews": book.review_count,
+        }
+        for book in books
+    ]
+    context = {"book_list": book_list, "title": "List of all books", "count": len(book_list)}
+    return render(request, "reviews/books.html", context)
+
+
+async def book_detail(request, pk):
+    """Async version of views.book_detail."""
+    book = await Book.objects.select_related('publisher').with_ratings().filter(pk=pk).afirst()
+    if book is None:
+        raise Http404("No Book matches the given query.")
+    reviews = await _fetch(Review.objects.filter(book_id=pk))
+    similar = await _fetch(similar_books(pk))
+    await _load_user(request)
+
+    context = {
+        "book": book,
+        "title": f"Details of {book.title}",
+        "book_rating": round(book.avg_rating) if book.review_count else None,
+        "rating_stats": book.rating_stats(),
+        "rating_histogram": sorted(book.rating_histogram.items(), reverse=True),
+        "reviews": reviews or None,
+        "similar_books": similar,
+    }
+    return render(request, "reviews/book-detail.html", context)
+
+
+async def search_result(request):
+    """Async version of views.search_result."""
+    title = "Search results for books"
+    search_term = ""
+    form = SearchForm(request.GET)
+    books_list = []
+    await _load_user(request)
+
+    if form.is_valid():
+        data = form.cleaned_data
+        query = data.get('search', '').strip()
+        search_fields = data.get('search_book_by', [])
+
+        if query and search_fields:
+            search_term = query
+            books_list = await _fetch(search_books(query, search_fields))
+        else:
+            search_term = "Please enter a search term and select search criteria"
+
+    context = {
+        "title": title,
+        'search_term': search_term,
+        "form": form,
+        "books_results": books_list
+    }
+    return render(request, "reviews/book-search_form.html", context)
+
+
+async def book_autocomplete(request):
+    """Return up to AUTOCOMPLETE_LIMIT books whose title starts with ?term=."""
+    term = request.GET.get('term', '').strip()
+    results = []
+    if term:
+        # Prefix match so the title index can be used
+        books = (
+            Book.objects
+            .filter(title__istartswith=term)
+            .order_by('title')
+            .values('pk', 'title')[:AUTOCOMPLETE_LIMIT]
+        )
+        results = [{"id": book['pk'], "text": book['title']} async for book in books]
+    return JsonResponse({"results": results})
@@ -0,0 +1,186 @@
+"""
+Set-based bulk operations run as background jobs.
+
+Each function takes the Job as its first argument (see `reviews.jobs`) and
+works through the selected rows in chunks of primary keys. The selection is
+either the list of `ids` ticked in the admin or, when "select all" was
+used on a large changelist, the changelist's `query`: its filter
+querystring and the highest pk it matched when the job was queued. The
+worker rebuilds the changelist queryset from them with the model admin
+(see changelist_queryset()) and runs it one chunk at a time, instead of
+the admin copying every pk into the job. Rows added after the job was
+queued are left alone. Every chunk is a handful
+of DELETE/UPDATE statements in its own transaction, so no model instances
+are loaded, no per-object signals are sent and progress is visible while the
+job runs. Because signals are skipped, each operation marks the affected
+books as edited, recounts their star ratings, records its changes in the
+outbox (reviews.outbox) and purges their cached pages itself.
+"""
+from django.apps import apps
+from django.db import models, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from .models import Book, ChangeEvent, Publisher, Review
+from .outbox import PAYLOAD_FIELDS, record_queryset
+from .page_cache import purge_keys
+
+CHUNK_SIZE = 500
+
+
+def changelist_selection(request, queryset):
+    """The job params form of a changelist's "select all": its querystring and highest pk."""
+    return {
+        "model": queryset.model._meta.label,
+        "querystring": request.GET.urlencode(),
+        "pk_max": queryset.aggregate(pk_max=models.Max("pk"))["pk_max"],
+    }
+
+
+def changelist_queryset(query, user):
+    """
+    The rows of a changelist_selection(), filtered again by the model admin
+    for `user` (the job's creator), as the changelist showed them.
+    """
+    from .admin.site import admin_site
+
+    if query["pk_max"] is None:
+        return apps.get_model(query["model"])._default_manager.none()
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(query["querystring"])
+    request.user = user
+    modeladmin = admin_site._registry[apps.get_model(query["model"])]
+    queryset = modeladmin.get_changelist_instance(request).get_queryset(request)
+    return queryset.filter(pk__lte=query["pk_max"])
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _query_chunks(queryset, size=CHUNK_SIZE):
+    """pks of `queryset` in pk order, running the query again for every chunk."""
+    queryset = queryset.order_by("pk")
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = list(page.values_list("pk", flat=True)[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def _raw_delete(queryset):
+    """
+    Delete `queryset` and, child tables first, every row that cascades from it.
+
+    QuerySet.delete() collects every row (and its cascades) into memory to
+    send signals. This issues one DELETE ... WHERE per table instead, walking
+    the model's reverse relations so tables added later (leaderboards,
+    rollups, similarities, ...) are covered without listing them here.
+    """
+    model = queryset.model
+    for relation in model._meta.get_fields(include_hidden=True):
+        # Reverse foreign keys, including related_name="+" ones; many-to-many
+        # relations are handled by the through model's own foreign keys
+        if not (relation.auto_created and not relation.concrete
+                and (relation.one_to_many or relation.one_to_one)):
+            continue
+        children = relation.related_model._base_manager.filter(**{f"{relation.field.name}__in": queryset})
+        if relation.on_delete is models.CASCADE:
+            _raw_delete(children)
+        elif relation.on_delete is models.SET_NULL:
+            children.update(**{relation.field.name: None})
+    if model in PAYLOAD_FIELDS:
+        record_queryset(queryset, ChangeEvent.Operation.DELETE)
+    return queryset._raw_delete(queryset.db)
+
+
+def _run_in_chunks(job, ids, query, operation):
+    if query is None:
+        chunks, total = _chunks(ids), len(ids)
+    else:
+        queryset = changelist_queryset(query, job.created_by)
+        chunks, total = _query_chunks(queryset), queryset.count()
+    job.set_progress(0, total=total)
+    done = affected = 0
+    for chunk in chunks:
+        with transaction.atomic():
+            affected += operation(chunk)
+        done += len(chunk)
+        job.set_progress(done)
+    return affected
+
+
+def _purge_on_commit(*keys):
+    transaction.on_commit(lambda: purge_keys(*keys, "list:books"))
+
+
+def _delete_review_rows(reviews):
+    book_ids = list(reviews.order_by().values_list("book_id", flat=True).distinct())
+    Book.objects.filter(pk__in=book_ids).update(date_edited=timezone.now())
+    _purge_on_commit(*(f"book:{pk}" for pk in book_ids))
+    deleted = _raw_delete(reviews)
+    Book.objects.filter(pk__in=book_ids).rebuild_rating_counts()
+    return deleted
+
+
+def delete_reviews(job, ids=None, query=None):
+    """Delete the given reviews."""
+    deleted = _run_in_chunks(
+        job, ids, query, lambda chunk: _delete_review_rows(Review.objects.filter(pk__in=chunk))
+    )
+    return f"Deleted {deleted} reviews."
+
+
+def delete_books(job, ids=None, query=None):
+    """Delete the given books along with their reviews and contributor links."""
+
+    def operation(chunk):
+        _purge_on_commit(*(f"book:{pk}" for pk in chunk))
+        return _raw_delete(Book.objects.filter(pk__in=chunk))
+
+    deleted = _run_in_chunks(job, ids, query, operation)
+    return f"Deleted {deleted} books."
+
+
+def delete_publishers(job, ids=None, query=None):
+    """Delete the given publishers and everything that cascades from them."""
+
+    def operation(chunk):
+        _purge_on_commit(*(f"publisher:{pk}" for pk in chunk))
+        return _raw_delete(Publisher.objects.filter(pk__in=chunk))
+
+    deleted = _run_in_chunks(job, ids, query, operation)
+    return f"Deleted {deleted} publishers."
+
+
+def recompute_ratings(job, ids=None, query=None):
+    """Recount the star rating counters of the given books from their reviews."""
+
+    def operation(chunk):
+        stale = Book.objects.filter(pk__in=chunk).rebuild_rating_counts()
+        if stale:
+            _purge_on_commit(*(f"book:{pk}" for pk in stale))
+        return len(stale)
+
+    updated = _run_in_chunks(job, ids, query, operation)
+    return f"Recomputed ratings; corrected {updated} books."
+
+
+def reassign_publisher(job, publisher_id, ids=None, query=None):
+    """Point the given books at another publisher."""
+    publisher = Publisher.objects.get(pk=publisher_id)
+
+    def operation(chunk):
+        _purge_on_commit(*(f"book:{pk}" for pk in chunk))
+        books = Book.objects.filter(pk__in=chunk)
+        updated = books.update(publisher=publisher, date_edited=timezone.now())
+        record_queryset(books, ChangeEvent.Operation.UPDATE)
+        return updated
+
+    updated = _run_in_chunks(job, ids, query, operation)
+    return f"Moved {updated} books to {publisher}."
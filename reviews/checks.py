@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .template_tools import precompile_templates
+
+
+@register(Tags.templates)
+def check_reviews_templates(app_configs, **kwargs):
+    """Fail `manage.py check` when a reviews template doesn't compile."""
+    return [
+        Error(f"Template {name} does not compile: {message}", id="reviews.E001")
+        for name, message in precompile_templates().items()
+    ]
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    """Cached sessions need a cache every worker process shares."""
+    # runserver is a single process, so only production settings matter
+    if settings.DEBUG or settings.SESSION_ENGINE != "django.contrib.sessions.backends.cached_db":
+        return []
+    backend = settings.CACHES[settings.SESSION_CACHE_ALIAS]["BACKEND"]
+    if not backend.endswith("LocMemCache"):
+        return []
+    return [
+        Warning(
+            "SESSION_PROFILE 'cached_db' is using a local-memory cache. With more "
+            "than one worker process a logout only clears the session from one "
+            "process's cache.",
+            hint="Point CACHE_BACKEND at Redis or Memcached, or use the 'db' or "
+                 "'signed_cookies' profile.",
+            id="reviews.W001",
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_page_cache(app_configs, **kwargs):
+    """Page-cache purges from jobs and commands only reach a cache the web workers share."""
+    if settings.DEBUG or "reviews.page_cache.PageCacheMiddleware" not in settings.MIDDLEWARE:
+        return []
+    from .page_cache import PAGE_CACHE_ALIAS
+
+    backend = settings.CACHES[PAGE_CACHE_ALIAS]["BACKEND"]
+    if not backend.endswith("LocMemCache"):
+        return []
+    return [
+        Warning(
+            "The page cache uses a local-memory cache, which every process keeps "
+            "to itself. Purges made by run_jobs, loadcsv or the build_* "
+            "commands never reach the web workers, which keep serving stale pages "
+            "until PAGE_CACHE_TIMEOUT.",
+            hint="Point CACHE_BACKEND at Redis or Memcached, or unset "
+                 "PAGE_CACHE_ENABLED so the page cache stays off.",
+            id="reviews.W002",
+        )
+    ]
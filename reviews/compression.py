@@ -0,0 +1,162 @@
+"""
+Response compression for HTML, JSON and CSV responses.
+
+CompressionMiddleware sends Brotli when the client accepts it and the
+optional `brotli` package is installed, and gzip otherwise. It only
+compresses allowlisted content types above a minimum size. Streaming
+responses are compressed chunk by chunk, with each chunk flushed so rows
+still reach the client as they are produced.
+
+Pages that set a CSRF cookie (anything rendering {% csrf_token %}, e.g.
+publisher-form.html) are sent uncompressed. A secret and
+attacker-controlled input compressed into the same response is what
+BREACH measures.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used for everyone without it
+    brotli = None
+
+# Smaller bodies don't shrink enough to pay for the CPU and header
+COMPRESSION_MIN_SIZE = getattr(settings, "COMPRESSION_MIN_SIZE", 512)
+COMPRESSION_TYPES = frozenset(getattr(settings, "COMPRESSION_TYPES", (
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+)))
+# Dynamic responses are compressed on every request, so favour speed over
+# the last few percent; static files are pre-compressed at maximum levels.
+COMPRESSION_GZIP_LEVEL = getattr(settings, "COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request):
+    """Return "br", "gzip" or None for the request's Accept-Encoding."""
+    accepted = _accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip wrapper
+    return compressor.compress(data) + compressor.flush()
+
+
+class _StreamCompressor:
+    """Compress a sequence of chunks, flushing after each so nothing is held back."""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._chunk = lambda data: compressor.process(data) + compressor.flush()
+            self._finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._chunk = lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def chunk(self, data):
+        return self._chunk(data) if data else b""
+
+    def finish(self):
+        return self._finish()
+
+
+def compress_stream(chunks, encoding):
+    compressor = _StreamCompressor(encoding)
+    for data in chunks:
+        compressed = compressor.chunk(data)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor = _StreamCompressor(encoding)
+    async for data in chunks:
+        compressed = compressor.chunk(data)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses for clients that accept br or gzip.
+
+    MiddlewareMixin makes it async-capable: under ASGI the compression runs
+    in a worker thread rather than on the event loop.
+    """
+
+    def process_response(self, request, response):
+        if not self._compressible(response):
+            return response
+
+        # Set even when not compressing: caches must not serve this
+        # uncompressed copy to clients that asked for gzip, or vice versa
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request)
+        if encoding is None or self._has_csrf_secret(response):
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            # The compressed size isn't known until the stream ends
+            response.headers.pop("Content-Length", None)
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The compressed body is a different representation, so a strong
+        # ETag has to become weak (RFC 9110, section 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def _compressible(response):
+        if response.status_code != 200 or response.has_header("Content-Encoding"):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in COMPRESSION_TYPES:
+            return False
+        return response.streaming or len(response.content) >= COMPRESSION_MIN_SIZE
+
+    @staticmethod
+    def _has_csrf_secret(response):
+        # CsrfViewMiddleware (re)sets the cookie whenever get_token() was
+        # called, i.e. whenever the page contains a CSRF token
+        return settings.CSRF_COOKIE_NAME in response.cookies
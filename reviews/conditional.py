@@ -0,0 +1,133 @@
+"""
+ETag / Last-Modified functions for django.views.decorators.http.condition.
+
+They only read the `date_edited` change markers and the rollup markers of
+derived data (the last star counter correction, and for book pages the
+last recommendations rebuild) with small indexed queries, so
+unchanged pages are answered with a 304 before the view runs any of its
+own queries or renders a template.
+"""
+from django.db.models import Count, Max
+
+from .models import RATING_COUNTS_STATE, Book, Publisher, RollupState
+from .recommendations import STATE_NAME as RECOMMENDATIONS_STATE
+
+
+def _timestamp(value):
+    return int(value.timestamp() * 1_000_000) if value else 0
+
+
+def _book_list_state(request):
+    # etag_func and last_modified_func both need this; query once per request
+    if not hasattr(request, "_book_list_state"):
+        request._book_list_state = {
+            **Book.objects.aggregate(
+                count=Count("pk"),  # Changes when a book is deleted
+                book_edited=Max("date_edited"),
+            ),
+            # Kept separate: MAX over the index instead of joining every book
+            **Publisher.objects.aggregate(publisher_edited=Max("date_edited")),
+            "ratings_corrected": _rollup_state(request, RATING_COUNTS_STATE),
+        }
+    return request._book_list_state
+
+
+def _book_state(request, pk):
+    if not hasattr(request, "_book_state"):
+        request._book_state = (
+            Book.objects.filter(pk=pk)
+            .values_list("date_edited", "publisher__date_edited")
+            .first()
+        )
+    return request._book_state
+
+
+def _book_list_last_modified(state):
+    edited = [state["book_edited"], state["publisher_edited"], state["ratings_corrected"]]
+    return max(filter(None, edited), default=None)
+
+
+def _rollup_state(request, name):
+    if not hasattr(request, "_rollup_states"):
+        request._rollup_states = dict(
+            RollupState.objects.filter(name__in=[RATING_COUNTS_STATE, RECOMMENDATIONS_STATE])
+            .values_list("name", "high_water_mark")
+        )
+    return request._rollup_states.get(name)
+
+
+def _user_key(request):
+    # The HTML pages render the login state in the navigation
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else 0
+
+
+def _anonymous(request):
+    user = getattr(request, "user", None)
+    return user is None or not user.is_authenticated
+
+
+def book_list_etag(request, *args, **kwargs):
+    state = _book_list_state(request)
+    return (
+        f'W/"books-{state["count"]}-{_timestamp(state["book_edited"])}'
+        f'-{_timestamp(state["publisher_edited"])}-{_timestamp(state["ratings_corrected"])}'
+        f'-{_user_key(request)}"'
+    )
+
+
+def book_list_last_modified(request, *args, **kwargs):
+    # Last-Modified can't tell users apart, so only use it for anonymous
+    # visitors; logged in users still get the ETag.
+    if not _anonymous(request):
+        return None
+    state = _book_list_state(request)
+    return _book_list_last_modified(state)
+
+
+def book_detail_etag(request, pk, *args, **kwargs):
+    state = _book_state(request, pk)
+    if state is None:
+        return None  # Let the view return its 404
+    return (
+        f'W/"book-{pk}-{_timestamp(state[0])}-{_timestamp(state[1])}'
+        f'-{_timestamp(_rollup_state(request, RATING_COUNTS_STATE))}'
+        f'-{_timestamp(_rollup_state(request, RECOMMENDATIONS_STATE))}-{_user_key(request)}"'
+    )
+
+
+def book_detail_last_modified(request, pk, *args, **kwargs):
+    state = _book_state(request, pk)
+    if state is None or not _anonymous(request):
+        return None
+    return max(filter(None, [
+        *state,
+        _rollup_state(request, RATING_COUNTS_STATE),
+        _rollup_state(request, RECOMMENDATIONS_STATE),
+    ]))
+
+
+# JSON API responses don't depend on the user
+
+def api_book_list_etag(request, *args, **kwargs):
+    state = _book_list_state(request)
+    return (
+        f'W/"api-books-{state["count"]}-{_timestamp(state["book_edited"])}'
+        f'-{_timestamp(state["publisher_edited"])}-{_timestamp(state["ratings_corrected"])}"'
+    )
+
+
+def api_book_list_last_modified(request, *args, **kwargs):
+    state = _book_list_state(request)
+    return _book_list_last_modified(state)
+
+
+def api_book_reviews_etag(request, pk, *args, **kwargs):
+    state = _book_state(request, pk)
+    return None if state is None else f'W/"api-book-{pk}-reviews-{_timestamp(state[0])}"'
+
+
+def api_book_reviews_last_modified(request, pk, *args, **kwargs):
+    state = _book_state(request, pk)
+    return None if state is None else state[0]
+
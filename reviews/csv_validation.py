@@ -0,0 +1,305 @@
+"""
+Whole-file validation of sectional CSVs (`loadcsv --validate-only`).
+
+The file is read once into columns, one list per known column of each
+section, and every check runs over a whole column:
+
+- value checks (dates, timestamps, ISBN checksums, ratings, roles) run once per
+  distinct value, and the rows are then matched against the set of bad
+  values, so a date repeated on a million rows is parsed once;
+- duplicate natural keys are found with one dict pass per section;
+- references (a book's publisher, a review's book, ...) are resolved
+  against the keys defined in the file, and only the remainder is looked
+  up in the database, in batches on the lower() indexes.
+
+Nothing is written. validate_file() returns a JSON-serialisable report
+with per-code counts and the first `max_errors` errors (section, line,
+column, code, value, message).
+"""
+import csv
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .diff_import import ROLES
+from .isbn import canonical_isbn
+from .lookups import db_lower, isbn_digits
+from .models import Book, Contributor, Publisher
+
+SECTION_RE = re.compile(r"content:(\w+)", re.IGNORECASE)
+MAX_ERRORS = 1000
+BATCH_SIZE = 500
+DATE_FORMATS = ("%Y/%m/%d", "%Y-%m-%d")
+RATINGS = {str(stars) for stars in range(1, 6)}
+
+# Section -> column -> accepted headers (the exporter's spelling first)
+COLUMNS = {
+    "Publisher": {
+        "name": ("publisher_name",),
+        "website": ("publisher_website",),
+        "email": ("publisher_email",),
+    },
+    "Book": {
+        "title": ("book_title",),
+        "publication_date": ("book_publication_date",),
+        "isbn": ("book_isbn",),
+        "publisher": ("book_publisher_name",),
+    },
+    "Contributor": {
+        "first_names": ("contributor_first_names",),
+        "last_names": ("contributor_last_names",),
+        "email": ("contributor_email",),
+    },
+    "BookContributor": {
+        "book": ("bookcontributor_book", "book_contributor_book"),
+        "contributor": ("bookcontributor_contributor_email", "book_contributor_contributor"),
+        "role": ("bookcontributor_role", "book_contributor_role"),
+    },
+    "Review": {
+        "book": ("review_book_title", "review_book"),
+        "creator": ("review_creator",),
+        "rating": ("review_rating",),
+        "content": ("review_content",),
+        "date_created": ("review_date_created",),
+        "date_edited": ("review_date_edited",),
+    },
+}
+# Columns only some import modes read: checked when the file has them
+OPTIONAL_COLUMNS = {
+    "Review": {"date_created", "date_edited"},
+}
+# Sections other modes read but that aren't validated here
+PASSTHROUGH_SECTIONS = {"Deleted"}
+
+
+class Section:
+    """The rows of one section, stored as columns."""
+
+    def __init__(self, name, header):
+        self.name = name
+        self.indexes = {}
+        self.missing = []
+        for column, headers in COLUMNS.get(name, {}).items():
+            index = next((header.index(h) for h in headers if h in header), None)
+            if index is None:
+                if column not in OPTIONAL_COLUMNS.get(name, ()):
+                    self.missing.append(headers[0])
+            else:
+                self.indexes[column] = index
+        self.columns = {column: [] for column in self.indexes}
+        self.lines = []
+
+    def append(self, row, line):
+        self.lines.append(line)
+        for column, index in self.indexes.items():
+            self.columns[column].append(row[index].strip() if index < len(row) else "")
+
+    def __len__(self):
+        return len(self.lines)
+
+
+class Report:
+    def __init__(self, path, max_errors):
+        self.path = path
+        self.max_errors = max_errors
+        self.errors = []
+        self.counts = Counter()
+        self.rows = {}
+
+    def add(self, section, line, column, code, value, message):
+        self.counts[code] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({
+                "section": section, "line": line, "column": column,
+                "code": code, "value": value, "message": message,
+            })
+
+    def as_dict(self, seconds):
+        total = sum(self.counts.values())
+        return {
+            "file": str(self.path),
+            "valid": total == 0,
+            "rows": self.rows,
+            "error_count": total,
+            "errors_by_code": dict(self.counts),
+            "errors": self.errors,
+            "truncated": total > len(self.errors),
+            "seconds": round(seconds, 3),
+        }
+
+
+def read_sections(path, report):
+    """{section name: Section} for the file, reporting unknown sections and missing columns."""
+    sections = {}
+    section = name = None
+    header_pending = False
+    with open(path, encoding="utf-8", newline="") as csvfile:
+        reader = csv.reader(csvfile)
+        for row in reader:
+            line = reader.line_num
+            if not row:
+                continue
+            match = SECTION_RE.match(row[0])
+            if match and all(not cell.strip() for cell in row[1:]):
+                name = match.group(1)
+                section, header_pending = None, True
+                if name not in COLUMNS and name not in PASSTHROUGH_SECTIONS:
+                    report.add(name, line, None, "unknown_section", name, f'Unknown section "{name}"')
+                continue
+            if header_pending:
+                header_pending = False
+                if name in COLUMNS:
+                    section = sections[name] = Section(name, row)
+                    for column in section.missing:
+                        report.add(name, line, column, "missing_column", None, f'Missing column "{column}"')
+                continue
+            if section is not None and any(cell.strip() for cell in row):
+                section.append(row, line)
+    return sections
+
+
+def _is_date(value):
+    for format in DATE_FORMATS:
+        try:
+            datetime.strptime(value, format)
+            return True
+        except ValueError:
+            pass
+    return False
+
+
+def parse_timestamp(value):
+    """
+    A review_date_created/review_date_edited value as loadcsv reads it: an
+    ISO 8601 datetime as import_organised_data writes it, or a YYYY-MM-DD
+    date as in older hand-written files. Values without a UTC offset are in
+    the current time zone. ValueError if it is neither.
+    """
+    timestamp = datetime.fromisoformat(value)
+    return timezone.make_aware(timestamp) if timezone.is_naive(timestamp) else timestamp
+
+
+def _is_timestamp(value):
+    try:
+        parse_timestamp(value)
+    except ValueError:
+        return False
+    return True
+
+
+def check_values(report, section, column, valid, code, message):
+    """Report the rows whose `column` fails `valid` (called once per distinct value)."""
+    values = section.columns.get(column)
+    if values is None:
+        return
+    bad = {value for value in set(values) if not valid(value)}
+    if not bad:
+        return
+    for line, value in zip(section.lines, values):
+        if value in bad:
+            report.add(section.name, line, COLUMNS[section.name][column][0], code, value, message.format(value=value))
+
+
+def check_duplicates(report, section, columns, normalise, label):
+    """Report rows whose natural key (`normalise` of the `columns` values) repeats an earlier row's."""
+    if any(column not in section.columns for column in columns):
+        return
+    seen = {}
+    for line, *values in zip(section.lines, *(section.columns[column] for column in columns)):
+        key = normalise(*values)
+        first = seen.setdefault(key, line)
+        if first != line:
+            report.add(
+                section.name, line, COLUMNS[section.name][columns[0]][0], "duplicate_key",
+                " / ".join(values), f"Duplicate {label}: first seen on line {first}",
+            )
+
+
+def _found_in_db(queryset, field, keys):
+    found = set()
+    keys = list(keys)
+    for start in range(0, len(keys), BATCH_SIZE):
+        rows = queryset.annotate(natural_key=Lower(field)).filter(natural_key__in=keys[start:start + BATCH_SIZE])
+        found.update(rows.values_list("natural_key", flat=True))
+    return found
+
+
+def check_references(report, section, column, defined, queryset, field, label):
+    """Report rows whose `column` (matched like LOWER(), see db_lower) is neither in `defined` nor in the database."""
+    values = section.columns.get(column)
+    if values is None:
+        return
+    unresolved = {db_lower(value) for value in values if value} - defined
+    missing = unresolved - _found_in_db(queryset, field, unresolved)
+    if not missing:
+        return
+    for line, value in zip(section.lines, values):
+        if value and db_lower(value) in missing:
+            report.add(
+                section.name, line, COLUMNS[section.name][column][0], "unknown_reference", value,
+                f'{label} "{value}" is not in the file or the database',
+            )
+
+
+def _defined(sections, name, column):
+    section = sections.get(name)
+    if section is None or column not in section.columns:
+        return set()
+    return {db_lower(value) for value in section.columns[column] if value}
+
+
+def validate_file(path, max_errors=MAX_ERRORS):
+    """Validate the sectional CSV at `path` and return the report dict."""
+    start = time.perf_counter()
+    report = Report(path, max_errors)
+    sections = read_sections(path, report)
+    report.rows = {name: len(section) for name, section in sections.items()}
+
+    for section in sections.values():
+        for column in ("name", "title", "isbn", "email", "book", "creator", "contributor"):
+            check_values(report, section, column, bool, "required", f"{column} is required")
+
+    if "Publisher" in sections:
+        check_duplicates(report, sections["Publisher"], ["name"], db_lower, "publisher name")
+
+    if "Book" in sections:
+        books = sections["Book"]
+        check_values(report, books, "publication_date", _is_date, "invalid_date",
+                     '"{value}" is not a YYYY/MM/DD or YYYY-MM-DD date')
+        check_values(report, books, "isbn", lambda value: not value or canonical_isbn(value),
+                     "invalid_isbn", '"{value}" is not a valid ISBN-10 or ISBN-13')
+        check_duplicates(report, books, ["isbn"], lambda isbn: canonical_isbn(isbn) or isbn_digits(isbn), "ISBN")
+        check_references(report, books, "publisher", _defined(sections, "Publisher", "name"),
+                         Publisher.objects.all(), "name", "Publisher")
+
+    if "Contributor" in sections:
+        check_duplicates(report, sections["Contributor"], ["email"], db_lower, "contributor email")
+
+    book_titles = _defined(sections, "Book", "title")
+    if "BookContributor" in sections:
+        links = sections["BookContributor"]
+        check_values(report, links, "role", lambda role: role.lower() in ROLES, "invalid_role",
+                     f'"{{value}}" is not one of {", ".join(sorted(set(ROLES.values())))}')
+        check_duplicates(report, links, ["book", "contributor", "role"],
+                         lambda book, contributor, role: (db_lower(book), db_lower(contributor), role.lower()),
+                         "book contributor")
+        check_references(report, links, "book", book_titles, Book.objects.all(), "title", "Book")
+        check_references(report, links, "contributor", _defined(sections, "Contributor", "email"),
+                         Contributor.objects.all(), "email", "Contributor")
+
+    if "Review" in sections:
+        reviews = sections["Review"]
+        check_values(report, reviews, "rating", lambda rating: rating in RATINGS, "invalid_rating",
+                     '"{value}" is not a rating from 1 to 5')
+        for column in ("date_created", "date_edited"):
+            check_values(report, reviews, column, _is_timestamp, "invalid_date",
+                         '"{value}" is not an ISO 8601 date or datetime')
+        check_duplicates(report, reviews, ["book", "creator"],
+                         lambda book, creator: (db_lower(book), creator), "review of the book by this creator")
+        check_references(report, reviews, "book", book_titles, Book.objects.all(), "title", "Book")
+
+    return report.as_dict(time.perf_counter() - start)
@@ -0,0 +1,445 @@
+"""
+Diff-based CSV import (`loadcsv --diff`).
+
+Each section of a sectional CSV is handled as a set instead of row by row:
+
+1. every row is normalised into a natural key and its fields, and both are
+   hashed;
+2. the digests stored by the previous import (ImportRowHash) are fetched in
+   batches, and rows whose digest is unchanged, and whose database row
+   still exists, are done;
+3. the database rows behind the remaining keys are fetched in batches and
+   compared field by field;
+4. new rows go in with bulk_create, changed rows with bulk_update, and the
+   digests are upserted.
+
+Rows whose row digest matches the last import are left alone even if the
+database row was edited since: a diff import only applies what changed in
+the file. bulk_create/bulk_update send no signals, so like reviews.bulk this
+module records the outbox events, touches and recounts the affected books
+and purges their cached pages itself.
+
+Both header spellings are accepted: the import_organised_data export and
+the older hand-written files (book_contributor_*, review_book).
+"""
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .isbn import canonical_isbn
+from .lookups import db_lower, isbn_digits
+from .models import Book, BookContributor, ChangeEvent, Contributor, ImportRowHash, IsbnDigits, Publisher, Review
+from .outbox import record_queryset
+from .page_cache import purge_keys
+
+BATCH_SIZE = 500
+# The exporter writes role labels ("Co-Author"); accept those and the stored values
+ROLES = {
+    **{label.lower(): value for value, label in BookContributor.ContributionRole.choices},
+    **{value.lower(): value for value in BookContributor.ContributionRole.values},
+}
+
+
+class RowError(ValueError):
+    """The row can't be imported; it is counted as skipped."""
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _column(data, *names):
+    for name in names:
+        if name in data:
+            return data[name].strip()
+    raise RowError(f"missing column {names[0]}")
+
+
+def _date(value):
+    for format in ("%Y/%m/%d", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, format).date()
+        except ValueError:
+            pass
+    raise RowError(f'"{value}" is not a date')
+
+
+def _isbn_key(isbn):
+    return canonical_isbn(isbn) or isbn_digits(isbn)
+
+
+def _by_lower(queryset, field, keys):
+    """{lower(field): row} for `keys` (lower-cased by db_lower), seeking the lower() index; the lowest pk wins."""
+    found = {}
+    for batch in _batches(keys):
+        rows = queryset.annotate(natural_key=Lower(field)).filter(natural_key__in=batch).order_by("-pk")
+        for row in rows:
+            found[row.natural_key] = row
+    return found
+
+
+def _books_by_title(titles):
+    return _by_lower(Book.objects.all(), "title", {db_lower(title) for title in titles})
+
+
+def _require(mapping, key, what):
+    try:
+        return mapping[key]
+    except KeyError:
+        raise RowError(f'{what} "{key}" not found')
+
+
+class _Section(ABC):
+    """
+    How one model's rows are keyed, looked up and turned into field values.
+
+    Names, titles and emails in the keys are lower-cased with db_lower(),
+    like the LOWER() indexes they are looked up on, never with str.lower().
+    """
+
+    model = None
+    update_fields = ()
+
+    @abstractmethod
+    def parse(self, data):
+        """Return (natural key, normalised fields) of a CSV row."""
+
+    @abstractmethod
+    def prepare(self, rows):
+        """Fetch what the rows refer to and return {key: existing instance} for `rows` ({key: fields})."""
+
+    @abstractmethod
+    def values(self, fields):
+        """Model field values for the normalised fields."""
+
+
+class _PublisherSection(_Section):
+    model = Publisher
+    update_fields = ("name", "website", "email")
+
+    def parse(self, data):
+        fields = {
+            "name": _column(data, "publisher_name"),
+            "website": _column(data, "publisher_website"),
+            "email": _column(data, "publisher_email"),
+        }
+        return db_lower(fields["name"]), fields
+
+    def prepare(self, rows):
+        return _by_lower(Publisher.objects.all(), "name", rows)
+
+    def values(self, fields):
+        return fields
+
+
+class _BookSection(_Section):
+    model = Book
+    update_fields = ("title", "publication_date", "isbn", "isbn13", "publisher")
+
+    def parse(self, data):
+        isbn = _column(data, "book_isbn")
+        fields = {
+            "title": _column(data, "book_title"),
+            "publication_date": _date(_column(data, "book_publication_date")),
+            "isbn": isbn,
+            "publisher": db_lower(_column(data, "book_publisher_name")),
+        }
+        return _isbn_key(isbn), fields
+
+    def prepare(self, rows):
+        self.publishers = _by_lower(
+            Publisher.objects.all(), "name", {fields["publisher"] for fields in rows.values()}
+        )
+        canonical = [key for key in rows if canonical_isbn(key) == key]
+        others = set(rows).difference(canonical)
+        existing = {}
+        # Oldest book last, so it wins when two share a canonical ISBN (as lookups do)
+        for batch in _batches(canonical):
+            books = Book.objects.filter(isbn13__in=batch).order_by("-pk")
+            existing.update((book.isbn13, book) for book in books)
+        # Stored ISBNs that fail the checksum have no isbn13
+        for batch in _batches(others):
+            books = Book.objects.annotate(natural_key=IsbnDigits("isbn")).filter(natural_key__in=batch)
+            existing.update((book.natural_key, book) for book in books.order_by("-pk"))
+        return existing
+
+    def values(self, fields):
+        return {
+            "title": fields["title"],
+            "publication_date": fields["publication_date"],
+            "isbn": fields["isbn"],
+            "isbn13": canonical_isbn(fields["isbn"]),  # Book.save() isn't called
+            "publisher_id": _require(self.publishers, fields["publisher"], "Publisher").pk,
+        }
+
+
+class _ContributorSection(_Section):
+    model = Contributor
+    update_fields = ("first_names", "last_names", "email")
+
+    def parse(self, data):
+        fields = {
+            "first_names": _column(data, "contributor_first_names"),
+            "last_names": _column(data, "contributor_last_names"),
+            "email": _column(data, "contributor_email"),
+        }
+        return db_lower(fields["email"]), fields
+
+    def prepare(self, rows):
+        return _by_lower(Contributor.objects.all(), "email", rows)
+
+    def values(self, fields):
+        return fields
+
+
+class _BookContributorSection(_Section):
+    # The whole row is the natural key, so there is nothing to update
+    model = BookContributor
+
+    def parse(self, data):
+        role = _column(data, "bookcontributor_role", "book_contributor_role")
+        if role.lower() not in ROLES:
+            raise RowError(f'unknown role "{role}"')
+        fields = {
+            "book": db_lower(_column(data, "bookcontributor_book", "book_contributor_book")),
+            "contributor": db_lower(
+                _column(data, "bookcontributor_contributor_email", "book_contributor_contributor")
+            ),
+            "role": ROLES[role.lower()],
+        }
+        return (fields["book"], fields["contributor"], fields["role"]), fields
+
+    def prepare(self, rows):
+        self.books = _books_by_title(fields["book"] for fields in rows.values())
+        self.contributors = _by_lower(
+            Contributor.objects.all(), "email", {fields["contributor"] for fields in rows.values()}
+        )
+        keys = {
+            (book.pk, contributor.pk, role): (title, email, role)
+            for title, email, role in rows
+            if (book := self.books.get(title)) and (contributor := self.contributors.get(email))
+        }
+        existing = {}
+        for batch in _batches({book_id for book_id, _, _ in keys}):
+            links = BookContributor.objects.filter(book_id__in=batch)
+            for link in links.filter(contributor_id__in={contributor_id for _, contributor_id, _ in keys}):
+                key = keys.get((link.book_id, link.contributor_id, link.role))
+                if key:
+                    existing[key] = link
+        return existing
+
+    def values(self, fields):
+        return {
+            "book_id": _require(self.books, fields["book"], "Book").pk,
+            "contributor_id": _require(self.contributors, fields["contributor"], "Contributor").pk,
+            "role": fields["role"],
+        }
+
+
+class _ReviewSection(_Section):
+    model = Review
+    update_fields = ("rating", "content")
+
+    def parse(self, data):
+        try:
+            rating = int(_column(data, "review_rating"))
+        except ValueError:
+            raise RowError("the rating is not a number")
+        if not 1 <= rating <= 5:
+            raise RowError("the rating must be between 1 and 5")
+        fields = {
+            "book": db_lower(_column(data, "review_book_title", "review_book")),
+            "creator": _column(data, "review_creator"),
+            "rating": rating,
+            "content": _column(data, "review_content"),
+        }
+        return (fields["book"], fields["creator"]), fields
+
+    def prepare(self, rows):
+        User = get_user_model()
+        self.books = _books_by_title(fields["book"] for fields in rows.values())
+        usernames = {fields["creator"] for fields in rows.values()}
+        self.users = {}
+        for batch in _batches(usernames):
+            self.users.update(User.objects.filter(username__in=batch).values_list("username", "pk"))
+        missing = usernames - set(self.users)
+        # Reviewers are identified by username only, like the exporter writes them
+        for user in User.objects.bulk_create((User(username=name) for name in missing), batch_size=BATCH_SIZE):
+            self.users[user.username] = user.pk
+
+        keys = {
+            (book.pk, self.users[username]): (title, username)
+            for title, username in rows
+            if (book := self.books.get(title))
+        }
+        existing = {}
+        for batch in _batches({book_id for book_id, _ in keys}):
+            reviews = Review.objects.filter(book_id__in=batch, creator_id__in={user_id for _, user_id in keys})
+            for review in reviews:
+                key = keys.get((review.book_id, review.creator_id))
+                if key:
+                    existing[key] = review
+        return existing
+
+    def values(self, fields):
+        return {
+            "book_id": _require(self.books, fields["book"], "Book").pk,
+            "creator_id": self.users[fields["creator"]],
+            "rating": fields["rating"],
+            "content": fields["content"],
+        }
+
+
+# In dependency order: later sections look up the rows of earlier ones
+SECTIONS = {
+    "Publisher": _PublisherSection,
+    "Book": _BookSection,
+    "Contributor": _ContributorSection,
+    "BookContributor": _BookContributorSection,
+    "Review": _ReviewSection,
+}
+
+
+def _stored_digests(model_name, key_digests):
+    stored = {}
+    for batch in _batches(key_digests):
+        rows = ImportRowHash.objects.filter(model=model_name, key_digest__in=batch)
+        stored.update((key, (row, pk)) for key, row, pk in rows.values_list("key_digest", "row_digest", "object_id"))
+    return stored
+
+
+def _existing_pks(model, pks):
+    found = set()
+    for batch in _batches(pks):
+        found.update(model.objects.filter(pk__in=batch).values_list("pk", flat=True))
+    return found
+
+
+def _import_section(model_name, section, rows, errors):
+    stats = Counter()
+    model = section.model
+
+    parsed = {}
+    for data in rows:
+        try:
+            key, fields = section.parse(data)
+        except RowError as e:
+            stats["skipped"] += 1
+            errors.append(f"{model_name} {data}: {e}")
+            continue
+        if key in parsed:
+            stats["skipped"] += 1
+            errors.append(f"{model_name} {data}: duplicate of an earlier row")
+            continue
+        parsed[key] = fields
+
+    key_digests = {key: _digest(key) for key in parsed}
+    row_digests = {key: _digest(fields) for key, fields in parsed.items()}
+    stored = _stored_digests(model_name, key_digests.values())
+    same = {
+        key: stored[digest][1] for key, digest in key_digests.items()
+        if digest in stored and stored[digest][0] == row_digests[key]
+    }
+    alive = _existing_pks(model, same.values())
+    pending = {key: fields for key, fields in parsed.items() if same.get(key) not in alive}
+    stats["unchanged"] += len(parsed) - len(pending)
+
+    existing = section.prepare(pending)
+    now = timezone.now()
+    created, updated, applied = [], [], []
+    for key, fields in pending.items():
+        try:
+            values = section.values(fields)
+        except RowError as e:
+            stats["skipped"] += 1
+            errors.append(f"{model_name} {fields}: {e}")
+            continue
+        instance = existing.get(key)
+        if instance is None:
+            instance = model(**values)
+            created.append(instance)
+        else:
+            changed = [name for name, value in values.items() if getattr(instance, name) != value]
+            if changed:
+                for name in changed:
+                    setattr(instance, name, values[name])
+                instance.date_edited = now  # bulk_update skips auto_now
+                updated.append(instance)
+            else:
+                stats["unchanged"] += 1
+        applied.append((key, instance))
+
+    model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    if updated:
+        model.objects.bulk_update(updated, [*section.update_fields, "date_edited"], batch_size=BATCH_SIZE)
+    stats["inserted"] += len(created)
+    stats["updated"] += len(updated)
+    for instances, operation in ((created, ChangeEvent.Operation.INSERT), (updated, ChangeEvent.Operation.UPDATE)):
+        for batch in _batches(instance.pk for instance in instances):
+            record_queryset(model.objects.filter(pk__in=batch), operation)
+
+    ImportRowHash.objects.bulk_create(
+        (
+            ImportRowHash(
+                model=model_name, key_digest=key_digests[key], row_digest=row_digests[key],
+                object_id=instance.pk, date_imported=now,
+            )
+            for key, instance in applied
+        ),
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["model", "key_digest"],
+        update_fields=["row_digest", "object_id", "date_imported"],
+    )
+    return stats, created + updated
+
+
+def import_sections(models_data):
+    """
+    Diff-import the parsed sections ({section name: [row dicts]}).
+
+    Returns ({section name: Counter of unchanged/inserted/updated/skipped},
+    [error messages of the skipped rows]). Call it inside a transaction.
+    """
+    results, errors = {}, []
+    touched_books, reviewed_books, purge = set(), set(), {"list:books"}
+    for model_name, section_class in SECTIONS.items():
+        if model_name not in models_data:
+            continue
+        stats, changed = _import_section(model_name, section_class(), models_data[model_name], errors)
+        results[model_name] = stats
+        model = section_class.model
+        if model is Review:
+            reviewed_books.update(instance.book_id for instance in changed)
+        elif model is BookContributor:
+            touched_books.update(instance.book_id for instance in changed)
+        elif model is Contributor:
+            for batch in _batches(instance.pk for instance in changed):
+                links = BookContributor.objects.filter(contributor_id__in=batch)
+                touched_books.update(links.values_list("book_id", flat=True))
+        elif model is Book:
+            purge.update(f"book:{instance.pk}" for instance in changed)
+        elif model is Publisher:
+            purge.update(f"publisher:{instance.pk}" for instance in changed)
+
+    # What the signals would have done
+    for batch in _batches(touched_books | reviewed_books):
+        Book.objects.filter(pk__in=batch).update(date_edited=timezone.now())
+        purge.update(f"book:{pk}" for pk in batch)
+    for batch in _batches(reviewed_books):
+        Book.objects.filter(pk__in=batch).rebuild_rating_counts()
+    transaction.on_commit(lambda: purge_keys(*purge))
+    return results, errors
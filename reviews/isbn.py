@@ -0,0 +1,49 @@
+"""
+ISBN-10/ISBN-13 parsing.
+
+Every valid ISBN has one canonical form: its 13 digits without hyphens or
+spaces. ISBN-10s are converted with the 978 prefix. Book.isbn13 stores it,
+so "0-306-40615-2", "0306406152" and "978-0-306-40615-7" are all found with
+one lookup on the same index.
+"""
+import re
+
+from django.core.exceptions import ValidationError
+
+_SEPARATORS_RE = re.compile(r"[\s-]")
+_ISBN10_RE = re.compile(r"^\d{9}[\dX]$")
+_ISBN13_RE = re.compile(r"^97[89]\d{10}$")
+
+
+def _isbn10_check_digit(first9):
+    check = (11 - sum((10 - i) * int(d) for i, d in enumerate(first9)) % 11) % 11
+    return "X" if check == 10 else str(check)
+
+
+def _isbn13_check_digit(first12):
+    return str((10 - sum((3 if i % 2 else 1) * int(d) for i, d in enumerate(first12)) % 10) % 10)
+
+
+def canonical_isbn(value):
+    """
+    Return the ISBN-13 for `value` (an ISBN-10 or ISBN-13, with or without
+    hyphens), or None if it isn't a valid ISBN.
+    """
+    value = _SEPARATORS_RE.sub("", value or "").upper()
+    if _ISBN10_RE.match(value):
+        if _isbn10_check_digit(value[:9]) != value[9]:
+            return None
+        first12 = "978" + value[:9]
+        return first12 + _isbn13_check_digit(first12)
+    if _ISBN13_RE.match(value):
+        return value if _isbn13_check_digit(value[:12]) == value[12] else None
+    return None
+
+
+def validate_isbn(value):
+    if canonical_isbn(value) is None:
+        raise ValidationError(
+            "%(value)s is not a valid ISBN-10 or ISBN-13 (check the digits).",
+            code="invalid_isbn",
+            params={"value": value},
+        )
@@ -0,0 +1,185 @@
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before the first retry; doubled after every failed attempt
+RETRY_BACKOFF = 30
+# A running job's lease: its worker renews it every third of this time, and
+# a job whose lease has run out (the worker died or hung) is taken back
+JOB_LEASE_SECONDS = getattr(settings, "REVIEWS_JOB_LEASE_SECONDS", 300)
+LOST_WORKER_MESSAGE = "The worker running this job stopped renewing its lease."
+
+
+def lease_expiry():
+    return timezone.now() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+def enqueue(task, created_by=None, queue="default", priority=0, max_attempts=3, **params):
+    """
+    Queue `task` to run in the background and return the Job.
+
+    `task` is a function or its dotted path; it is called by the worker as
+    `task(job, **params)`, so params must be JSON serialisable.
+    """
+    if callable(task):
+        task = f"{task.__module__}.{task.__qualname__}"
+    return Job.objects.create(
+        task=task,
+        params=params,
+        queue=queue,
+        priority=priority,
+        max_attempts=max_attempts,
+        created_by=created_by,
+    )
+
+
+def expired_jobs(now=None):
+    """Running jobs whose worker stopped renewing the lease (or that predate leases)."""
+    now = now or timezone.now()
+    return Job.objects.filter(Q(locked_until__lt=now) | Q(locked_until__isnull=True), status=Job.Status.RUNNING)
+
+
+def reclaim_expired_jobs(now=None):
+    """
+    Put jobs with an expired lease back in the queue, or fail the ones that
+    have no attempts left; return how many were requeued.
+    """
+    now = now or timezone.now()
+    expired = expired_jobs(now)
+    expired.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED, locked_until=None, date_finished=now, message=LOST_WORKER_MESSAGE,
+    )
+    return expired.update(
+        status=Job.Status.PENDING, locked_until=None, run_after=now, message=LOST_WORKER_MESSAGE,
+    )
+
+
+def queue_limits(queues=None):
+    """{queue: limit} from REVIEWS_JOB_QUEUE_LIMITS, restricted to `queues` if given."""
+    limits = getattr(settings, "REVIEWS_JOB_QUEUE_LIMITS", {})
+    return {queue: limit for queue, limit in limits.items() if not queues or queue in queues}
+
+
+def full_queues(limits):
+    """Names of the queues in `limits` that already run as many jobs as their limit."""
+    if not limits:
+        return []
+    running = dict(
+        Job.objects.filter(status=Job.Status.RUNNING, queue__in=limits)
+        .values_list("queue")
+        .annotate(n=Count("pk"))
+    )
+    return [queue for queue, limit in limits.items() if running.get(queue, 0) >= limit]
+
+
+def _lock_queues(names):
+    """Lock the JobQueue rows of `names` (creating missing ones) until the transaction ends."""
+    JobQueue.objects.bulk_create([JobQueue(name=name) for name in names], ignore_conflicts=True)
+    # Always in name order, so two workers can't deadlock on each other's rows
+    list(JobQueue.objects.select_for_update().filter(name__in=names).order_by("name"))
+
+
+def claim_next_job(queues=None):
+    """
+    Mark the most urgent due job as running and return it, or None.
+
+    `queues` restricts the search to the given queue names.
+
+    Everything happens in one transaction: expired leases are reclaimed
+    first, then the JobQueue rows of the limited queues are locked and
+    their running jobs counted, and the job is picked with SELECT ... FOR
+    UPDATE SKIP LOCKED (so concurrent workers pass over each other's
+    candidates instead of waiting). A worker counting a limited queue waits
+    for any other worker claiming from it to commit, so the count it sees
+    already includes that claim. On SQLite, which has no row locks, the
+    reclaiming UPDATE takes the database write lock up front, so claims run
+    one at a time.
+    """
+    limits = queue_limits(queues)
+    with transaction.atomic():
+        now = timezone.now()
+        reclaim_expired_jobs(now)
+        if limits:
+            _lock_queues(limits)
+        due = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.PENDING, run_after__lte=now)
+            .exclude(queue__in=full_queues(limits))
+            .order_by("-priority", "run_after", "pk")
+        )
+        if queues:
+            due = due.filter(queue__in=queues)
+        job = due.first()
+        if job is None:
+            return None
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+        job.date_started = now
+        job.locked_until = lease_expiry()
+        job.save(update_fields=["status", "attempts", "date_started", "locked_until"])
+    return job
+
+
+@contextmanager
+def _heartbeat(job):
+    """Renew `job`'s lease from a background thread while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(JOB_LEASE_SECONDS / 3):
+                try:
+                    job.heartbeat()
+                except DatabaseError:
+                    # e.g. SQLite locked by the task's own transaction; the
+                    # lease has two more beats before it runs out
+                    logger.warning("Job %s: could not renew the lease", job.pk, exc_info=True)
+        finally:
+            connection.close()  # The thread's own connection
+
+    thread = threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome, scheduling a retry on failure."""
+    logger.info("Running job %s: %s (attempt %s)", job.pk, job.task, job.attempts)
+    try:
+        func = import_string(job.task)
+        with _heartbeat(job):
+            message = func(job, **job.params)
+    except Exception:
+        logger.exception("Job %s failed", job.pk)
+        job.message = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + timedelta(
+                seconds=RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.Status.FAILED
+    else:
+        job.status = Job.Status.DONE
+        job.message = message or ""
+    job.date_finished = timezone.now()
+    job.locked_until = None
+    job.save(update_fields=["status", "message", "run_after", "date_finished", "locked_until"])
+    close_old_connections()
+    return job
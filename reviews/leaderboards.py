@@ -0,0 +1,138 @@
+"""
+Precomputed "top rated" and "trending" book leaderboards.
+
+build_leaderboards() recomputes every board in one pass and swaps the
+LeaderboardEntry rows in a single transaction. Run it periodically with
+`manage.py build_leaderboards` or the queued task. Pages then read a few
+rows by (board, scope, rank) instead of ranking every book per request.
+
+Top rated uses a Bayesian average. Each book's ratings are blended with
+PRIOR_REVIEWS imaginary reviews at the catalogue-wide mean, so a single
+5-star review doesn't beat hundreds of 4.8s. The inputs are the stored
+star counters, so no reviews are scanned. Trending counts reviews from
+the last TRENDING_DAYS, each weighted by how recent it is (halving every
+TRENDING_HALF_LIFE_DAYS).
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import STAR_FIELDS, Book, LeaderboardEntry, Review
+from .page_cache import purge_keys
+
+LEADERBOARD_SIZE = getattr(settings, "LEADERBOARD_SIZE", 20)
+# None: the mean number of reviews of reviewed books
+PRIOR_REVIEWS = getattr(settings, "LEADERBOARD_PRIOR_REVIEWS", None)
+TRENDING_DAYS = getattr(settings, "LEADERBOARD_TRENDING_DAYS", 14)
+TRENDING_HALF_LIFE_DAYS = getattr(settings, "LEADERBOARD_TRENDING_HALF_LIFE_DAYS", 3)
+
+ALL = "all"
+
+
+def publisher_scope(publisher_id):
+    return f"publisher:{publisher_id}"
+
+
+def year_scope(year):
+    return f"year:{year}"
+
+
+class _TopN:
+    """The `size` largest (score, tie-breaker, book_id) items per scope, in bounded heaps."""
+
+    def __init__(self, size):
+        self.size = size
+        self.heaps = {}
+
+    def add(self, scope, item):
+        heap = self.heaps.setdefault(scope, [])
+        if len(heap) < self.size:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def ranked(self):
+        for scope, heap in self.heaps.items():
+            yield scope, sorted(heap, reverse=True)
+
+
+def _top_rated(size):
+    totals = Book.objects.aggregate(**{name: Sum(name) for name in STAR_FIELDS.values()})
+    review_total = sum(totals[name] or 0 for name in STAR_FIELDS.values())
+    if not review_total:
+        return {}
+    mean = sum(stars * (totals[name] or 0) for stars, name in STAR_FIELDS.items()) / review_total
+    prior = PRIOR_REVIEWS
+    if prior is None:
+        reviewed_books = Book.objects.with_review_counts().filter(review_count__gt=0).count()
+        prior = review_total / reviewed_books
+
+    boards = _TopN(size)
+    books = (
+        Book.objects.with_review_counts().filter(review_count__gt=0).order_by()
+        .values_list("pk", "publisher_id", "publication_date", *STAR_FIELDS.values())
+    )
+    for pk, publisher_id, publication_date, *counts in books.iterator(chunk_size=5000):
+        n = sum(counts)
+        stars_total = sum(stars * count for stars, count in zip(STAR_FIELDS, counts))
+        score = (prior * mean + stars_total) / (prior + n)
+        # Ties go to the book with more reviews
+        item = (score, n, pk)
+        boards.add(ALL, item)
+        boards.add(publisher_scope(publisher_id), item)
+        boards.add(year_scope(publication_date.year), item)
+    return dict(boards.ranked())
+
+
+def _trending(size, now):
+    today = now.date()
+    activity = (
+        Review.objects.filter(date_created__gte=now - timedelta(days=TRENDING_DAYS))
+        .annotate(day=TruncDate("date_created"))
+        .order_by()
+        .values_list("book_id", "day")
+        .annotate(n=Count("pk"))
+    )
+    scores = {}
+    for book_id, day, n in activity.iterator():
+        decay = 0.5 ** ((today - day).days / TRENDING_HALF_LIFE_DAYS)
+        scores[book_id] = scores.get(book_id, 0) + n * decay
+    top = heapq.nlargest(size, ((score, 0, book_id) for book_id, score in scores.items()))
+    return {ALL: top} if top else {}
+
+
+def build_leaderboards(size=LEADERBOARD_SIZE):
+    """Recompute every leaderboard and return the number of entries stored."""
+    now = timezone.now()
+    entries = [
+        LeaderboardEntry(
+            board=board, scope=scope, rank=rank, book_id=book_id, score=score, date_computed=now
+        )
+        for board, ranked_scopes in (
+            (LeaderboardEntry.Board.TOP, _top_rated(size)),
+            (LeaderboardEntry.Board.TRENDING, _trending(size, now)),
+        )
+        for scope, ranked in ranked_scopes.items()
+        for rank, (score, _, book_id) in enumerate(ranked, start=1)
+    ]
+    # Readers see either the old or the new boards, never a mix
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        transaction.on_commit(lambda: purge_keys("leaderboards"))
+    return len(entries)
+
+
+def leaderboard(board, scope=ALL):
+    """The ranked entries of one leaderboard, with the book and publisher joined."""
+    return (
+        LeaderboardEntry.objects
+        .filter(board=board, scope=scope)
+        .select_related("book__publisher")
+        .order_by("rank")
+    )
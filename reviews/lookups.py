@@ -0,0 +1,73 @@
+"""
+Index-backed natural key lookups.
+
+Publishers, books and contributors in CSV files are matched by name, title
+and email regardless of case, and books by ISBN regardless of hyphens (or
+ISBN-10 vs ISBN-13, see reviews.isbn). The filters here use exactly the expressions of the functional indexes in
+reviews.models, so they are index seeks. `__iexact` would not be: it
+compiles to LIKE on SQLite and UPPER() on PostgreSQL.
+"""
+import string
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+from .isbn import canonical_isbn
+from .models import Book, Contributor, IsbnDigits, Publisher
+
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def db_lower(value, using=DEFAULT_DB_ALIAS):
+    """
+    `value` lower-cased the way the database's LOWER() does it, for keys
+    built in Python and matched against Lower() annotations. SQLite only
+    folds ASCII letters, where str.lower() also folds "É" or "Ä".
+    """
+    if connections[using].vendor == "sqlite":
+        return value.translate(_ASCII_LOWER)
+    return value.lower()
+
+
+def iexact(queryset, field, value):
+    """Filter `queryset` on LOWER(field) = LOWER(value)."""
+    alias = f"{field}_lower"
+    return queryset.alias(**{alias: Lower(field)}).filter(**{alias: Lower(Value(value))})
+
+
+def _first(queryset):
+    # Order by pk only: the models' default ordering would make the planner
+    # walk the ordering index instead of seeking the lookup index
+    return queryset.order_by("pk").first()
+
+
+def isbn_digits(isbn):
+    return isbn.replace("-", "").replace(" ", "")
+
+
+def publisher_by_name(name):
+    return _first(iexact(Publisher.objects.all(), "name", name))
+
+
+def book_by_title(title):
+    return _first(iexact(Book.objects.all(), "title", title))
+
+
+def book_by_isbn(isbn):
+    isbn13 = canonical_isbn(isbn)
+    if isbn13:
+        return _first(Book.objects.filter(isbn13=isbn13))
+    # Stored ISBNs that fail the checksum have no isbn13
+    return _first(Book.objects.alias(isbn_digits=IsbnDigits("isbn")).filter(isbn_digits=isbn_digits(isbn)))
+
+
+def contributor_by_email(email):
+    return _first(iexact(Contributor.objects.all(), "email", email))
+
+
+def contributor_by_natural_key(email, first_names, last_names):
+    """Seek on lower(email), then match the names exactly."""
+    contributors = iexact(Contributor.objects.all(), "email", email)
+    return _first(contributors.filter(first_names=first_names, last_names=last_names))
@@ -0,0 +1,112 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from reviews.models import Publisher, Book, ChangeEvent, Review
+from reviews.outbox import record_queryset
+
+
+class Command(BaseCommand):
+    help = 'Measure BookRev admin changelist latency, optionally seeding a large review table first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-reviews', type=int, default=0,
+                            help='Insert this many synthetic reviews before measuring (e.g. 1000000).')
+        parser.add_argument('--books', type=int, default=1000,
+                            help='Number of synthetic books to spread seeded reviews over.')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='How many times each changelist page is requested.')
+
+    def handle(self, *args, **options):
+        if options['seed_reviews']:
+            self._seed(options['seed_reviews'], options['books'], options['batch_size'])
+
+        admin_user, _ = User.objects.get_or_create(
+            username='benchmark-admin',
+            defaults={'is_staff': True, 'is_superuser': True},
+        )
+        client = Client()
+        client.force_login(admin_user)
+
+        review_url = reverse('bookrevadmin:reviews_review_changelist')
+        book_url = reverse('bookrevadmin:reviews_book_changelist')
+        publisher = Publisher.objects.first()
+        pages = [
+            ('reviews, first page', review_url),
+            ('reviews, page 500', f'{review_url}?p=500'),
+            ('reviews, rating filter', f'{review_url}?rating__exact=5'),
+            ('books, first page', book_url),
+            ('books, title search', f'{book_url}?q=Bench'),
+        ]
+        if publisher:
+            pages.append(('books, publisher filter', f'{book_url}?publisher__id__exact={publisher.pk}'))
+
+        self.stdout.write(f'Reviews: {Review.objects.count()}  Books: {Book.objects.count()}')
+        for label, url in pages:
+            timings = []
+            for _ in range(options['repeat']):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = client.get(url, HTTP_HOST='localhost')
+                    timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f'  {label:<26} status={response.status_code} queries={len(queries)} '
+                f'min={min(timings):.1f}ms median={statistics.median(timings):.1f}ms max={max(timings):.1f}ms'
+            )
+
+    @transaction.atomic
+    def _seed(self, n_reviews, n_books, batch_size):
+        """Bulk insert publishers, books, users and reviews for benchmarking."""
+        self.stdout.write(f'Seeding {n_reviews} reviews over {n_books} books...')
+        publishers = Publisher.objects.bulk_create(
+            Publisher(name=f'Bench Publisher {i}', website='https://example.com', email=f'pub{i}@example.com')
+            for i in range(20)
+        )
+        start_date = date(1990, 1, 1)
+        books = Book.objects.bulk_create(
+            (
+                Book(
+                    title=f'Bench Book {i}',
+                    publication_date=start_date + timedelta(days=i % 10_000),
+                    isbn=f'bench-{i}',
+                    publisher=publishers[i % len(publishers)],
+                )
+                for i in range(n_books)
+            ),
+            batch_size=batch_size,
+        )
+        # Each (book, creator) pair must be unique, so we need enough users
+        n_users = -(-n_reviews // len(books))
+        users = User.objects.bulk_create(
+            (User(username=f'bench-user-{i}') for i in range(n_users)),
+            batch_size=batch_size,
+        )
+
+        batch = []
+        for i in range(n_reviews):
+            batch.append(Review(
+                book=books[i % len(books)],
+                creator=users[i // len(books)],
+                rating=i % 5 + 1,
+                content='Benchmark review',
+            ))
+            if len(batch) >= batch_size:
+                Review.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Review.objects.bulk_create(batch)
+        # bulk_create skips the signals that maintain the star counters
+        seeded_books = Book.objects.filter(pk__in=[book.pk for book in books])
+        seeded_books.rebuild_rating_counts()
+        # ... and the ones that feed the change outbox
+        record_queryset(Publisher.objects.filter(pk__in=[p.pk for p in publishers]), ChangeEvent.Operation.INSERT)
+        record_queryset(seeded_books, ChangeEvent.Operation.INSERT)
+        record_queryset(Review.objects.filter(book__in=seeded_books), ChangeEvent.Operation.INSERT)
@@ -0,0 +1,66 @@
+import statistics
+import time
+import zlib
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from reviews import compression
+from reviews.models import Book
+
+
+class Command(BaseCommand):
+    help = 'Compare response size and compression CPU time on the heaviest pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost',
+                            help='Host header for the requests (must be in ALLOWED_HOSTS).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='How many times each body is compressed per setting.')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=options['host'])
+        most_reviewed = (
+            Book.objects.with_review_counts()
+            .order_by('-review_count').values_list('pk', flat=True).first()
+        )
+        paths = ['/books/', '/api/books/?limit=100&fields=id,title,isbn,publisher,rating,contributors']
+        if most_reviewed:
+            paths += [
+                reverse('book_detail', args=[most_reviewed]),
+                f'/api/books/{most_reviewed}/reviews/?limit=100',
+            ]
+        paths.append(reverse('publisher_create'))  # Has a CSRF token: never compressed
+
+        settings = [('gzip', level) for level in (1, compression.COMPRESSION_GZIP_LEVEL, 9)]
+        if compression.brotli is not None:
+            settings += [('br', quality) for quality in (1, compression.COMPRESSION_BROTLI_QUALITY, 11)]
+        else:
+            self.stdout.write('brotli is not installed; only gzip is measured.')
+
+        for path in paths:
+            response = client.get(path, HTTP_ACCEPT_ENCODING='identity')
+            body = b''.join(response) if response.streaming else response.content
+            self.stdout.write(f'\n{path}  {response.status_code}  {len(body) / 1024:.1f} KiB uncompressed')
+            served = client.get(path, HTTP_ACCEPT_ENCODING='gzip, br')
+            self.stdout.write(f'  middleware sends: {served.get("Content-Encoding", "identity")}')
+
+            for encoding, level in settings:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    compressed = self._compress(body, encoding, level)
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write(
+                    f'  {encoding:>4} {level:>2}: {len(compressed) / 1024:8.1f} KiB '
+                    f'({len(compressed) / max(len(body), 1):6.1%}), '
+                    f'median {statistics.median(timings):.2f}ms'
+                )
+
+    @staticmethod
+    def _compress(body, encoding, level):
+        if encoding == 'br':
+            return compression.brotli.compress(body, quality=level)
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
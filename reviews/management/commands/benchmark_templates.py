@@ -0,0 +1,71 @@
+import statistics
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template import Engine, engines
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from reviews.models import Publisher, Book
+from reviews.template_tools import app_template_names
+
+
+class Command(BaseCommand):
+    help = 'Benchmark template compilation and books.html rendering with synthetic data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, nargs='+', default=[100, 1000, 10000],
+                            help='Catalogue sizes to render books.html with.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        names = app_template_names()
+
+        # Compile cost: an engine without the cached loader parses from disk
+        # on every lookup, the configured (cached) engine only once.
+        configured = engines['django'].engine
+        uncached = Engine(
+            dirs=configured.dirs,
+            libraries=configured.libraries,
+            loaders=[
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )
+        start = time.perf_counter()
+        for name in names:
+            uncached.get_template(name)
+        cold = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for name in names:
+            get_template(name)
+        warm = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'Compiled {len(names)} templates: uncached {cold:.1f}ms, cached {warm:.2f}ms')
+
+        # Render books.html from unsaved objects so no database is needed
+        template = get_template('reviews/books.html')
+        request = RequestFactory().get('/books/')
+        publisher = Publisher(name='Benchmark Publisher')
+        for n_books in options['books']:
+            book_list = [
+                {
+                    "book": Book(pk=i + 1, title=f'Book {i}', publisher=publisher),
+                    "book_pub": publisher,
+                    "book_pub_date": date(2000, 1, 1),
+                    "book_rating": i % 5 + 1 if i % 7 else None,
+                    "number_of_reviews": i % 50,
+                }
+                for i in range(n_books)
+            ]
+            context = {"book_list": book_list, "title": "List of all books", "count": n_books}
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                html = template.render(context, request)
+                timings.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(timings)
+            self.stdout.write(
+                f'books.html with {n_books:>6} books: median {median:.1f}ms '
+                f'({median * 1000 / n_books:.1f}µs per card), {len(html) / 1024:.0f} KiB'
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from reviews.leaderboards import LEADERBOARD_SIZE, build_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the top rated and trending book leaderboards (run periodically, e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=LEADERBOARD_SIZE,
+                            help='Books kept per leaderboard.')
+
+    def handle(self, *args, **options):
+        stored = build_leaderboards(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} leaderboard entries.'))
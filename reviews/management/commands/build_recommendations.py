@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the "readers also liked" neighbours of every book from co-reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K,
+                            help='Neighbours stored per book.')
+        parser.add_argument('--block-size', type=int, default=recommendations.BLOCK_SIZE,
+                            help='Books multiplied per sparse block (bounds memory, scipy only).')
+        parser.add_argument('--max-user-reviews', type=int, default=recommendations.MAX_USER_REVIEWS,
+                            help='Ignore users with more reviews than this.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stored = recommendations.build_recommendations(
+            top_k=options['top_k'],
+            block_size=options['block_size'],
+            max_user_reviews=options['max_user_reviews'],
+        )
+        engine = 'scipy' if recommendations.sparse is not None else 'pure Python'
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {stored} similarities in {time.perf_counter() - start:.1f}s ({engine}).'
+        ))
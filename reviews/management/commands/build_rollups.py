@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reviews.rollups import build_rollups, np
+
+
+class Command(BaseCommand):
+    help = 'Update the monthly review rollups per publisher and contributor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every month instead of those changed since the last run.')
+
+    def handle(self, *args, **options):
+        months = build_rollups(full=options['full'])
+        engine = 'numpy' if np is not None else 'pure Python'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {months} months of rollups ({engine}).'))
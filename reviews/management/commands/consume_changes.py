@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from reviews import outbox
+from reviews.models import ChangeFeedCursor
+
+
+class Command(BaseCommand):
+    help = ('Pass the change outbox events after a named cursor to a handler (JSON lines on stdout '
+            'by default) and move the cursor past them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Cursor name; each consumer keeps its own position.')
+        parser.add_argument('--handler',
+                            help='Dotted path of a callable taking a list of event dicts. '
+                                 'The cursor only moves once it returns (at-least-once delivery).')
+        parser.add_argument('--models', default='',
+                            help=f'Comma separated model names, from: {", ".join(outbox.MODEL_NAMES)}.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--follow', action='store_true',
+                            help='Keep polling for new events instead of stopping when caught up.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds between polls with --follow.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Start again from the first event.')
+
+    def handle(self, *args, **options):
+        models = [name.strip() for name in options['models'].split(',') if name.strip()]
+        unknown = sorted(set(models) - set(outbox.MODEL_NAMES))
+        if unknown:
+            raise CommandError(f'Unknown models: {", ".join(unknown)}')
+        if options['name'].startswith('_'):
+            raise CommandError('Cursor names starting with "_" are reserved.')
+        handler = import_string(options['handler']) if options['handler'] else self._write_lines
+
+        cursor, _ = ChangeFeedCursor.objects.get_or_create(name=options['name'])
+        if options['reset']:
+            cursor.position = 0
+            cursor.save(update_fields=['position', 'date_edited'])
+
+        consumed = 0
+        while True:
+            events = outbox.changes_after(cursor.position, options['batch_size'], models)
+            if events:
+                handler([outbox.serialize(event) for event in events])
+                cursor.position = events[-1].seq
+                cursor.save(update_fields=['position', 'date_edited'])
+                consumed += len(events)
+            if len(events) < options['batch_size']:
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stderr.write(f'Consumed {consumed} events; {cursor.name} is at {cursor.position}.')
+
+    def _write_lines(self, events):
+        for event in events:
+            self.stdout.write(json.dumps(event, cls=DjangoJSONEncoder))
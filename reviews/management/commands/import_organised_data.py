@@ -1,10 +1,16 @@
 import csv
 import datetime
+import json
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
-from django.db.models import ForeignKey, ManyToManyField, DateField
-from reviews.models import Publisher, Contributor, Book, BookContributor, Review 
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import ForeignKey, ManyToManyField, DateField, DateTimeField
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from reviews.models import Publisher, Contributor, Book, BookContributor, Review, RollupState
+from reviews.outbox import NATURAL_KEYS, deletions_since
+from reviews.sharded_export import export_sharded, merge_shards, write_manifest
 
 # Define the models and the specific field to use for human-readable linking
 MODEL_EXPORT_CONFIG = {
@@ -15,16 +21,67 @@ MODEL_EXPORT_CONFIG = {
     Review: {'link_field': None}
 }
 
+# High-water mark of --incremental runs, stored in RollupState
+EXPORT_STATE_NAME = 'organised_data_export'
+
+
+def parse_since(value):
+    """An ISO date or datetime (naive values are in the current time zone)."""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--since must be an ISO date or datetime, not "{value}".')
+        since = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(since) if timezone.is_naive(since) else since
+
+
 class Command(BaseCommand):
     help = 'Imports all model data into a single csv with section headers.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--since',
+                            help='Only export rows changed after this ISO date/datetime, plus a '
+                                 '"content:Deleted" section of tombstones (load with loadcsv --merge).')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Like --since, from the end of the last --incremental run '
+                                 '(a full export the first time).')
+        parser.add_argument('--shard-size', type=int,
+                            help='Export in parallel: split each model into primary key ranges of about '
+                                 'this many rows, one file per range plus a manifest.json.')
+        parser.add_argument('--workers', type=int,
+                            help='Processes exporting shards at once (default: one per CPU).')
+        parser.add_argument('--merge-shards', action='store_true',
+                            help='With --shard-size, also concatenate the shards into merged.csv.')
+        parser.add_argument('--output-dir',
+                            help='Directory for the --shard-size files (default: a new timestamped '
+                                 'directory next to this command).')
+
     def handle(self, *args, **options):
+        # Taken before reading, so rows changed during the export go in the next one
+        started = timezone.now()
+        since = parse_since(options['since']) if options['since'] else None
+        if options['incremental'] and since is None:
+            state = RollupState.objects.filter(name=EXPORT_STATE_NAME).first()
+            since = state.high_water_mark if state else None
+
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f'ALL_MODELS_SECTIONAL_EXPORT_{timestamp}.csv'
+        if options['shard_size']:
+            if options['shard_size'] < 1:
+                raise CommandError('--shard-size must be at least 1.')
+            self._export_sharded(since, timestamp, options)
+            if options['incremental']:
+                RollupState.objects.update_or_create(name=EXPORT_STATE_NAME, defaults={'high_water_mark': started})
+            return
+
+        kind = 'SECTIONAL' if since is None else 'DELTA'
+        output_filename = f'ALL_MODELS_{kind}_EXPORT_{timestamp}.csv'
         current_dir = Path(__file__).parent 
         file_path = current_dir / output_filename
         
         self.stdout.write(f"Starting sectional data export to {file_path}...")
+        if since is not None:
+            self.stdout.write(f"Only rows changed since {since.isoformat()}")
         
         total_records = 0
         
@@ -37,15 +94,73 @@ class Command(BaseCommand):
                     master_file.write(f"\ncontent:{Model.__name__}\n")
                     
                     # 2. Write the CSV data for this model
-                    total_records += self._write_model_section(master_file, Model, config['link_field'])
+                    total_records += self._write_model_section(master_file, Model, config['link_field'], since)
+
+                # 3. Deleted rows have nothing left to export but their outbox events
+                if since is not None:
+                    master_file.write("\ncontent:Deleted\n")
+                    total_records += self._write_tombstones(master_file, since)
             
             self.stdout.write(self.style.SUCCESS(f'Data export complete! Total records: {total_records} 🎉'))
 
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"An error occurred: {e}"))
+            # A partial file must not pass for an export, nor advance --incremental
+            file_path.unlink(missing_ok=True)
+            raise CommandError(f"Export to {file_path} failed: {e}") from e
+
+        if options['incremental']:
+            RollupState.objects.update_or_create(name=EXPORT_STATE_NAME, defaults={'high_water_mark': started})
 
 
-    def _write_model_section(self, master_file, Model, link_field):
+    def _export_sharded(self, since, timestamp, options):
+        """Writes every model as pk-range shards in parallel (see reviews.sharded_export)."""
+        kind = 'SHARDED' if since is None else 'SHARDED_DELTA'
+        directory = Path(options['output_dir'] or Path(__file__).parent / f'ALL_MODELS_{kind}_EXPORT_{timestamp}')
+        self.stdout.write(f"Starting sharded data export to {directory}...")
+        if since is not None:
+            self.stdout.write(f"Only rows changed since {since.isoformat()}")
+
+        def progress(shard):
+            self.stdout.write(f"  - Wrote {shard['rows']} records for {shard['section']} to {shard['path']}")
+
+        manifest = export_sharded(
+            list(MODEL_EXPORT_CONFIG), directory, options['shard_size'],
+            since=since, workers=options['workers'], progress=progress,
+        )
+        if since is not None:
+            # Tombstones come from the outbox in one go; they are a shard of their own
+            with open(directory / 'deleted.csv', 'w', newline='', encoding='utf-8') as deleted_file:
+                deleted_file.write("content:Deleted\n")
+                rows = self._write_tombstones(deleted_file, since)
+            manifest['shards'].append({'section': 'Deleted', 'path': 'deleted.csv', 'rows': rows,
+                                       'bytes': (directory / 'deleted.csv').stat().st_size})
+            manifest['rows']['Deleted'] = rows
+        if options['merge_shards']:
+            merge_shards(directory, manifest['shards'], directory / 'merged.csv')
+            manifest['merged'] = 'merged.csv'
+        write_manifest(directory, manifest)
+
+        total_records = sum(manifest['rows'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Data export complete! Total records: {total_records} in {len(manifest['shards'])} shards "
+            f"({manifest['workers']} workers) 🎉"
+        ))
+
+
+    def _write_tombstones(self, master_file, since):
+        """Writes one row per row deleted after `since`: its model and natural key."""
+        writer = csv.writer(master_file)
+        writer.writerow(['deleted_model', 'deleted_id', 'deleted_key'])
+        count = 0
+        for event in deletions_since(since).iterator(chunk_size=2000):
+            key = {path: event.payload.get(path) for path in NATURAL_KEYS[event.model]}
+            writer.writerow([event.model, event.object_id, json.dumps(key, cls=DjangoJSONEncoder)])
+            count += 1
+        self.stdout.write(f"  - Wrote {count} tombstones")
+        return count
+
+
+    def _write_model_section(self, master_file, Model, link_field, since=None, pk_range=None):
         """Fetches data for a single Model and writes its header and rows to the master file."""
         
         fields = [f for f in Model._meta.concrete_fields if not isinstance(f, ManyToManyField)]
@@ -53,6 +168,12 @@ class Command(BaseCommand):
         
         fk_fields = [f.name for f in fields if isinstance(f, ForeignKey)]
         queryset = Model.objects.all().select_related(*fk_fields)
+        if since is not None:
+            # Every exported model has an indexed date_edited change marker
+            queryset = queryset.filter(date_edited__gt=since)
+        if pk_range is not None:
+            # One shard of a sharded export: a primary key range scan
+            queryset = queryset.filter(pk__range=pk_range).order_by('pk')
         
         # 1. Define the prefixed header row (e.g., publisher_name, publisher_website)
         header_names = []
@@ -76,7 +197,9 @@ class Command(BaseCommand):
         writer.writerow(header_names)
 
         # 3. Write data rows
-        for obj in queryset:
+        # iterator() streams rows in chunks instead of caching the whole table
+        count = 0
+        for obj in queryset.iterator(chunk_size=2000):
             row = []
             for field in fields:
                 value = getattr(obj, field.name)
@@ -96,6 +219,11 @@ class Command(BaseCommand):
                     else:
                         readable_value = str(value)
                         
+                # DateTimeField Handling (ISO 8601 with the UTC offset); it is
+                # a DateField subclass, so it has to come first
+                elif isinstance(field, DateTimeField):
+                    readable_value = value.isoformat()
+
                 # DateField Handling (YYYY/MM/DD)
                 elif isinstance(field, DateField):
                     readable_value = value.strftime('%Y/%m/%d')
@@ -110,6 +238,7 @@ class Command(BaseCommand):
                 row.append(readable_value)
             
             writer.writerow(row)
+            count += 1
             
-        self.stdout.write(f"  - Wrote {queryset.count()} records for {Model.__name__}")
-        return queryset.count()
+        self.stdout.write(f"  - Wrote {count} records for {Model.__name__}")
+        return count
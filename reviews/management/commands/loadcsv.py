@@ -1,21 +1,40 @@
 import csv
+import json
 import re
 import csv
 import re
+from collections import Counter
 from datetime import datetime
 
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from reviews.csv_validation import MAX_ERRORS, parse_timestamp, validate_file
+from reviews.diff_import import ROLES, import_sections
+from reviews.lookups import (
+    book_by_isbn, book_by_title, contributor_by_email, contributor_by_natural_key, publisher_by_name,
+)
 from reviews.models import Publisher, Contributor, Book, BookContributor, Review
 
-
 class Command(BaseCommand):
     help = 'Load the reviews data from a CSV file.'
 
     def add_arguments(self, parser):
         parser.add_argument('--csv', type=str)
+        parser.add_argument('--merge', action='store_true',
+                            help='Apply an import_organised_data export (full or --since delta): '
+                                 'delete the tombstoned rows, then update or create every row.')
+        parser.add_argument('--diff', action='store_true',
+                            help='Compare row hashes with the last import and bulk insert or update '
+                                 'only the new and changed rows.')
+        parser.add_argument('--validate-only', action='store_true',
+                            help='Check the whole file (dates, ratings, ISBNs, references, duplicate keys) '
+                                 'without writing anything, and print a JSON error report.')
+        parser.add_argument('--report', type=str,
+                            help='With --validate-only, write the JSON report to this path instead of stdout.')
+        parser.add_argument('--max-errors', type=int, default=MAX_ERRORS,
+                            help='With --validate-only, how many errors the report lists (all are counted).')
 
     @staticmethod
     def row_to_dict(row, header):
@@ -29,6 +48,10 @@ class Command(BaseCommand):
         if not csv_path:
             raise CommandError('You must provide a --csv path to the CSV file.')
 
+        if options.get('validate_only'):
+            self._validate(csv_path, options)
+            return
+
         model_section_regex = re.compile(r'content:(\w+)', re.IGNORECASE)
         header = None
         models_data = {}
@@ -65,17 +88,25 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f'Error reading file: {e}')
 
+        if options.get('merge'):
+            self._merge(models_data)
+            return
+        if options.get('diff'):
+            self._diff(models_data)
+            return
+
         # === CREATE PUBLISHERS ===
         for data in models_data.get('Publisher', []):
             try:
-                publisher, created = Publisher.objects.get_or_create(
-                    name=data['publisher_name'],
-                    defaults={
-                        'website': data['publisher_website'],
-                        'email': data['publisher_email']
-                    }
-                )
+                # Natural keys are matched case-insensitively via the lower() indexes
+                publisher = publisher_by_name(data['publisher_name'])
+                created = publisher is None
                 if created:
+                    publisher = Publisher.objects.create(
+                        name=data['publisher_name'],
+                        website=data['publisher_website'],
+                        email=data['publisher_email'],
+                    )
                     self.stdout.write(f'Created Publisher "{publisher.name}"')
             except Exception as e:
                 self.stderr.write(f'Error creating Publisher {data}: {e}')
@@ -83,22 +114,22 @@ class Command(BaseCommand):
         # === CREATE BOOKS ===
         for data in models_data.get('Book', []):
             try:
-                publisher = Publisher.objects.filter(name=data['book_publisher_name']).first()
+                publisher = publisher_by_name(data['book_publisher_name'])
                 if not publisher:
                     self.stderr.write(f'Publisher not found: {data["book_publisher_name"]}')
                     continue
 
                 pub_date = datetime.strptime(data['book_publication_date'], '%Y/%m/%d').date()
 
-                book, created = Book.objects.get_or_create(
-                    title=data['book_title'],
-                    defaults={
-                        'publication_date': pub_date,
-                        'isbn': data['book_isbn'],
-                        'publisher': publisher
-                    }
-                )
+                book = book_by_title(data['book_title'])
+                created = book is None
                 if created:
+                    book = Book.objects.create(
+                        title=data['book_title'],
+                        publication_date=pub_date,
+                        isbn=data['book_isbn'],
+                        publisher=publisher,
+                    )
                     self.stdout.write(f'Created Book "{book.title}"')
             except Exception as e:
                 self.stderr.write(f'Error creating Book {data}: {e}')
@@ -106,12 +137,18 @@ class Command(BaseCommand):
         # === CREATE CONTRIBUTORS ===
         for data in models_data.get('Contributor', []):
             try:
-                contributor, created = Contributor.objects.get_or_create(
-                    first_names=data['contributor_first_names'],
-                    last_names=data['contributor_last_names'],
-                    email=data['contributor_email']
+                contributor = contributor_by_natural_key(
+                    data['contributor_email'],
+                    data['contributor_first_names'],
+                    data['contributor_last_names'],
                 )
+                created = contributor is None
                 if created:
+                    contributor = Contributor.objects.create(
+                        first_names=data['contributor_first_names'],
+                        last_names=data['contributor_last_names'],
+                        email=data['contributor_email'],
+                    )
                     self.stdout.write(f'Created Contributor "{contributor.first_names} {contributor.last_names}"')
             except Exception as e:
                 self.stderr.write(f'Error creating Contributor {data}: {e}')
@@ -119,8 +156,8 @@ class Command(BaseCommand):
         # === CREATE BOOK CONTRIBUTORS ===
         for data in models_data.get('BookContributor', []):
             try:
-                book = Book.objects.filter(title=data['book_contributor_book']).first()
-                contributor = Contributor.objects.filter(email=data['book_contributor_contributor']).first()
+                book = book_by_title(data['book_contributor_book'])
+                contributor = contributor_by_email(data['book_contributor_contributor'])
 
                 if not book:
                     self.stderr.write(f'Book not found: {data["book_contributor_book"]}')
@@ -147,7 +184,7 @@ class Command(BaseCommand):
                     defaults={'username': data['review_creator']}
                 )
 
-                book = Book.objects.filter(title=data['review_book']).first()
+                book = book_by_title(data['review_book'])
                 if not book:
                     self.stderr.write(f'Book not found for review: {data["review_book"]}')
                     continue
@@ -158,8 +195,8 @@ class Command(BaseCommand):
                     creator=creator,
                     defaults={
                         'rating': int(data['review_rating']),
-                        'date_created': datetime.strptime(data['review_date_created'], '%Y-%m-%d'),
-                        'date_edited': datetime.strptime(data['review_date_edited'], '%Y-%m-%d'),
+                        'date_created': parse_timestamp(data['review_date_created']),
+                        'date_edited': parse_timestamp(data['review_date_edited']),
                     }
                 )
 
@@ -170,3 +207,161 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("✅ Import complete"))
 
+    # === VALIDATION (see reviews.csv_validation) ===
+
+    def _validate(self, csv_path, options):
+        try:
+            report = validate_file(csv_path, max_errors=options['max_errors'])
+        except FileNotFoundError:
+            raise CommandError(f'File "{csv_path}" does not exist.')
+        output = json.dumps(report, indent=2)
+        if options.get('report'):
+            with open(options['report'], 'w', encoding='utf-8') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+        if not report['valid']:
+            # A non-zero exit status, so pipelines stop before importing
+            raise CommandError(f'{report["error_count"]} errors in {csv_path}.')
+        self.stderr.write(f'{csv_path} is valid ({sum(report["rows"].values())} rows).')
+
+    # === DIFF MODE (see reviews.diff_import) ===
+
+    def _diff(self, models_data):
+        results, errors = import_sections(models_data)
+        for error in errors[:50]:
+            self.stderr.write(f'Skipped {error}')
+        if len(errors) > 50:
+            self.stderr.write(f'... and {len(errors) - 50} more skipped rows')
+        for model_name, stats in results.items():
+            self.stdout.write(
+                f'{model_name}: {stats["unchanged"]} unchanged, {stats["inserted"]} inserted, '
+                f'{stats["updated"]} updated, {stats["skipped"]} skipped'
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Diff import complete"))
+
+    # === MERGE MODE (the headers written by import_organised_data) ===
+
+    def _merge(self, models_data):
+        counts = {}
+        # Tombstones first: a row deleted and created again since the last
+        # export is in both sections, and must survive
+        for data in models_data.get('Deleted', []):
+            self._merge_row(counts, data, self._merge_deleted)
+        for model_name, merge in (
+            ('Publisher', self._merge_publisher),
+            ('Book', self._merge_book),
+            ('Contributor', self._merge_contributor),
+            ('BookContributor', self._merge_book_contributor),
+            ('Review', self._merge_review),
+        ):
+            for data in models_data.get(model_name, []):
+                self._merge_row(counts, data, merge)
+
+        for model_name, tally in counts.items():
+            summary = ', '.join(f'{n} {outcome}' for outcome, n in sorted(tally.items()))
+            self.stdout.write(f'{model_name}: {summary}')
+        self.stdout.write(self.style.SUCCESS("✅ Merge complete"))
+
+    def _merge_row(self, counts, data, merge):
+        try:
+            # A savepoint per row, so one bad row doesn't abort the whole merge
+            with transaction.atomic():
+                model_name, outcome = merge(data)
+        except Exception as e:
+            self.stderr.write(f'Error merging {data}: {e}')
+            return
+        counts.setdefault(model_name, Counter())[outcome] += 1
+
+    @staticmethod
+    def _upsert(Model, instance, fields):
+        """Create the row, or save the fields that differ; return (model name, outcome)."""
+        if instance is None:
+            Model.objects.create(**fields)
+            return Model.__name__, 'created'
+        changed = [name for name, value in fields.items() if getattr(instance, name) != value]
+        if not changed:
+            return Model.__name__, 'unchanged'
+        for name in changed:
+            setattr(instance, name, fields[name])
+        # auto_now only fires for saved fields: move the change marker too,
+        # so the row is in the next delta export
+        instance.save(update_fields=[*changed, 'date_edited'])
+        return Model.__name__, 'updated'
+
+    @staticmethod
+    def _required(value, what):
+        if value is None:
+            raise ValueError(f'{what} not found')
+        return value
+
+    def _merge_deleted(self, data):
+        key = json.loads(data['deleted_key'])
+        model = data['deleted_model']
+        if model == 'publisher':
+            found = publisher_by_name(key['name'])
+        elif model == 'contributor':
+            found = contributor_by_email(key['email'])
+        elif model == 'book':
+            found = book_by_isbn(key['isbn'])
+        elif model == 'bookcontributor':
+            found = BookContributor.objects.filter(
+                book=book_by_isbn(key['book__isbn']),
+                contributor=contributor_by_email(key['contributor__email']),
+                role=key['role'],
+            ).first()
+        elif model == 'review':
+            found = Review.objects.filter(
+                book=book_by_isbn(key['book__isbn']), creator__username=key['creator__username'],
+            ).first()
+        else:
+            raise ValueError(f'unknown model "{model}"')
+        if found is None:
+            return 'Deleted', 'already gone'
+        found.delete()
+        return 'Deleted', 'deleted'
+
+    def _merge_publisher(self, data):
+        return self._upsert(Publisher, publisher_by_name(data['publisher_name']), {
+            'name': data['publisher_name'],
+            'website': data['publisher_website'],
+            'email': data['publisher_email'],
+        })
+
+    def _merge_book(self, data):
+        book = book_by_isbn(data['book_isbn']) or book_by_title(data['book_title'])
+        return self._upsert(Book, book, {
+            'title': data['book_title'],
+            'publication_date': datetime.strptime(data['book_publication_date'], '%Y/%m/%d').date(),
+            'isbn': data['book_isbn'],
+            'publisher': self._required(publisher_by_name(data['book_publisher_name']), 'Publisher'),
+        })
+
+    def _merge_contributor(self, data):
+        return self._upsert(Contributor, contributor_by_email(data['contributor_email']), {
+            'first_names': data['contributor_first_names'],
+            'last_names': data['contributor_last_names'],
+            'email': data['contributor_email'],
+        })
+
+    def _merge_book_contributor(self, data):
+        fields = {
+            'book': self._required(book_by_title(data['bookcontributor_book']), 'Book'),
+            'contributor': self._required(
+                contributor_by_email(data['bookcontributor_contributor_email']), 'Contributor'
+            ),
+            'role': ROLES[data['bookcontributor_role'].lower()],
+        }
+        # The whole row is the natural key: found means unchanged
+        return self._upsert(BookContributor, BookContributor.objects.filter(**fields).first(), fields)
+
+    def _merge_review(self, data):
+        book = self._required(book_by_title(data['review_book_title']), 'Book')
+        creator, _ = User.objects.get_or_create(username=data['review_creator'])
+        review = Review.objects.filter(book=book, creator=creator).first()
+        return self._upsert(Review, review, {
+            'book': book,
+            'creator': creator,
+            'rating': int(data['review_rating']),
+            'content': data['review_content'],
+        })
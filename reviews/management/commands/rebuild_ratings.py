@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.models import Book
+from reviews.page_cache import purge_keys
+
+
+class Command(BaseCommand):
+    help = "Recount every book's star rating counters from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Books recounted per UPDATE statement and transaction.')
+
+    def handle(self, *args, **options):
+        # One set-based UPDATE per chunk of primary keys keeps each
+        # transaction (and the rows it locks) short on large catalogues.
+        chunk_size = options['chunk_size']
+        last_pk = updated = 0
+        while True:
+            pks = list(
+                Book.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                # Only the books whose counters were off are written
+                stale = Book.objects.filter(pk__in=pks).rebuild_rating_counts()
+            purge_keys(*(f'book:{pk}' for pk in stale))
+            updated += len(stale)
+            last_pk = pks[-1]
+        if updated:
+            purge_keys('list:books')
+        self.stdout.write(self.style.SUCCESS(f'Recounted ratings; corrected {updated} books.'))
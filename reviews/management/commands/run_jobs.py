@@ -0,0 +1,52 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from reviews.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (bulk admin actions, imports, exports, rebuilds).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever.')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when there is no pending job.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of jobs this process runs concurrently.')
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='Only take jobs from this queue (can be repeated).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Waiting for jobs with {options['workers']} worker(s)...")
+        threads = [
+            threading.Thread(target=self._work, args=(options,), daemon=True)
+            for _ in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping; running jobs are taken back by the next worker once their lease expires.')
+
+    def _work(self, options):
+        try:
+            while True:
+                job = claim_next_job(options['queues'])
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                job = run_job(job)
+                style = self.style.SUCCESS if job.status == job.Status.DONE else self.style.ERROR
+                self.stdout.write(style(f'Job {job.pk} {job.task}: {job.get_status_display()}'))
+        finally:
+            # Each thread has its own database connection
+            connection.close()
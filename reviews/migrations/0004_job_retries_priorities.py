@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='job',
+            name='reviews_job_status_91d0ae_idx',
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='max_attempts',
+            field=models.PositiveSmallIntegerField(default=3, help_text='Failed jobs are retried with backoff until this many attempts'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='priority',
+            field=models.SmallIntegerField(default=0, help_text='Jobs with a higher priority are picked up first'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='queue',
+            field=models.CharField(default='default', help_text='Queue name; settings.REVIEWS_JOB_QUEUE_LIMITS caps how many run at once', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='run_after',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='The job is not picked up before this time (used for retry backoff)'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', '-priority', 'run_after'], name='reviews_job_status_0f58e4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'queue'], name='reviews_job_status_9e73fa_idx'),
+        ),
+    ]
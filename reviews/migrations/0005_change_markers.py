@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_job_retries_priorities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='date_edited',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Date and time the book or one of its reviews was last edited'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='date_edited',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Date and time the publisher was last edited'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:52
+
+import django.db.models.functions.text
+import reviews.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_change_markers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='book_title_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(reviews.models.IsbnDigits('isbn'), name='book_isbn_digits_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contributor',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='contributor_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='publisher_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:53
+
+import reviews.isbn
+from django.db import migrations, models
+
+
+def backfill_isbn13(apps, schema_editor):
+    Book = apps.get_model('reviews', 'Book')
+    seen = set()
+    updated = []
+    for book in Book.objects.only('pk', 'isbn').order_by('pk').iterator(chunk_size=2000):
+        isbn13 = reviews.isbn.canonical_isbn(book.isbn)
+        # The same ISBN written two ways: only the oldest book gets it
+        if isbn13 and isbn13 not in seen:
+            seen.add(isbn13)
+            book.isbn13 = isbn13
+            updated.append(book)
+    Book.objects.bulk_update(updated, ['isbn13'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_natural_key_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='isbn13',
+            field=models.CharField(editable=False, help_text='Canonical ISBN-13 (no hyphens), kept in sync with isbn on save', max_length=13, null=True, unique=True, verbose_name='ISBN-13'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(db_index=True, max_length=20, unique=True, validators=[reviews.isbn.validate_isbn], verbose_name='ISBN'),
+        ),
+        migrations.RunPython(backfill_isbn13, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_stars(apps, schema_editor):
+    # Same UPDATE as BookQuerySet.rebuild_rating_counts(), on the historical models
+    Book = apps.get_model('reviews', 'Book')
+    Review = apps.get_model('reviews', 'Review')
+
+    def count(stars):
+        reviews = (
+            Review.objects.filter(book=OuterRef('pk'), rating=stars)
+            .order_by().values('book').annotate(n=Count('pk')).values('n')
+        )
+        return Coalesce(Subquery(reviews), Value(0))
+
+    Book.objects.update(**{f'stars_{stars}': count(stars) for stars in range(1, 6)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_book_isbn13'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='stars_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='stars_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_stars, migrations.RunPython.noop),
+    ]
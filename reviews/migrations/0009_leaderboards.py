@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_book_star_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('top', 'Top rated'), ('trending', 'Trending')], max_length=10)),
+                ('scope', models.CharField(help_text='"all", "publisher:<id>" or "year:<publication year>"', max_length=30)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Bayesian average rating (top) or decayed review activity (trending)')),
+                ('date_computed', models.DateTimeField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.book')),
+            ],
+            options={
+                'verbose_name_plural': 'leaderboard entries',
+                'ordering': ['board', 'scope', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('board', 'scope', 'rank'), name='unique_leaderboard_rank')],
+            },
+        ),
+    ]
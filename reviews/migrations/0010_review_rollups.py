@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_leaderboards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContributorMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the reviews were written in')),
+                ('review_count', models.PositiveIntegerField()),
+                ('rating_sum', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['-month', 'contributor'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PublisherMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the reviews were written in')),
+                ('review_count', models.PositiveIntegerField()),
+                ('rating_sum', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['-month', 'publisher'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('high_water_mark', models.DateTimeField(help_text="Rows edited after this time haven't been rolled up yet")),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['date_edited'], name='reviews_rev_date_ed_ed0ccd_idx'),
+        ),
+        migrations.AddField(
+            model_name='contributormonthlyrollup',
+            name='contributor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='reviews.contributor'),
+        ),
+        migrations.AddField(
+            model_name='publishermonthlyrollup',
+            name='publisher',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='reviews.publisher'),
+        ),
+        migrations.AddIndex(
+            model_name='contributormonthlyrollup',
+            index=models.Index(fields=['month'], name='reviews_con_month_2e4dd9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contributormonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('contributor', 'month'), name='unique_contributor_month'),
+        ),
+        migrations.AddIndex(
+            model_name='publishermonthlyrollup',
+            index=models.Index(fields=['month'], name='reviews_pub_month_962bec_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='publishermonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('publisher', 'month'), name='unique_publisher_month'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:02
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_book_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.BigIntegerField(default=0, help_text='seq of the last ChangeEvent the consumer has processed')),
+                ('date_edited', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Model name of the changed row, e.g. book or bookcontributor', max_length=30)),
+                ('object_id', models.BigIntegerField(help_text='Primary key of the changed row')),
+                ('operation', models.CharField(choices=[('INSERT', 'Insert'), ('UPDATE', 'Update'), ('DELETE', 'Delete')], max_length=6)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text="The row's fields and the natural keys of the rows it points to (as before a delete)")),
+                ('date_created', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['model', 'seq'], name='reviews_cha_model_f172e2_idx')],
+            },
+        ),
+    ]
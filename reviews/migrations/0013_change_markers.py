@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_change_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookcontributor',
+            name='date_edited',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Date and time the link was last edited'),
+        ),
+        migrations.AddField(
+            model_name='contributor',
+            name='date_edited',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Date and time the contributor was last edited'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_change_markers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRowHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('key_digest', models.CharField(help_text="SHA-1 of the row's normalised natural key", max_length=40)),
+                ('row_digest', models.CharField(help_text="SHA-1 of the row's normalised fields", max_length=40)),
+                ('object_id', models.BigIntegerField(help_text='Primary key of the row it was imported into')),
+                ('date_imported', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'key_digest'), name='unique_import_row_key')],
+            },
+        ),
+    ]
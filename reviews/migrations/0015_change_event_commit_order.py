@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_events(apps, schema_editor):
+    # Events written before this migration have all committed: their id
+    # order is their feed order, and existing cursors stay valid.
+    ChangeEvent = apps.get_model('reviews', 'ChangeEvent')
+    ChangeEvent.objects.update(seq=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_import_row_hashes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='changeevent',
+            name='reviews_cha_model_f172e2_idx',
+        ),
+        migrations.RenameField(
+            model_name='changeevent',
+            old_name='seq',
+            new_name='id',
+        ),
+        migrations.AddField(
+            model_name='changeevent',
+            name='seq',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Position in the change feed, assigned once the change has committed', null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_events, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='changeevent',
+            options={'ordering': ['seq']},
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['model', 'seq'], name='reviews_cha_model_f172e2_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0015_change_event_commit_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, help_text='Lease of the worker running the job, renewed by its heartbeat; once it has passed, the job is taken back', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'locked_until'], name='reviews_job_status_783eba_idx'),
+        ),
+    ]
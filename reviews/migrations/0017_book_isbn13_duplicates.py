@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:33
+
+import reviews.isbn
+from django.db import migrations, models
+
+
+def backfill_duplicates(apps, schema_editor):
+    # 0007 left isbn13 empty on the newer of two books sharing an ISBN
+    # written two ways; now that isbn13 isn't unique they both get it, and
+    # lookups by ISBN return the oldest
+    Book = apps.get_model('reviews', 'Book')
+    updated = []
+    books = Book.objects.filter(isbn13__isnull=True).only('pk', 'isbn').order_by('pk')
+    for book in books.iterator(chunk_size=2000):
+        book.isbn13 = reviews.isbn.canonical_isbn(book.isbn)
+        if book.isbn13:
+            updated.append(book)
+    Book.objects.bulk_update(updated, ['isbn13'], batch_size=1000)
+
+
+def clear_duplicates(apps, schema_editor):
+    # Back to 0007's rule before the unique constraint returns
+    Book = apps.get_model('reviews', 'Book')
+    seen = set()
+    duplicates = []
+    books = Book.objects.filter(isbn13__isnull=False).only('pk', 'isbn13').order_by('pk')
+    for book in books.iterator(chunk_size=2000):
+        if book.isbn13 in seen:
+            duplicates.append(book.pk)
+        seen.add(book.isbn13)
+    Book.objects.filter(pk__in=duplicates).update(isbn13=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0016_job_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(db_index=True, max_length=20, unique=True, verbose_name='ISBN'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='isbn13',
+            field=models.CharField(db_index=True, editable=False, help_text='Canonical ISBN-13 (no hyphens), kept in sync with isbn on save', max_length=13, null=True, verbose_name='ISBN-13'),
+        ),
+        migrations.RunPython(backfill_duplicates, clear_duplicates),
+    ]
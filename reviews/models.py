@@ -1,8 +1,39 @@
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Lower, NullIf
+from django.utils import timezone
 
+from .isbn import canonical_isbn, validate_isbn
+from .utils import rating_stats
 
-class Publisher(models.Model):
+
+class IsbnDigits(models.Func):
+    """
+    ISBN with hyphens and spaces removed, the form the ISBN index stores.
+
+    The literals are part of the SQL rather than query parameters, otherwise
+    the database can't match the query against the index expression.
+    """
+
+    template = "REPLACE(REPLACE(%(expressions)s, '-', ''), ' ', '')"
+    output_field = models.CharField()
+
+
+class AtomicSaveMixin:
+    """
+    Run save() and its post_save handlers in one transaction, so the change
+    outbox (see reviews.outbox) can't miss or invent a write.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+class Publisher(AtomicSaveMixin, models.Model):
     """A company that publishes books."""
 
     name = models.CharField(
@@ -12,18 +43,25 @@ class Publisher(models.Model):
     )
     website = models.URLField(help_text="The publisher's website")
     email = models.EmailField(help_text="The publisher's email")
+    date_edited = models.DateTimeField(
+        auto_now=True,
+        db_index=True,  # MAX() for HTTP Last-Modified/ETag checks
+        help_text="Date and time the publisher was last edited"
+    )
 
     class Meta:
         ordering = ['name']
         indexes = [
             models.Index(fields=['name']),
+            # Case-insensitive natural key lookups (see reviews.lookups)
+            models.Index(Lower('name'), name='publisher_name_lower_idx'),
         ]
 
     def __str__(self):
         return self.name
 
 
-class Contributor(models.Model):
+class Contributor(AtomicSaveMixin, models.Model):
     """A contributor to a book, e.g author, editor, co-author"""
 
     first_names = models.CharField(
@@ -37,10 +75,17 @@ class Contributor(models.Model):
     )
     email = models.EmailField(help_text="The contributor's email")
     id = models.AutoField(primary_key=True)
+    date_edited = models.DateTimeField(
+        auto_now=True,
+        db_index=True,  # Delta exports (import_organised_data --since)
+        help_text="Date and time the contributor was last edited"
+    )
     class Meta:
         ordering = ['last_names', 'first_names']
         indexes = [
             models.Index(fields=['last_names', 'first_names']),
+            # Natural key used by the CSV importer (see reviews.lookups)
+            models.Index(Lower('email'), name='contributor_email_lower_idx'),
         ]
 
     def __str__(self):
@@ -52,7 +97,83 @@ class Contributor(models.Model):
         return f"{self.first_names} {self.last_names}"
 
 
-class Book(models.Model):
+# Book's maintained star counters, indexed by the number of stars
+STAR_FIELDS = {stars: f"stars_{stars}" for stars in range(1, 6)}
+
+# RollupState marker moved whenever rebuild_rating_counts() corrects a book.
+# The counters are derived data, so the rebuild leaves date_edited alone and
+# the HTTP validators (reviews.conditional) read this marker instead.
+RATING_COUNTS_STATE = "rating_counts"
+
+
+class BookQuerySet(models.QuerySet):
+    """
+    Rating annotations for any set of books.
+
+    with_ratings() and with_review_counts() read the star counters stored on
+    each book (kept up to date by reviews.signals), so they add no joins or
+    subqueries. with_rating_histogram() and rebuild_rating_counts() count the
+    review rows with a correlated subquery per book, which stays correct on
+    querysets that already join a multi-valued relation.
+    """
+
+    @staticmethod
+    def _review_aggregate(aggregate, **filters):
+        reviews = (
+            Review.objects.filter(book=OuterRef("pk"), **filters)
+            .order_by()
+            .values("book")
+            .annotate(value=aggregate)
+            .values("value")
+        )
+        return Subquery(reviews)
+
+    def with_review_counts(self):
+        """Annotate `review_count`."""
+        return self.annotate(review_count=sum((F(name) for name in STAR_FIELDS.values()), Value(0)))
+
+    def with_ratings(self):
+        """Annotate the exact mean `avg_rating` (None without reviews) and `review_count`."""
+        stars_total = sum((stars * F(name) for stars, name in STAR_FIELDS.items()), Value(0))
+        return self.with_review_counts().annotate(
+            avg_rating=Cast(stars_total, models.FloatField()) / NullIf(F("review_count"), 0)
+        )
+
+    def with_rating_histogram(self):
+        """Annotate `rating_1_count` ... `rating_5_count`, counted from the review rows."""
+        return self.annotate(**{
+            f"rating_{stars}_count": Coalesce(
+                self._review_aggregate(Count("pk"), rating=stars), Value(0)
+            )
+            for stars in STAR_FIELDS
+        })
+
+    def _counted_stars(self):
+        return {
+            name: Coalesce(self._review_aggregate(Count("pk"), rating=stars), Value(0))
+            for stars, name in STAR_FIELDS.items()
+        }
+
+    def stale_rating_counts(self):
+        """The books whose star counters disagree with their review rows."""
+        counted = {f"counted_{name}": count for name, count in self._counted_stars().items()}
+        return self.alias(**counted).exclude(**{name: F(f"counted_{name}") for name in STAR_FIELDS.values()})
+
+    def rebuild_rating_counts(self):
+        """
+        Recount the star counters of these books and return the pks of the
+        books that were off. Only those rows are written.
+        """
+        stale = list(self.stale_rating_counts().values_list("pk", flat=True))
+        if stale:
+            self.filter(pk__in=stale).update(**self._counted_stars())
+            RollupState.objects.update_or_create(
+                name=RATING_COUNTS_STATE, defaults={"high_water_mark": timezone.now()}
+            )
+        return stale
+
+
+class Book(AtomicSaveMixin, models.Model):
     """
     Represents a book with its publication details.
 
@@ -72,7 +193,17 @@ class Book(models.Model):
         max_length=20,
         verbose_name="ISBN",
         unique=True,  # ISBNs should be unique
-        db_index=True
+        db_index=True,
+        # Checksum checked by clean() on new and changed ISBNs only, so books
+        # stored before validation existed can still be edited
+    )
+    isbn13 = models.CharField(
+        max_length=13,
+        verbose_name="ISBN-13",
+        null=True,  # ISBNs entered before checksum validation may not parse
+        db_index=True,  # Not unique: see validate_unique()
+        editable=False,
+        help_text="Canonical ISBN-13 (no hyphens), kept in sync with isbn on save"
     )
     publisher = models.ForeignKey(
         Publisher,
@@ -84,25 +215,105 @@ class Book(models.Model):
         through="BookContributor",
         related_name='books'  # Access contributor's books via contributor.books.all()
     )
+    date_edited = models.DateTimeField(
+        auto_now=True,
+        db_index=True,  # MAX() for HTTP Last-Modified/ETag checks
+        help_text="Date and time the book or one of its reviews was last edited"
+    )
+    # Reviews per star rating, maintained by reviews.signals on every review
+    # change; rebuild with `manage.py rebuild_ratings` after raw SQL imports.
+    stars_1 = models.PositiveIntegerField(default=0, editable=False)
+    stars_2 = models.PositiveIntegerField(default=0, editable=False)
+    stars_3 = models.PositiveIntegerField(default=0, editable=False)
+    stars_4 = models.PositiveIntegerField(default=0, editable=False)
+    stars_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = BookQuerySet.as_manager()
 
     class Meta:
         ordering = ['-publication_date', 'title']
         indexes = [
             models.Index(fields=['title', 'publication_date']),
             models.Index(fields=['isbn']),
+            # Matches Meta.ordering so the admin changelist can walk an index
+            models.Index(fields=['-publication_date', 'title']),
+            # Case-insensitive title and formatting-insensitive ISBN lookups
+            models.Index(Lower('title'), name='book_title_lower_idx'),
+            models.Index(IsbnDigits('isbn'), name='book_isbn_digits_idx'),
         ]
 
     def __str__(self):
         return self.title
 
+    def clean(self):
+        super().clean()
+        stored = None
+        if not self._state.adding:
+            stored = Book.objects.filter(pk=self.pk).values_list("isbn", flat=True).first()
+        if self.isbn and self.isbn != stored:
+            try:
+                validate_isbn(self.isbn)
+            except ValidationError as error:
+                raise ValidationError({"isbn": error})
+
+    def validate_unique(self, exclude=None):
+        """
+        Also reject an ISBN another book has written differently
+        ("0-306-40615-2" vs "978-0-306-40615-7").
+
+        isbn13 has no unique constraint because existing catalogues hold such
+        pairs (migration 0017 keeps them both); lookups return the oldest.
+        """
+        super().validate_unique(exclude)
+        isbn13 = canonical_isbn(self.isbn)
+        if isbn13 is None or (exclude and "isbn" in exclude):
+            return
+        duplicate = Book.objects.filter(isbn13=isbn13).exclude(pk=self.pk).order_by("pk").first()
+        if duplicate is not None:
+            raise ValidationError({"isbn": ValidationError(
+                'This is the ISBN of "%(title)s" (%(isbn)s).',
+                code="unique",
+                params={"title": duplicate.title, "isbn": duplicate.isbn},
+            )})
+
+    def save(self, *args, **kwargs):
+        self.isbn13 = canonical_isbn(self.isbn)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "isbn" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "isbn13"}
+        elif update_fields is None and not self._state.adding and not kwargs.get("force_insert"):
+            # The star counters are only ever changed by UPDATEs in SQL
+            # (reviews.signals); an instance loaded before a review was
+            # added would otherwise write its stale counts back
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in STAR_FIELDS.values()
+            ]
+        super().save(*args, **kwargs)
+
     def get_average_rating(self):
-        """Calculate the average rating for this book."""
-        from django.db.models import Avg
-        result = self.reviews.aggregate(avg_rating=Avg('rating')) # type: ignore
-        return result['avg_rating'] or 0
+        """
+        Calculate the average rating for this book.
 
+        Uses the `avg_rating` annotation from Book.objects.with_ratings() when
+        present, and the stored star counters otherwise.
+        """
+        if hasattr(self, 'avg_rating'):
+            return self.avg_rating or 0
+        stats = self.rating_stats()
+        return stats['mean'] if stats else 0
+
+    @property
+    def rating_histogram(self):
+        """{stars: number of reviews}, from the stored star counters."""
+        return {stars: getattr(self, name) for stars, name in STAR_FIELDS.items()}
 
-class BookContributor(models.Model):
+    def rating_stats(self):
+        """Count, mean, median and 95% interval of the ratings (see utils.rating_stats)."""
+        return rating_stats(self.rating_histogram)
+
+
+class BookContributor(AtomicSaveMixin, models.Model):
     """
     A model that links a Book to a Contributor, specifying the
     contributor's role.
@@ -132,6 +343,11 @@ class BookContributor(models.Model):
         choices=ContributionRole.choices,
         max_length=20,
     )
+    date_edited = models.DateTimeField(
+        auto_now=True,
+        db_index=True,  # Delta exports (import_organised_data --since)
+        help_text="Date and time the link was last edited"
+    )
 
     class Meta:
         constraints = [
@@ -148,7 +364,7 @@ class BookContributor(models.Model):
     def __str__(self):
         return f"{self.contributor.full_name} - {self.get_role_display()} - {self.book.title}" #type: ignore[attr-defined]  # type: ignore[attr-defined]
 
-class Review(models.Model):
+class Review(AtomicSaveMixin, models.Model):
     """
     Represents a single user's review and rating for a specific book.
 
@@ -197,6 +413,8 @@ class Review(models.Model):
             models.Index(fields=['book', '-date_created']),
             models.Index(fields=['creator', '-date_created']),
             models.Index(fields=['-rating']),  # For getting top-rated reviews
+            models.Index(fields=['-date_created']),  # Default admin/list ordering
+            models.Index(fields=['date_edited']),  # Rollup high-water mark scans
         ]
 
     def __str__(self):
@@ -206,4 +424,315 @@ class Review(models.Model):
         """Validate rating before saving."""
         if not 1 <= self.rating <= 5:
             raise ValueError("Rating must be between 1 and 5")
+        # AtomicSaveMixin: the post_save handler updating the book's star
+        # counters runs in the same transaction as the review itself
         super().save(*args, **kwargs)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    One ranked book on a precomputed leaderboard.
+
+    Rebuilt as a whole by `reviews.leaderboards.build_leaderboards()`, so a
+    leaderboard page reads `size` rows from one index range.
+    """
+
+    class Board(models.TextChoices):
+        TOP = "top", "Top rated"
+        TRENDING = "trending", "Trending"
+
+    board = models.CharField(max_length=10, choices=Board.choices)
+    scope = models.CharField(
+        max_length=30,
+        help_text='"all", "publisher:<id>" or "year:<publication year>"'
+    )
+    rank = models.PositiveSmallIntegerField()
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    score = models.FloatField(help_text="Bayesian average rating (top) or decayed review activity (trending)")
+    date_computed = models.DateTimeField()
+
+    class Meta:
+        ordering = ['board', 'scope', 'rank']
+        constraints = [
+            # Also the index every leaderboard page reads
+            models.UniqueConstraint(fields=['board', 'scope', 'rank'], name='unique_leaderboard_rank'),
+        ]
+        verbose_name_plural = "leaderboard entries"
+
+    def __str__(self):
+        return f"{self.get_board_display()} {self.scope} #{self.rank}: {self.book_id}"  # type: ignore[attr-defined]
+
+
+class BookSimilarity(models.Model):
+    """
+    One "readers also liked" neighbour of a book, from co-reviews.
+
+    Rebuilt by `reviews.recommendations.build_recommendations()`; a book's
+    neighbours are read in rank order from the (book, rank) index.
+    """
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Cosine similarity of the two books' user-centred ratings")
+
+    class Meta:
+        ordering = ['book', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'rank'], name='unique_book_similarity_rank'),
+        ]
+        verbose_name_plural = "book similarities"
+
+    def __str__(self):
+        return f"{self.book_id} -> {self.similar_id} ({self.score:.2f})"  # type: ignore[attr-defined]
+
+
+class PublisherMonthlyRollup(models.Model):
+    """Reviews of a publisher's books per month, built by reviews.rollups."""
+
+    publisher = models.ForeignKey(Publisher, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField(help_text="First day of the month the reviews were written in")
+    review_count = models.PositiveIntegerField()
+    rating_sum = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-month', 'publisher']
+        constraints = [
+            models.UniqueConstraint(fields=['publisher', 'month'], name='unique_publisher_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.publisher_id} {self.month:%Y-%m}"  # type: ignore[attr-defined]
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+
+class ContributorMonthlyRollup(models.Model):
+    """Reviews of a contributor's books per month, built by reviews.rollups."""
+
+    contributor = models.ForeignKey(Contributor, on_delete=models.CASCADE, related_name='monthly_rollups')
+    month = models.DateField(help_text="First day of the month the reviews were written in")
+    review_count = models.PositiveIntegerField()
+    rating_sum = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-month', 'contributor']
+        constraints = [
+            models.UniqueConstraint(fields=['contributor', 'month'], name='unique_contributor_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.contributor_id} {self.month:%Y-%m}"  # type: ignore[attr-defined]
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+
+class RollupState(models.Model):
+    """Progress marker of an incrementally built rollup or delta export."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    high_water_mark = models.DateTimeField(
+        help_text="Rows edited after this time haven't been rolled up yet"
+    )
+
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class ChangeEvent(models.Model):
+    """
+    One insert, update or delete of a catalogue row, in the change outbox.
+
+    Written in the same transaction as the change itself (see
+    reviews.outbox). `seq` is handed out after the transaction commits and
+    only grows in commit order, so consumers keep the last one they
+    processed and ask for the events after it.
+    """
+
+    class Operation(models.TextChoices):
+        INSERT = "INSERT", "Insert"
+        UPDATE = "UPDATE", "Update"
+        DELETE = "DELETE", "Delete"
+
+    id = models.BigAutoField(primary_key=True)
+    seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        help_text="Position in the change feed, assigned once the change has committed"
+    )
+    model = models.CharField(
+        max_length=30,
+        help_text="Model name of the changed row, e.g. book or bookcontributor"
+    )
+    object_id = models.BigIntegerField(help_text="Primary key of the changed row")
+    operation = models.CharField(max_length=6, choices=Operation.choices)
+    payload = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="The row's fields and the natural keys of the rows it points to (as before a delete)"
+    )
+    date_created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['model', 'seq']),  # Feeds filtered by model
+        ]
+
+    def __str__(self):
+        return f"#{self.seq or '-'} {self.get_operation_display()} {self.model} {self.object_id}"  # type: ignore[attr-defined]
+
+
+class ChangeFeedCursor(models.Model):
+    """How far a named consumer of the change feed has got."""
+
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(
+        default=0,
+        help_text="seq of the last ChangeEvent the consumer has processed"
+    )
+    date_edited = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class ImportRowHash(models.Model):
+    """
+    Digest of the last imported CSV row for one natural key, so re-imports
+    can skip unchanged rows without loading them (see reviews.diff_import).
+    """
+
+    model = models.CharField(max_length=30)
+    key_digest = models.CharField(max_length=40, help_text="SHA-1 of the row's normalised natural key")
+    row_digest = models.CharField(max_length=40, help_text="SHA-1 of the row's normalised fields")
+    object_id = models.BigIntegerField(help_text="Primary key of the row it was imported into")
+    date_imported = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'key_digest'], name='unique_import_row_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.key_digest[:8]} -> {self.object_id}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work: a bulk admin action, an import or export,
+    or an aggregate rebuild.
+
+    Jobs are queued with `reviews.jobs.enqueue()` from the admin or views and
+    executed out of the request by `python manage.py run_jobs`.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    task = models.CharField(
+        max_length=200,
+        help_text="Dotted path of the function that performs the job"
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Keyword arguments passed to the task function"
+    )
+    queue = models.CharField(
+        max_length=50,
+        default="default",
+        help_text="Queue name; settings.REVIEWS_JOB_QUEUE_LIMITS caps how many run at once"
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        help_text="Jobs with a higher priority are picked up first"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        help_text="Failed jobs are retried with backoff until this many attempts"
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text="The job is not picked up before this time (used for retry backoff)"
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Lease of the worker running the job, renewed by its heartbeat; "
+                  "once it has passed, the job is taken back"
+    )
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-date_created']
+        indexes = [
+            # Worker polling: pending jobs by priority, then due time
+            models.Index(fields=['status', '-priority', 'run_after']),
+            models.Index(fields=['status', 'queue']),  # Running jobs per queue
+            models.Index(fields=['status', 'locked_until']),  # Expired leases
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.get_status_display()})"  # type: ignore[attr-defined]
+
+    def set_progress(self, progress, total=None):
+        """Record progress (which also renews the lease) without overwriting other fields of the row."""
+        self.progress = progress
+        fields = {'progress': progress}
+        if total is not None:
+            self.total = total
+            fields['total'] = total
+        self.heartbeat(**fields)
+
+    def heartbeat(self, **fields):
+        """Extend the lease of the running job (see reviews.jobs.JOB_LEASE_SECONDS)."""
+        from .jobs import lease_expiry
+
+        self.locked_until = fields['locked_until'] = lease_expiry()
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+
+class JobQueue(models.Model):
+    """
+    One row per queue with a REVIEWS_JOB_QUEUE_LIMITS entry. Workers lock it
+    while they count the queue's running jobs and claim one, so two of them
+    can't both take its last free slot (see reviews.jobs.claim_next_job).
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+
+    def __str__(self):
+        return self.name
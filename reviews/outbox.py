@@ -0,0 +1,147 @@
+"""
+Transactional outbox of catalogue changes.
+
+Every insert, update and delete of a Publisher, Book, Contributor,
+BookContributor or Review writes a ChangeEvent row in the same transaction
+as the change. Single saves and deletes are recorded by reviews.signals
+(AtomicSaveMixin keeps the save and its event together); the set-based
+paths in reviews.bulk and the benchmark seed call record_queryset()
+themselves, before a raw DELETE or after an UPDATE.
+
+Consumers read the events after the last seq they processed, from
+/api/changes/ or `manage.py consume_changes`, instead of rescanning the
+tables. Events are written without a seq: the row id is handed out when
+the transaction inserts the row, so on databases with concurrent writers
+a lower id can commit after a higher one, and a consumer that had
+already moved past it would never see it. assign_sequence() numbers the
+events once they are visible, i.e. committed, in one short transaction
+that serialises on a counter row, so an event committed later always
+gets a higher seq than every event already served, however long its
+transaction ran. Feed readers call it before every read.
+"""
+from django.db import transaction
+from django.db.models import F, Max, Min
+
+from .models import Book, BookContributor, ChangeEvent, ChangeFeedCursor, Contributor, Publisher, Review
+
+BATCH_SIZE = 1000
+# ChangeFeedCursor row holding the last seq handed out; consumer cursors
+# can't use names starting with "_"
+SEQUENCE_NAME = "_sequence"
+
+# Model -> values() paths stored in the payload. Related rows are named by
+# their natural keys as well, so consumers don't have to resolve our ids.
+PAYLOAD_FIELDS = {
+    Publisher: ("name", "website", "email"),
+    Contributor: ("first_names", "last_names", "email"),
+    Book: ("title", "isbn", "publication_date", "publisher_id", "publisher__name"),
+    BookContributor: ("book_id", "book__isbn", "contributor_id", "contributor__email", "role"),
+    Review: (
+        "book_id", "book__isbn", "creator_id", "creator__username",
+        "rating", "content", "date_created",
+    ),
+}
+MODEL_NAMES = {model._meta.model_name: model for model in PAYLOAD_FIELDS}
+# Payload paths that identify a row across databases, e.g. in the tombstones
+# of a delta export (see import_organised_data --since)
+NATURAL_KEYS = {
+    "publisher": ("name",),
+    "contributor": ("email",),
+    "book": ("isbn",),
+    "bookcontributor": ("book__isbn", "contributor__email", "role"),
+    "review": ("book__isbn", "creator__username"),
+}
+
+
+def _payload(instance):
+    payload = {}
+    for path in PAYLOAD_FIELDS[type(instance)]:
+        value = instance
+        for attr in path.split("__"):
+            value = getattr(value, attr, None)
+        payload[path] = value
+    return payload
+
+
+def record(instance, operation):
+    """Add an event for one saved or deleted instance."""
+    return ChangeEvent.objects.create(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        operation=operation,
+        payload=_payload(instance),
+    )
+
+
+def record_queryset(queryset, operation):
+    """
+    Add an event for every row of `queryset` and return how many.
+
+    For raw deletes call it before the DELETE, for raw updates after the
+    UPDATE, inside the same transaction.
+    """
+    model = queryset.model
+    rows = queryset.order_by("pk").values("pk", *PAYLOAD_FIELDS[model]).iterator(chunk_size=BATCH_SIZE)
+    batch, count = [], 0
+    for row in rows:
+        object_id = row.pop("pk")
+        batch.append(ChangeEvent(
+            model=model._meta.model_name, object_id=object_id, operation=operation, payload=row,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            ChangeEvent.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    ChangeEvent.objects.bulk_create(batch)
+    return count + len(batch)
+
+
+def assign_sequence():
+    """Number the committed events that have no seq yet, in id order, and return how many."""
+    with transaction.atomic():
+        # Writing the counter row first makes concurrent sequencers wait for
+        # each other (a row lock, or the database write lock on SQLite)
+        if not ChangeFeedCursor.objects.filter(name=SEQUENCE_NAME).update(position=F("position")):
+            ChangeFeedCursor.objects.get_or_create(
+                name=SEQUENCE_NAME,
+                defaults={"position": ChangeEvent.objects.aggregate(last=Max("seq"))["last"] or 0},
+            )
+        counter = ChangeFeedCursor.objects.get(name=SEQUENCE_NAME)
+        pending = ChangeEvent.objects.filter(seq__isnull=True)
+        bounds = pending.aggregate(first=Min("id"), last=Max("id"))
+        if bounds["first"] is None:
+            return 0
+        # One UPDATE: seq follows id within the batch and starts after the counter
+        numbered = pending.filter(id__range=(bounds["first"], bounds["last"])).update(
+            seq=F("id") - bounds["first"] + counter.position + 1
+        )
+        counter.position += bounds["last"] - bounds["first"] + 1
+        counter.save(update_fields=["position", "date_edited"])
+    return numbered
+
+
+def changes_after(seq, limit, models=None):
+    """The committed events after `seq`, oldest first; `models` is a list of model names."""
+    assign_sequence()
+    events = ChangeEvent.objects.filter(seq__gt=seq)
+    if models:
+        events = events.filter(model__in=models)
+    return list(events.order_by("seq")[:limit])
+
+
+def deletions_since(since):
+    """The DELETE events recorded after `since`, oldest first."""
+    return ChangeEvent.objects.filter(
+        operation=ChangeEvent.Operation.DELETE, date_created__gt=since
+    ).order_by("id")
+
+
+def serialize(event):
+    return {
+        "seq": event.seq,
+        "model": event.model,
+        "id": event.object_id,
+        "operation": event.operation,
+        "payload": event.payload,
+        "date": event.date_created,
+    }
@@ -0,0 +1,155 @@
+"""
+Full-page cache for anonymous GET requests, purged by surrogate keys.
+
+Views opt in with @cache_page_tagged(keys_func), which tags the response
+with surrogate keys such as "book:12" or "list:books". PageCacheMiddleware
+stores tagged responses for visitors without a session cookie. It answers
+later requests for the same URL straight from the cache, before the rest of
+the middleware stack or the view runs.
+
+It sits outside CompressionMiddleware, so pages are stored as sent: one
+entry per URL and negotiated encoding (br, gzip or none), and a hit is
+never compressed again.
+
+The cache has to be shared by every worker process (see the
+reviews.W002 check): purges made by run_jobs, loadcsv or the build_*
+commands only reach pages in the cache they write to.
+
+Purging doesn't delete pages. Every surrogate key has a version in the
+cache. A stored page remembers the versions it was rendered with, and
+purge_keys() bumps the versions so exactly the affected pages miss on
+their next request.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import parse_http_date_safe
+
+from .compression import choose_encoding
+
+PAGE_CACHE_ALIAS = getattr(settings, "PAGE_CACHE_ALIAS", "default")
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+# Query parameters that don't change the page (tracking, cache busters)
+PAGE_CACHE_IGNORED_PARAMS = set(getattr(settings, "PAGE_CACHE_IGNORED_PARAMS", ()))
+
+TAG_PREFIX = "pagetag:"
+PAGE_PREFIX = "page:"
+
+
+def _cache():
+    return caches[PAGE_CACHE_ALIAS]
+
+
+def page_cache_key(request):
+    """Cache key for a URL and encoding, keeping only the query params that affect the page."""
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in PAGE_CACHE_IGNORED_PARAMS and not name.startswith("utm_")
+        for value in values
+    )
+    url = f"{choose_encoding(request) or 'identity'} {request.get_host()}{request.path}?{urlencode(params)}"
+    return PAGE_PREFIX + hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+
+
+def tag_versions(keys):
+    """Return {key: version} for the given surrogate keys, creating missing ones."""
+    cache = _cache()
+    cache_keys = {TAG_PREFIX + key: key for key in keys}
+    found = cache.get_many(cache_keys)
+    missing = {k: time.time_ns() for k in cache_keys if k not in found}
+    if missing:
+        for k, version in missing.items():
+            cache.add(k, version, timeout=None)
+        found.update(cache.get_many(missing))
+    return {cache_keys[k]: version for k, version in found.items()}
+
+
+def purge_keys(*keys):
+    """Invalidate every cached page tagged with any of the surrogate `keys`."""
+    if keys:
+        _cache().set_many({TAG_PREFIX + key: time.time_ns() for key in keys}, timeout=None)
+
+
+def cache_page_tagged(keys_func):
+    """
+    Mark a view's responses as cacheable under the surrogate keys returned by
+    `keys_func(request, *args, **kwargs)`.
+
+    The key versions are read before the view runs, so a purge that happens
+    while the page is rendering still invalidates it.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            versions = tag_versions(keys_func(request, *args, **kwargs))
+            response = view(request, *args, **kwargs)
+            response.page_cache_versions = versions
+            response.headers["Surrogate-Key"] = " ".join(sorted(versions))
+            return response
+
+        return inner
+
+    return decorator
+
+
+class PageCacheMiddleware(MiddlewareMixin):
+    """
+    Serve and store @cache_page_tagged pages for anonymous visitors.
+
+    Split into process_request/process_response so MiddlewareMixin can run
+    it under WSGI and ASGI alike.
+    """
+
+    def process_request(self, request):
+        if not self._cacheable_request(request):
+            return None
+
+        key = page_cache_key(request)
+        cached = _cache().get(key)
+        if cached is not None:
+            versions, response = cached
+            if tag_versions(versions) == versions:
+                response.headers["X-Page-Cache"] = "HIT"
+                return get_conditional_response(
+                    request,
+                    etag=response.get("ETag"),
+                    last_modified=parse_http_date_safe(response.get("Last-Modified", "")),
+                    response=response,
+                )
+        # Only misses are stored on the way out
+        request.page_cache_key = key
+        return None
+
+    def process_response(self, request, response):
+        key = getattr(request, "page_cache_key", None)
+        if key is not None and self._cacheable_response(request, response):
+            response.headers["X-Page-Cache"] = "MISS"
+            _cache().set(key, (response.page_cache_versions, response), PAGE_CACHE_TIMEOUT)
+        return response
+
+    @staticmethod
+    def _cacheable_request(request):
+        return (
+            request.method in ("GET", "HEAD")
+            # Anyone with a session may be logged in or have flash messages
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    @staticmethod
+    def _cacheable_response(request, response):
+        return (
+            hasattr(response, "page_cache_versions")
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            # A page with a CSRF token is specific to this visitor
+            and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        )
@@ -0,0 +1,158 @@
+"""
+"Readers also liked" recommendations from co-reviews.
+
+build_recommendations() builds the sparse book x user matrix of ratings
+centred on each user's mean rating. Centring makes a 3 from a generous
+reviewer count against a book and a 3 from a harsh one count for it.
+The rows are L2-normalised and multiplied by the transpose block by
+block, which gives the cosine similarity of every book to every other
+book sharing a reviewer. The top K neighbours of each book are stored in
+BookSimilarity.
+
+With scipy the product is a sparse matrix multiplication. Without it the
+same sum runs over the per-user review lists in pure Python, which is
+slower but needs nothing extra. Either way memory stays at the matrix
+plus one block of results. Users with more than MAX_USER_REVIEWS reviews
+are left out: their cost grows with the square of their review count and
+they say little about which books go together.
+
+Each rebuild records its time in RollupState (the detail page's ETag and
+Last-Modified include it) and purges the cached pages of the books whose
+list of neighbours changed.
+"""
+import heapq
+from math import sqrt
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BookSimilarity, Review, RollupState
+from .page_cache import purge_keys
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Optional: pure Python fallback without them
+    np = sparse = None
+
+TOP_K = 10
+BLOCK_SIZE = 2000
+MAX_USER_REVIEWS = 1000
+# RollupState row holding the time of the last rebuild
+STATE_NAME = "recommendations"
+
+
+def _load_ratings(max_user_reviews):
+    """{user_id: [(book_id, centred rating)]} for users with 2..max reviews."""
+    by_user = {}
+    rows = Review.objects.order_by().values_list("creator_id", "book_id", "rating")
+    for user_id, book_id, rating in rows.iterator(chunk_size=20_000):
+        by_user.setdefault(user_id, []).append((book_id, rating))
+    centred = {}
+    for user_id, ratings in by_user.items():
+        # A single review pairs the book with nothing
+        if not 2 <= len(ratings) <= max_user_reviews:
+            continue
+        mean = sum(rating for _, rating in ratings) / len(ratings)
+        centred[user_id] = [(book_id, rating - mean) for book_id, rating in ratings]
+    return centred
+
+
+def _neighbours_scipy(by_user, top_k, block_size):
+    book_ids = sorted({book_id for ratings in by_user.values() for book_id, _ in ratings})
+    book_index = {book_id: i for i, book_id in enumerate(book_ids)}
+    rows, cols, values = [], [], []
+    for column, ratings in enumerate(by_user.values()):
+        for book_id, value in ratings:
+            rows.append(book_index[book_id])
+            cols.append(column)
+            values.append(value)
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(len(book_ids), len(by_user)))
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+    transposed = matrix.T.tocsr()
+
+    for start in range(0, len(book_ids), block_size):
+        block = (matrix[start:start + block_size] @ transposed).tocsr()
+        for offset in range(block.shape[0]):
+            lo, hi = block.indptr[offset], block.indptr[offset + 1]
+            columns, scores = block.indices[lo:hi], block.data[lo:hi]
+            keep = (columns != start + offset) & (scores > 0)
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores)
+            yield book_ids[start + offset], [
+                (book_ids[j], float(score)) for j, score in zip(columns[order], scores[order])
+            ]
+
+
+def _neighbours_python(by_user, top_k, block_size):
+    # One book (row) at a time, so block_size doesn't apply
+    by_book = {}
+    for user_id, ratings in by_user.items():
+        for book_id, value in ratings:
+            by_book.setdefault(book_id, []).append((user_id, value))
+    norms = {
+        book_id: sqrt(sum(value * value for _, value in ratings)) or 1.0
+        for book_id, ratings in by_book.items()
+    }
+    for book_id, ratings in by_book.items():
+        # Dot products with every book sharing a reviewer: one row of M @ M.T
+        dots = {}
+        for user_id, value in ratings:
+            for other_id, other_value in by_user[user_id]:
+                if other_id != book_id:
+                    dots[other_id] = dots.get(other_id, 0.0) + value * other_value
+        scores = (
+            (other_id, dot / (norms[book_id] * norms[other_id]))
+            for other_id, dot in dots.items()
+            if dot > 0
+        )
+        yield book_id, heapq.nlargest(top_k, scores, key=lambda item: item[1])
+
+
+def build_recommendations(top_k=TOP_K, block_size=BLOCK_SIZE, max_user_reviews=MAX_USER_REVIEWS):
+    """Recompute every book's neighbours and return the number stored."""
+    by_user = _load_ratings(max_user_reviews)
+    neighbours = _neighbours_scipy if sparse is not None else _neighbours_python
+    # Plain tuples until the write: far smaller than model instances
+    rows = [
+        (book_id, similar_id, rank, score)
+        for book_id, ranked in neighbours(by_user, top_k, block_size)
+        for rank, (similar_id, score) in enumerate(ranked, start=1)
+    ]
+    with transaction.atomic():
+        changed = _changed_books(rows)
+        BookSimilarity.objects.all().delete()
+        for start in range(0, len(rows), 2000):
+            BookSimilarity.objects.bulk_create(
+                BookSimilarity(book_id=book_id, similar_id=similar_id, rank=rank, score=score)
+                for book_id, similar_id, rank, score in rows[start:start + 2000]
+            )
+        RollupState.objects.update_or_create(name=STATE_NAME, defaults={"high_water_mark": timezone.now()})
+        transaction.on_commit(lambda: purge_keys(*(f"book:{pk}" for pk in changed)))
+    return len(rows)
+
+
+def _changed_books(rows):
+    """Ids of the books whose neighbours (in rank order) differ from the stored ones."""
+    stored, built = {}, {}
+    for book_id, similar_id in BookSimilarity.objects.order_by("book", "rank").values_list("book_id", "similar_id"):
+        stored.setdefault(book_id, []).append(similar_id)
+    # rows are grouped by book, in rank order
+    for book_id, similar_id, _, _ in rows:
+        built.setdefault(book_id, []).append(similar_id)
+    return [book_id for book_id in stored.keys() | built.keys() if stored.get(book_id) != built.get(book_id)]
+
+
+def similar_books(book_id):
+    """The stored neighbours of a book, best first, with the similar book joined."""
+    return (
+        BookSimilarity.objects
+        .filter(book_id=book_id)
+        .select_related("similar")
+        .order_by("rank")
+    )
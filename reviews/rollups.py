@@ -0,0 +1,173 @@
+"""
+Monthly review rollups per publisher and per contributor.
+
+Reporting reads PublisherMonthlyRollup / ContributorMonthlyRollup instead
+of aggregating the live Review and BookContributor tables.
+build_rollups() streams (book, rating, date) columns of the reviews in
+chunks and reduces each chunk by group. It uses numpy (np.unique +
+np.bincount) when installed, and a plain dict pass otherwise.
+
+Incremental runs only rebuild the months touched since the high-water
+mark in RollupState: months holding a review whose date_edited is newer,
+or a review of a book whose date_edited is newer (reviews, contributor
+links and publisher changes all touch the book), and the months of the
+reviews deleted since. A deleted review leaves no row behind to find, so
+those months come from the review DELETE events in the change outbox
+(reviews.outbox), which ORM deletes, cascades from books and publishers,
+and the raw deletes in reviews.bulk all record with the review's
+date_created.
+"""
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Book, BookContributor, ChangeEvent, ContributorMonthlyRollup, PublisherMonthlyRollup, Review,
+    RollupState,
+)
+
+try:
+    import numpy as np
+except ImportError:  # Optional: pure Python reductions without it
+    np = None
+
+STATE_NAME = "monthly_reviews"
+CHUNK_SIZE = 20_000
+# Group keys are packed into one integer, id * MONTHS + month number, so
+# numpy can reduce them as a plain int64 column
+MONTHS = 100_000
+
+
+def _month_number(value):
+    local = timezone.localtime(value)
+    return local.year * 12 + local.month - 1
+
+
+def _unpack(key):
+    object_id, month_number = divmod(key, MONTHS)
+    year, month = divmod(month_number, 12)
+    return object_id, date(year, month + 1, 1)
+
+
+def _month_range(month):
+    start = timezone.make_aware(datetime(month.year, month.month, 1))
+    if month.month == 12:
+        end = timezone.make_aware(datetime(month.year + 1, 1, 1))
+    else:
+        end = timezone.make_aware(datetime(month.year, month.month + 1, 1))
+    return start, end
+
+
+def _reduce(groups, ratings, totals):
+    """Add the review count and rating sum of each group key to `totals`."""
+    if np is not None and groups:
+        keys, inverse = np.unique(np.array(groups, dtype=np.int64), return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=np.array(ratings, dtype=np.int64))
+        pairs = zip(keys.tolist(), counts.tolist(), sums.tolist())
+    else:
+        partial = {}
+        for key, rating in zip(groups, ratings):
+            count, total = partial.get(key, (0, 0))
+            partial[key] = (count + 1, total + rating)
+        pairs = ((key, count, total) for key, (count, total) in partial.items())
+    for key, count, total in pairs:
+        old_count, old_total = totals.get(key, (0, 0))
+        totals[key] = (old_count + count, old_total + int(total))
+
+
+def _changed_months(since):
+    """Months whose rollups may be out of date after `since`."""
+    changed = Review.objects.filter(Q(date_edited__gt=since) | Q(book__date_edited__gt=since))
+    months = {dt.date() for dt in changed.datetimes("date_created", "month")}
+    deleted = ChangeEvent.objects.filter(
+        model="review", operation=ChangeEvent.Operation.DELETE, date_created__gt=since
+    ).values_list("payload__date_created", flat=True)
+    for date_created in deleted.iterator():
+        year, month = divmod(_month_number(datetime.fromisoformat(date_created)), 12)
+        months.add(date(year, month + 1, 1))
+    return months
+
+
+def _compute(months):
+    """({(publisher_id, month): (count, sum)}, {(contributor_id, month): (count, sum)}) for `months`."""
+    reviews = Review.objects.order_by()
+    if months is not None:
+        ranges = Q()
+        for month in months:
+            start, end = _month_range(month)
+            ranges |= Q(date_created__gte=start, date_created__lt=end)
+        reviews = reviews.filter(ranges)
+
+    # Small lookup tables instead of joining them into every review row
+    publisher_of = dict(Book.objects.order_by().values_list("pk", "publisher_id").iterator())
+    contributors_of = {}
+    for book_id, contributor_id in (
+        BookContributor.objects.order_by().values_list("book_id", "contributor_id").distinct().iterator()
+    ):
+        contributors_of.setdefault(book_id, []).append(contributor_id)
+
+    by_publisher, by_contributor = {}, {}
+    publisher_groups, contributor_groups, ratings, contributor_ratings = [], [], [], []
+
+    def flush():
+        _reduce(publisher_groups, ratings, by_publisher)
+        _reduce(contributor_groups, contributor_ratings, by_contributor)
+        for column in (publisher_groups, contributor_groups, ratings, contributor_ratings):
+            column.clear()
+
+    rows = reviews.values_list("book_id", "rating", "date_created").iterator(chunk_size=CHUNK_SIZE)
+    for book_id, rating, date_created in rows:
+        month_number = _month_number(date_created)
+        publisher_groups.append(publisher_of[book_id] * MONTHS + month_number)
+        ratings.append(rating)
+        for contributor_id in contributors_of.get(book_id, ()):
+            contributor_groups.append(contributor_id * MONTHS + month_number)
+            contributor_ratings.append(rating)
+        if len(ratings) >= CHUNK_SIZE:
+            flush()
+    flush()
+    return (
+        {_unpack(key): value for key, value in by_publisher.items()},
+        {_unpack(key): value for key, value in by_contributor.items()},
+    )
+
+
+def build_rollups(full=False):
+    """Rebuild the changed (or, with `full`, all) months; return the months rebuilt."""
+    state = RollupState.objects.filter(name=STATE_NAME).first()
+    # Taken before reading, so edits made during the build are picked up next time
+    started = timezone.now()
+    months = None if full or state is None else _changed_months(state.high_water_mark)
+    if months == set():
+        RollupState.objects.filter(name=STATE_NAME).update(high_water_mark=started)
+        return 0
+
+    by_publisher, by_contributor = _compute(months)
+    with transaction.atomic():
+        if months is None:
+            PublisherMonthlyRollup.objects.all().delete()
+            ContributorMonthlyRollup.objects.all().delete()
+        else:
+            PublisherMonthlyRollup.objects.filter(month__in=months).delete()
+            ContributorMonthlyRollup.objects.filter(month__in=months).delete()
+        PublisherMonthlyRollup.objects.bulk_create(
+            (
+                PublisherMonthlyRollup(publisher_id=publisher_id, month=month, review_count=count, rating_sum=total)
+                for (publisher_id, month), (count, total) in by_publisher.items()
+            ),
+            batch_size=1000,
+        )
+        ContributorMonthlyRollup.objects.bulk_create(
+            (
+                ContributorMonthlyRollup(contributor_id=contributor_id, month=month, review_count=count, rating_sum=total)
+                for (contributor_id, month), (count, total) in by_contributor.items()
+            ),
+            batch_size=1000,
+        )
+        RollupState.objects.update_or_create(name=STATE_NAME, defaults={"high_water_mark": started})
+    if months is None:
+        months = {month for _, month in by_publisher}
+    return len(months)
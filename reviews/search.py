@@ -0,0 +1,66 @@
+from django.db.models import Prefetch, Q
+
+from .isbn import canonical_isbn
+from .models import Book, BookContributor
+
+
+def search_filter(query, search_fields):
+    """
+    Build the Q object matching `query` in any of the selected `search_fields`.
+
+    `search_fields` are the values of SearchForm.SEARCH_TYPE. A query that
+    parses as an ISBN only matches that ISBN: one unique-index lookup, none
+    of the other (substring) conditions.
+    """
+    isbn13 = isbn_query(query, search_fields)
+    if isbn13:
+        return Q(isbn13=isbn13)
+
+    # Build dynamic Q object for all search conditions
+    q_objects = Q()
+
+    for field_name in search_fields:
+        if field_name == 'title':
+            q_objects |= Q(title__icontains=query)
+
+        elif field_name == 'isbn':
+            q_objects |= Q(isbn__icontains=query)
+
+        elif field_name == 'publisher':
+            q_objects |= Q(publisher__name__icontains=query)
+
+        elif field_name == 'contributor':
+            q_objects |= (
+                Q(contributors__first_names__icontains=query) |
+                Q(contributors__last_names__icontains=query)
+            )
+    return q_objects
+
+
+def isbn_query(query, search_fields):
+    """The canonical ISBN-13 if this is an ISBN search for a valid ISBN."""
+    return canonical_isbn(query) if 'isbn' in search_fields else None
+
+
+def search_books(query, search_fields):
+    """
+    Return the books matching `query` in any of the selected `search_fields`.
+
+    Publisher and contributor rows used by the results template are loaded
+    up front.
+    """
+    books = Book.objects.filter(search_filter(query, search_fields))
+    if not isbn_query(query, search_fields):
+        books = books.distinct()  # Remove duplicates from many-to-many
+    # Single optimized query with all joins
+    return (
+        books
+        .select_related('publisher')  # Join publisher table
+        .prefetch_related(
+            # The template lists book.book_contributors with each contributor
+            Prefetch(
+                'book_contributors',
+                queryset=BookContributor.objects.select_related('contributor'),
+            )
+        )
+    )
@@ -0,0 +1,156 @@
+"""
+Sharded, parallel export for `import_organised_data --shard-size`.
+
+Each model is split into primary key ranges of `shard_size` rows each
+(the last one holds the rest). The boundaries are found by keyset seeks
+on the primary key index: from the first pk of a range, the
+`shard_size`-th pk is its last. Sparse or skewed pks therefore still
+give every worker the same amount of work. Every shard is written by
+a worker process with its own database connection, as a small sectional
+CSV of its own: a "content:<Model>" line, the header and the rows in pk
+order. Any shard can be loaded on its own with loadcsv.
+
+manifest.json lists the shards of each model in order, with their pk
+ranges, row counts and sizes. merge_shards() concatenates them into a
+single sectional file in the format of the unsharded export.
+
+Workers are started with "spawn", so they share nothing with the parent
+(connections included) and behave the same on every platform. That is
+also why this module doesn't import the models at the top: a spawned
+worker imports it before Django is set up.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _command():
+    from reviews.management.commands.import_organised_data import Command
+
+    # Per-section progress lines go nowhere: the parent reports shards
+    return Command(stdout=StringIO(), stderr=StringIO())
+
+
+def export_shard(task):
+    """Write one shard file and return its manifest entry."""
+    from django.apps import apps
+
+    from reviews.management.commands.import_organised_data import MODEL_EXPORT_CONFIG
+
+    Model = apps.get_model(task["model"])
+    since = datetime.fromisoformat(task["since"]) if task["since"] else None
+    pk_range = (task["pk_min"], task["pk_max"]) if task["pk_min"] is not None else None
+    path = Path(task["path"])
+    with open(path, "w", newline="", encoding="utf-8") as shard_file:
+        shard_file.write(f"content:{Model.__name__}\n")
+        rows = _command()._write_model_section(
+            shard_file, Model, MODEL_EXPORT_CONFIG[Model]["link_field"], since, pk_range
+        )
+    return {**task, "path": path.name, "rows": rows, "bytes": path.stat().st_size}
+
+
+def _pk_ranges(queryset, shard_size):
+    """Inclusive (first pk, last pk) of consecutive runs of `shard_size` rows of `queryset`."""
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    ranges = []
+    first = pks.first()
+    while first is not None:
+        last = next(iter(pks.filter(pk__gte=first)[shard_size - 1:shard_size]), None)
+        if last is None:
+            ranges.append((first, pks.last()))
+            break
+        ranges.append((first, last))
+        first = pks.filter(pk__gt=last).first()
+    return ranges
+
+
+def plan_shards(models, since, shard_size, directory):
+    """One task per pk range of each model (a single unbounded one for empty selections)."""
+    tasks = []
+    for Model in models:
+        queryset = Model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(date_edited__gt=since)
+        ranges = _pk_ranges(queryset, shard_size) or [(None, None)]
+        for index, (low, high) in enumerate(ranges):
+            tasks.append({
+                "model": Model._meta.label,
+                "section": Model.__name__,
+                "path": str(directory / f"{Model.__name__.lower()}_{index:04d}.csv"),
+                "since": since.isoformat() if since else None,
+                "pk_min": low,
+                "pk_max": high,
+            })
+    return tasks
+
+
+def merge_shards(directory, shards, path):
+    """Concatenate the shards (in manifest order) into one sectional CSV."""
+    directory = Path(directory)
+    previous_section = None
+    with open(path, "w", newline="", encoding="utf-8") as merged:
+        for shard in shards:
+            with open(directory / shard["path"], newline="", encoding="utf-8") as shard_file:
+                shard_file.readline()  # content:<Section>
+                header = shard_file.readline()
+                if shard["section"] != previous_section:
+                    merged.write(f"\ncontent:{shard['section']}\n")
+                    merged.write(header)
+                    previous_section = shard["section"]
+                shutil.copyfileobj(shard_file, merged, 1 << 20)
+
+
+def export_sharded(models, directory, shard_size, since=None, workers=None, progress=None):
+    """
+    Export `models` into shard files under `directory` and return the
+    manifest dict. `progress` is called with each finished shard's entry.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tasks = plan_shards(models, since, shard_size, directory)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+
+    if workers == 1:
+        done = [_report(progress, shard) for shard in map(export_shard, tasks)]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=_init_worker) as pool:
+            done = [_report(progress, shard) for shard in pool.imap_unordered(export_shard, tasks)]
+
+    # Back in model and pk order, whichever worker finished first
+    order = {task["path"]: index for index, task in enumerate(tasks)}
+    shards = sorted(done, key=lambda shard: order[str(directory / shard["path"])])
+    return {
+        "created": datetime.now().astimezone().isoformat(),
+        "since": since.isoformat() if since else None,
+        "shard_size": shard_size,
+        "workers": workers,
+        "rows": {
+            section: sum(shard["rows"] for shard in shards if shard["section"] == section)
+            for section in dict.fromkeys(shard["section"] for shard in shards)
+        },
+        "shards": shards,
+    }
+
+
+def write_manifest(directory, manifest):
+    with open(Path(directory) / MANIFEST_NAME, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def _report(progress, shard):
+    if progress is not None:
+        progress(shard)
+    return shard
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import outbox
+from .models import STAR_FIELDS, Book, BookContributor, ChangeEvent, Contributor, Publisher, Review
+from .page_cache import purge_keys
+
+
+@receiver([post_save, post_delete], sender=Review, dispatch_uid="touch_book_on_review_change")
+@receiver([post_save, post_delete], sender=BookContributor, dispatch_uid="touch_book_on_contribution_change")
+def touch_book(sender, instance, **kwargs):
+    """Reviews and contributors are shown with the book, so changing them marks the book as edited."""
+    Book.objects.filter(pk=instance.book_id).update(date_edited=timezone.now())
+
+
+def _add_star(book_id, rating, delta):
+    field = STAR_FIELDS[rating]
+    Book.objects.filter(pk=book_id).update(**{field: F(field) + delta})
+
+
+@receiver(pre_save, sender=Review, dispatch_uid="remember_review_rating")
+def remember_review_rating(sender, instance, **kwargs):
+    # The counters need the rating (and book) the review had before this save
+    instance._counted_as = None
+    if instance.pk is not None and not kwargs.get("raw"):
+        instance._counted_as = (
+            Review.objects.filter(pk=instance.pk).values_list("book_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Review, dispatch_uid="count_review_stars")
+def count_review_stars(sender, instance, **kwargs):
+    """Keep the book's star counters in step (Review.save makes this atomic with the save)."""
+    if kwargs.get("raw"):
+        return  # Fixtures carry the book's counters themselves
+    previous = getattr(instance, "_counted_as", None)
+    current = (instance.book_id, instance.rating)
+    if previous == current:
+        return
+    if previous is not None:
+        _add_star(*previous, -1)
+    _add_star(*current, 1)
+
+
+@receiver(post_delete, sender=Review, dispatch_uid="uncount_review_stars")
+def uncount_review_stars(sender, instance, **kwargs):
+    # Deletes send post_delete inside the deletion's transaction
+    _add_star(instance.book_id, instance.rating, -1)
+
+
+@receiver(post_save, sender=Contributor, dispatch_uid="touch_books_on_contributor_change")
+def touch_contributor_books(sender, instance, **kwargs):
+    Book.objects.filter(contributors=instance).update(date_edited=timezone.now())
+
+
+def _purge_on_commit(*keys):
+    # Purging before commit would let a request re-cache the old data
+    transaction.on_commit(lambda: purge_keys(*keys))
+
+
+@receiver([post_save, post_delete], sender=Review, dispatch_uid="purge_pages_on_review_change")
+def purge_review_pages(sender, instance, **kwargs):
+    # The list page shows each book's rating and review count
+    _purge_on_commit(f"book:{instance.book_id}", "list:books")
+
+
+@receiver([post_save, post_delete], sender=Book, dispatch_uid="purge_pages_on_book_change")
+def purge_book_pages(sender, instance, **kwargs):
+    _purge_on_commit(f"book:{instance.pk}", "list:books")
+
+
+@receiver([post_save, post_delete], sender=Publisher, dispatch_uid="purge_pages_on_publisher_change")
+def purge_publisher_pages(sender, instance, **kwargs):
+    _purge_on_commit(f"publisher:{instance.pk}", "list:books")
+
+
+def record_save(sender, instance, created, **kwargs):
+    # Raw saves (loaddata) are recorded too: they change what consumers hold
+    outbox.record(instance, ChangeEvent.Operation.INSERT if created else ChangeEvent.Operation.UPDATE)
+
+
+def record_delete(sender, instance, **kwargs):
+    outbox.record(instance, ChangeEvent.Operation.DELETE)
+
+
+for _model in outbox.PAYLOAD_FIELDS:
+    post_save.connect(record_save, sender=_model, dispatch_uid=f"outbox_save_{_model._meta.model_name}")
+    post_delete.connect(record_delete, sender=_model, dispatch_uid=f"outbox_delete_{_model._meta.model_name}")
@@ -0,0 +1,240 @@
+"""
+Production static file pipeline that needs no external services.
+
+`collectstatic` with HashedCompressedStaticFilesStorage minifies CSS/JS,
+fingerprints every file name with a content hash (ManifestStaticFilesStorage)
+and writes pre-compressed .gz (and .br when the optional `brotli` package is
+installed) copies. StaticFilesMiddleware then serves STATIC_ROOT from the app
+server, choosing a pre-compressed copy the client accepts. Hashed files get
+far-future immutable cache headers, so repeat visits fetch nothing.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip copies are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".html", ".txt", ".json", ".map"}
+# Compressing tiny files saves nothing once headers are counted
+MIN_COMPRESS_SIZE = 256
+# "name.0123456789ab.css", the pattern ManifestStaticFilesStorage produces
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=60"
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    # Only after ":" - "a :hover" and "a:hover" are different selectors
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+# A "/" after one of these (or at the start) begins a regex literal, not a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+
+
+def _js_line_modes(text):
+    """
+    The lexical mode ("code", "template", "string", "comment", "regex") at
+    the start and at the end of each line of `text`, or None when the text
+    can't be followed (unterminated literal, unbalanced template).
+    """
+    modes, mode, quote = [], "code", None
+    start = "code"
+    template_depths = []  # Open "{" inside each enclosing ${...}
+    last, word = None, ""  # Last significant character / identifier in code
+    i, length = 0, len(text)
+    while i < length:
+        char = text[i]
+        if char == "\n":
+            if mode == "string":
+                return None  # Unescaped newline in a quoted string
+            modes.append((start, "code" if mode == "line" else mode))
+            if mode == "line":
+                mode = "code"
+            start = mode
+        elif mode == "code":
+            nxt = text[i + 1:i + 2]
+            if char in "'\"":
+                mode, quote = "string", char
+            elif char == "`":
+                mode = "template"
+            elif char == "/" and nxt == "/":
+                mode = "line"
+            elif char == "/" and nxt == "*":
+                mode, i = "comment", i + 1
+            elif char == "/" and (last is None or last in REGEX_PRECEDERS or word in REGEX_KEYWORDS):
+                mode = "regex"
+            elif char == "{" and template_depths:
+                template_depths[-1] += 1
+            elif char == "}" and template_depths:
+                if template_depths[-1]:
+                    template_depths[-1] -= 1
+                else:
+                    template_depths.pop()
+                    mode = "template"
+            if not char.isspace() and mode == "code":
+                word = word + char if char.isalnum() or char in "_$" else ""
+                last = char
+            elif mode in ("string", "template", "regex"):
+                last, word = "a", ""  # A literal ends like an operand
+        elif mode in ("string", "template", "regex", "class"):
+            if char == "\\":
+                i += 1
+                if text[i:i + 1] == "\n":
+                    modes.append((start, mode))
+                    start = mode
+            elif mode == "string" and char == quote:
+                mode = "code"
+            elif mode == "template" and char == "`":
+                mode = "code"
+            elif mode == "template" and text.startswith("${", i):
+                template_depths.append(0)
+                mode, i = "code", i + 1
+                last, word = "{", ""
+            elif mode == "regex" and char == "[":
+                mode = "class"
+            elif mode == "class" and char == "]":
+                mode = "regex"
+            elif mode == "regex" and char == "/":
+                mode = "code"
+        elif mode == "comment" and text.startswith("*/", i):
+            mode, i = "code", i + 1
+        i += 1
+    if mode not in ("code", "line") or template_depths:
+        return None
+    modes.append((start, "code"))
+    return modes
+
+
+def minify_js(text):
+    # Deliberately conservative: drop indentation, trailing whitespace, blank
+    # lines and whole-line // comments, but only outside strings, template
+    # literals, regexes and block comments, whose contents are left as is.
+    modes = _js_line_modes(text)
+    if modes is None:
+        return text
+    lines = []
+    for line, (start, end) in zip(text.split("\n"), modes):
+        if start == "code":
+            line = line.lstrip()
+            if not line.strip() or line.startswith("//"):
+                continue
+        if end == "code":
+            line = line.rstrip()
+        lines.append(line)
+    return "\n".join(lines)
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+class HashedCompressedStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also minifies and pre-compresses files."""
+
+    def _save(self, name, content):
+        minify = MINIFIERS.get(Path(name).suffix)
+        # Already minified vendor files (e.g. the admin's *.min.js) are left alone
+        if minify and ".min." not in name:
+            # The content may already have been read to compute its hash
+            content.seek(0)
+            text = content.read().decode("utf-8")
+            content = ContentFile(minify(text).encode("utf-8"))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if Path(hashed_name).suffix in COMPRESSIBLE_EXTENSIONS:
+                self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name):
+        path = self.path(name)
+        data = Path(path).read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        # mtime=0 keeps the .gz output identical between deploys
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                Path(path + suffix).write_bytes(compressed)
+
+
+class StaticFilesMiddleware(MiddlewareMixin):
+    """
+    Serve collected files from STATIC_ROOT when DEBUG is off.
+
+    In development runserver's own static handler is used instead. Works
+    under WSGI and ASGI (MiddlewareMixin provides the async path).
+    """
+
+    # Content-Encoding for each pre-compressed suffix, in order of preference
+    ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = settings.STATIC_ROOT
+
+    def process_request(self, request):
+        if settings.DEBUG or not request.path.startswith(self.prefix):
+            return None
+        if request.method not in ("GET", "HEAD"):
+            return None
+        return self.serve(request, request.path[len(self.prefix):])
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:  # Path traversal attempt
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        response = get_conditional_response(request, last_modified=int(stat.st_mtime))
+        if response is None:
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            accepted = request.headers.get("Accept-Encoding", "")
+            serve_path, encoding = path, None
+            for candidate, suffix in self.ENCODINGS:
+                if candidate in accepted and os.path.isfile(path + suffix):
+                    serve_path, encoding = path + suffix, candidate
+                    break
+
+            response = FileResponse(open(serve_path, "rb"), content_type=content_type)
+            response.headers.pop("Content-Disposition", None)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Last-Modified"] = http_date(stat.st_mtime)
+            patch_vary_headers(response, ("Accept-Encoding",))
+
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(name) else DEFAULT_CACHE_CONTROL
+        )
+        return response
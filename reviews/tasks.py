@@ -0,0 +1,127 @@
+"""
+Background tasks that can be queued from the admin or views.
+
+Each task is called by the worker as `task(job, **params)` (see
+`reviews.jobs`); the returned string is stored as the job's message.
+"""
+import sys
+from io import BytesIO, StringIO
+
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management import call_command
+from django.urls import reverse
+
+from .models import Book
+
+BROWSER_ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def _run_command(name, **options):
+    out = StringIO()
+    call_command(name, stdout=out, stderr=out, **options)
+    # Keep the tail: large imports log a line per created row
+    return out.getvalue()[-5000:]
+
+
+def import_csv(job, csv_path):
+    """Load a sectional CSV file with the `loadcsv` command."""
+    return _run_command("loadcsv", csv=csv_path)
+
+
+def merge_csv(job, csv_path):
+    """Apply a full or delta export with `loadcsv --merge`."""
+    return _run_command("loadcsv", csv=csv_path, merge=True)
+
+
+def export_all(job):
+    """Write every model to a sectional CSV with `import_organised_data`."""
+    return _run_command("import_organised_data")
+
+
+def export_changes(job):
+    """Write the rows changed since the last run (and tombstones) with `import_organised_data --incremental`."""
+    return _run_command("import_organised_data", incremental=True)
+
+
+def rebuild_ratings(job):
+    """Recount the star rating counters of every book from the reviews."""
+    return _run_command("rebuild_ratings")
+
+
+def build_leaderboards(job):
+    """Recompute the top rated and trending leaderboards."""
+    return _run_command("build_leaderboards")
+
+
+def build_rollups(job):
+    """Update the monthly review rollups shown in the admin dashboard."""
+    return _run_command("build_rollups")
+
+
+def build_recommendations(job):
+    """Recompute the "readers also liked" neighbours of every book."""
+    return _run_command("build_recommendations")
+
+
+def _visitor_request(host, path):
+    """A GET for `path` on `host` from a browser with no cookies, as the WSGI server would build it."""
+    return WSGIRequest({
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "443",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "HTTP_ACCEPT_ENCODING": BROWSER_ACCEPT_ENCODING,
+        "wsgi.url_scheme": "https",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+    })
+
+
+def warm_page_cache(job, host, limit=100):
+    """
+    Render the book list and the most reviewed book pages into the page cache.
+
+    `host` must be the public host name, since it is part of the cache key.
+    Pages are stored in the encoding a browser negotiates, the variant most
+    visitors ask for. This only helps web workers when CACHES points at a
+    shared cache.
+    """
+    # Anonymous requests through the project's own middleware stack, so
+    # PageCacheMiddleware stores every page exactly as a visitor gets it
+    handler = BaseHandler()
+    handler.load_middleware()
+    book_ids = (
+        Book.objects.with_review_counts()
+        .order_by("-review_count")
+        .values_list("pk", flat=True)[:limit]
+    )
+    paths = ["/books/"] + [reverse("book_detail", args=[pk]) for pk in book_ids]
+    job.set_progress(0, total=len(paths))
+    failed = 0
+    for done, path in enumerate(paths, start=1):
+        response = handler.get_response(_visitor_request(host, path))
+        response.close()
+        failed += response.status_code != 200
+        job.set_progress(done)
+    return f"Warmed {len(paths) - failed} pages ({failed} failed)."
+
+
+# Tasks offered in the admin "Add job" form, with the queue they run on.
+# Imports and exports share one queue so REVIEWS_JOB_QUEUE_LIMITS can keep
+# them from competing for the database.
+ADMIN_TASKS = {
+    "reviews.tasks.import_csv": ("Import CSV file (params: csv_path)", "data"),
+    "reviews.tasks.merge_csv": ("Merge an exported CSV file (params: csv_path)", "data"),
+    "reviews.tasks.export_all": ("Export all models to CSV", "data"),
+    "reviews.tasks.export_changes": ("Export the changes since the last delta export", "data"),
+    "reviews.tasks.warm_page_cache": ("Warm the page cache (params: host, limit)", "default"),
+    "reviews.tasks.rebuild_ratings": ("Recount every book's star ratings", "data"),
+    "reviews.tasks.build_leaderboards": ("Recompute the leaderboards", "default"),
+    "reviews.tasks.build_rollups": ("Update the monthly review rollups", "data"),
+    "reviews.tasks.build_recommendations": ("Recompute book recommendations", "data"),
+}
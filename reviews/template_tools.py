@@ -0,0 +1,58 @@
+"""
+Template helpers for the production template profile (see TEMPLATES in
+mysite/settings.py).
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.template import TemplateSyntaxError
+from django.template.backends.django import DjangoTemplates, Template
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+
+def app_template_names(app_label="reviews"):
+    """Names of every template shipped in an app's templates/ directory."""
+    root = Path(apps.get_app_config(app_label).path) / "templates"
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob("*.html"))
+
+
+def precompile_templates(app_label="reviews"):
+    """
+    Compile every template of the app into the cached loader.
+
+    Returns {template name: error message} for templates that don't compile.
+    """
+    errors = {}
+    for name in app_template_names(app_label):
+        try:
+            get_template(name)
+        except TemplateSyntaxError as e:
+            errors[name] = str(e)
+    return errors
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            logger.info(
+                "Rendered %s in %.2fms",
+                self.template.name,
+                (time.perf_counter() - start) * 1000,
+            )
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend that logs how long each template takes to render."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
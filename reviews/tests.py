@@ -1,3 +1,1290 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.template import engines
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+    skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from reviews import bulk, diff_import, jobs, outbox, tasks, views
+from reviews.admin.job import requeue_jobs
+from reviews.admin.site import admin_site
+from reviews.checks import check_page_cache, check_reviews_templates, check_session_cache
+from reviews.csv_validation import parse_timestamp, validate_file
+from reviews.isbn import canonical_isbn
+from reviews.leaderboards import build_leaderboards
+from reviews.jobs import claim_next_job, enqueue, run_job
+from reviews.lookups import book_by_isbn
+from reviews.rollups import build_rollups
+from reviews.search import search_filter
+from reviews.staticfiles import minify_js
+from reviews.template_tools import TimedDjangoTemplates
+from reviews.management.commands import import_organised_data
+from reviews.management.commands.import_organised_data import EXPORT_STATE_NAME
+from reviews.models import (
+    Book, BookContributor, BookSimilarity, ChangeEvent, Contributor, ContributorMonthlyRollup,
+    Job, JobQueue, LeaderboardEntry, Publisher, PublisherMonthlyRollup, Review, RollupState,
+)
+
+# Pages render {% static %} without running collectstatic first
+plain_static_files = override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+
+# Valid checksums, so the rows pass Book.clean() as well
+ISBNS = ["978-1-86197-876-9", "978-0-306-40615-7", "978-3-16-148410-0", "978-0-262-13472-9"]
+
+
+def make_catalogue(test):
+    """Two publishers, four books with an author each and a few reviews."""
+    test.users = [
+        get_user_model().objects.create_user(f"reader{n}", f"reader{n}@example.com", "password")
+        for n in range(3)
+    ]
+    test.publishers = [
+        Publisher.objects.create(name=name, website=f"https://{name.lower()}.example.com",
+                                 email=f"info@{name.lower()}.example.com")
+        for name in ("Packt", "Penguin")
+    ]
+    test.contributor = Contributor.objects.create(
+        first_names="Ada", last_names="Lovelace", email="ada@example.com"
+    )
+    test.books = []
+    for index, isbn in enumerate(ISBNS):
+        book = Book.objects.create(
+            title=f"Book {index}", publication_date=date(2020, 1 + index, 1), isbn=isbn,
+            publisher=test.publishers[index % 2],
+        )
+        BookContributor.objects.create(
+            book=book, contributor=test.contributor, role=BookContributor.ContributionRole.AUTHOR
+        )
+        for user in test.users[:3 - index % 2]:
+            Review.objects.create(book=book, creator=user, rating=5 - index, content="Good")
+        test.books.append(book)
+
+
+def run_quietly(name, **options):
+    out = StringIO()
+    call_command(name, stdout=out, stderr=out, **options)
+    return out.getvalue()
+
+
+class CsvFileMixin:
+    def write_csv(self, text):
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8") as csv_file:
+            csv_file.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class BulkDeleteTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        # Tables with foreign keys to books, publishers and contributors
+        run_quietly("build_leaderboards")
+        run_quietly("build_rollups")
+        run_quietly("build_recommendations")
+        self.assertTrue(LeaderboardEntry.objects.exists())
+        self.assertTrue(BookSimilarity.objects.exists())
+        self.assertTrue(PublisherMonthlyRollup.objects.exists())
+        self.assertTrue(ContributorMonthlyRollup.objects.exists())
+
+    def job(self, task, ids):
+        return enqueue(task, queue="bulk", ids=ids)
+
+    def test_delete_books_removes_dependent_rows(self):
+        ids = [self.books[0].pk, self.books[1].pk]
+        message = bulk.delete_books(self.job(bulk.delete_books, ids), ids)
+
+        self.assertEqual(message, "Deleted 2 books.")
+        connection.check_constraints()
+        self.assertFalse(Book.objects.filter(pk__in=ids).exists())
+        self.assertFalse(Review.objects.filter(book__in=ids).exists())
+        self.assertFalse(LeaderboardEntry.objects.filter(book__in=ids).exists())
+        self.assertFalse(BookSimilarity.objects.filter(book__in=ids).exists())
+        self.assertFalse(BookSimilarity.objects.filter(similar__in=ids).exists())
+        self.assertEqual(Book.objects.count(), 2)
+        deleted = ChangeEvent.objects.filter(operation=ChangeEvent.Operation.DELETE)
+        self.assertEqual(deleted.filter(model="book").count(), 2)
+        self.assertEqual(deleted.filter(model="review").count(), 5)
+        # Only the outbox models are recorded
+        self.assertFalse(deleted.exclude(model__in=["book", "review", "bookcontributor"]).exists())
+
+    def test_delete_publishers_removes_books_and_rollups(self):
+        publisher = self.publishers[0]
+        message = bulk.delete_publishers(self.job(bulk.delete_publishers, [publisher.pk]), [publisher.pk])
+
+        self.assertEqual(message, "Deleted 1 publishers.")
+        connection.check_constraints()
+        self.assertFalse(Book.objects.filter(publisher=publisher.pk).exists())
+        self.assertFalse(PublisherMonthlyRollup.objects.filter(publisher=publisher.pk).exists())
+        self.assertEqual(Book.objects.count(), 2)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        self.review = Review.objects.filter(book=self.books[0]).first()
+        # The only review of its book, publisher and author in that month
+        Review.objects.filter(pk=self.review.pk).update(
+            date_created=timezone.make_aware(datetime(2021, 3, 15))
+        )
+        self.review.refresh_from_db()
+        run_quietly("build_rollups")
+
+    def month_counts(self):
+        return dict(
+            PublisherMonthlyRollup.objects.filter(publisher=self.publishers[0])
+            .values_list("month", "review_count")
+        )
+
+    def test_deleted_reviews_update_their_month(self):
+        self.assertEqual(self.month_counts()[date(2021, 3, 1)], 1)
+        self.review.delete()
+        self.assertEqual(build_rollups(), 2)
+        self.assertNotIn(date(2021, 3, 1), self.month_counts())
+        self.assertFalse(ContributorMonthlyRollup.objects.filter(month=date(2021, 3, 1)).exists())
+
+    def test_bulk_deleted_reviews_update_their_month(self):
+        ids = [self.review.pk]
+        bulk.delete_reviews(enqueue(bulk.delete_reviews, ids=ids), ids)
+        build_rollups()
+        self.assertNotIn(date(2021, 3, 1), self.month_counts())
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_field_selection(self):
+        response = self.get("api_book_list", fields="title, rating,contributors", limit=1)
+        self.assertEqual(response.json()["results"], [{
+            "title": "Book 0",
+            "rating": {"average": 5.0, "count": 3},
+            "contributors": [{"id": self.contributor.pk, "name": "Ada Lovelace", "role": "AUTHOR"}],
+        }])
+        response = self.get("api_book_list", fields="title,secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown fields: secret.", response.json()["error"])
+
+    def test_cursor_continuation(self):
+        seen, cursor = [], ""
+        while cursor is not None:
+            page = self.get("api_book_list", fields="id", limit=3, cursor=cursor).json()
+            seen += [item["id"] for item in page["results"]]
+            cursor = page["next_cursor"]
+        self.assertEqual(seen, [book.pk for book in self.books])
+
+        # Reviews come newest first
+        first = self.get("api_book_reviews", self.books[0].pk, fields="id", limit=2).json()
+        rest = self.get("api_book_reviews", self.books[0].pk, fields="id",
+                        cursor=first["next_cursor"]).json()
+        reviews = Review.objects.filter(book=self.books[0]).order_by("-pk")
+        self.assertEqual([item["id"] for item in first["results"] + rest["results"]],
+                         list(reviews.values_list("pk", flat=True)))
+        self.assertIsNone(rest["next_cursor"])
+
+    def test_invalid_cursor(self):
+        for cursor in ("abc", "1.5"):
+            response = self.get("api_book_list", cursor=cursor)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": "'cursor' must be an integer."})
+
+    def test_ids_lookup(self):
+        ids = f"{self.books[2].pk},{self.books[0].pk},999999"
+        response = self.get("api_book_list", ids=ids, fields="id")
+        self.assertEqual(response.json(), {"results": [{"id": self.books[0].pk}, {"id": self.books[2].pk}]})
+
+        response = self.get("api_book_list", ids=",".join(str(pk) for pk in range(1, 102)))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "At most 100 ids can be looked up at once."})
+        self.assertEqual(self.get("api_book_list", ids="1,x").status_code, 400)
+
+
+@override_settings(CHANGE_FEED_TOKENS=["s3cret"])
+class ChangeFeedTests(TestCase):
+    url = reverse("api_changes")
+
+    def setUp(self):
+        self.publisher = Publisher.objects.create(
+            name="Packt", website="https://packt.example.com", email="info@packt.example.com"
+        )
+
+    def feed(self, **params):
+        return self.client.get(self.url, params, HTTP_AUTHORIZATION="Bearer s3cret")
+
+    def test_requires_staff_or_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.assertEqual(self.feed().status_code, 200)
+        user = get_user_model().objects.create_user("reader", password="password")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_pages_through_changes_in_order(self):
+        self.publisher.website = "https://packtpub.example.com"
+        self.publisher.save()
+        self.publisher.delete()
+
+        first = self.feed(limit=2).json()
+        self.assertEqual([event["operation"] for event in first["results"]], ["INSERT", "UPDATE"])
+        self.assertTrue(first["has_more"])
+        rest = self.feed(cursor=first["next_cursor"]).json()
+        self.assertEqual([event["operation"] for event in rest["results"]], ["DELETE"])
+        self.assertEqual(rest["results"][0]["payload"]["website"], "https://packtpub.example.com")
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(self.feed(cursor=rest["next_cursor"]).json()["results"], [])
+
+    def test_events_committed_late_come_after_the_cursor(self):
+        # An event whose id was handed out before the ones already served,
+        # but whose transaction committed after them
+        cursor = self.feed().json()["next_cursor"]
+        late = ChangeEvent.objects.create(
+            id=ChangeEvent.objects.order_by("id").first().id - 1,
+            model="publisher", object_id=self.publisher.pk, operation=ChangeEvent.Operation.UPDATE,
+            payload={},
+        )
+        results = self.feed(cursor=cursor).json()["results"]
+        self.assertEqual([event["id"] for event in results], [self.publisher.pk])
+        late.refresh_from_db()
+        self.assertGreater(late.seq, cursor)
+        self.assertEqual(outbox.assign_sequence(), 0)
+
+
+class MergeImportTests(CsvFileMixin, TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def test_merge_updates_creates_and_deletes(self):
+        packt = self.publishers[0]
+        edited = packt.date_edited
+        tombstone = json.dumps({"book__isbn": ISBNS[0], "creator__username": "reader0"}).replace('"', '""')
+        path = self.write_csv(
+            "content:Deleted\n"
+            "deleted_model,deleted_id,deleted_key\n"
+            f'review,1,"{tombstone}"\n'
+            "\ncontent:Publisher\n"
+            "publisher_name,publisher_website,publisher_email\n"
+            "packt,https://packtpub.example.com,info@packt.example.com\n"
+            "\ncontent:Book\n"
+            "book_title,book_publication_date,book_isbn,book_publisher_name\n"
+            "New Book,2021/05/01,978-1-4028-9462-6,Packt\n"
+        )
+        out = run_quietly("loadcsv", csv=path, merge=True)
+
+        self.assertIn("Publisher: 1 updated", out)
+        self.assertIn("Book: 1 created", out)
+        self.assertIn("Deleted: 1 deleted", out)
+        packt.refresh_from_db()
+        self.assertEqual(packt.website, "https://packtpub.example.com")
+        # The merged row is in the next delta export
+        self.assertGreater(packt.date_edited, edited)
+        self.assertEqual(Book.objects.get(isbn="978-1-4028-9462-6").publisher, packt)
+        self.assertFalse(Review.objects.filter(book=self.books[0], creator__username="reader0").exists())
+
+    def test_merge_of_unchanged_rows_keeps_change_markers(self):
+        packt = self.publishers[0]
+        path = self.write_csv(
+            "content:Publisher\n"
+            "publisher_name,publisher_website,publisher_email\n"
+            f"{packt.name},{packt.website},{packt.email}\n"
+        )
+        self.assertIn("Publisher: 1 unchanged", run_quietly("loadcsv", csv=path, merge=True))
+        self.assertEqual(Publisher.objects.get(pk=packt.pk).date_edited, packt.date_edited)
+
+
+class DiffImportTests(CsvFileMixin, TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def catalogue_csv(self, rating=4):
+        return self.write_csv(
+            "content:Publisher\n"
+            "publisher_name,publisher_website,publisher_email\n"
+            "Éditions Zoé,https://zoe.example.com,info@zoe.example.com\n"
+            "\ncontent:Book\n"
+            "book_title,book_publication_date,book_isbn,book_publisher_name\n"
+            "Le Livre,2021/05/01,978-1-4028-9462-6,Éditions Zoé\n"
+            "\ncontent:BookContributor\n"
+            "bookcontributor_book,bookcontributor_contributor_email,bookcontributor_role\n"
+            "LE LIVRE,ADA@example.com,Author\n"
+            "\ncontent:Review\n"
+            "review_book_title,review_creator,review_rating,review_content\n"
+            f"le livre,reader0,{rating},Bien\n"
+        )
+
+    def test_inserts_then_skips_unchanged_rows(self):
+        out = run_quietly("loadcsv", csv=self.catalogue_csv(), diff=True)
+        for line in ("Publisher: 0 unchanged, 1 inserted", "Book: 0 unchanged, 1 inserted",
+                     "BookContributor: 0 unchanged, 1 inserted", "Review: 0 unchanged, 1 inserted"):
+            self.assertIn(line, out)
+        book = Book.objects.get(isbn="978-1-4028-9462-6")
+        # Found by the same lower() on both sides, though SQLite doesn't fold "É"
+        self.assertEqual(book.publisher.name, "Éditions Zoé")
+        self.assertEqual(book.stars_4, 1)
+        self.assertEqual(ChangeEvent.objects.filter(model="book", object_id=book.pk).count(), 1)
+
+        out = run_quietly("loadcsv", csv=self.catalogue_csv(), diff=True)
+        self.assertIn("Publisher: 1 unchanged, 0 inserted, 0 updated, 0 skipped", out)
+        self.assertIn("Review: 1 unchanged, 0 inserted, 0 updated, 0 skipped", out)
+
+    def test_changed_rows_are_updated(self):
+        run_quietly("loadcsv", csv=self.catalogue_csv(), diff=True)
+        out = run_quietly("loadcsv", csv=self.catalogue_csv(rating=2), diff=True)
+        self.assertIn("Review: 0 unchanged, 0 inserted, 1 updated, 0 skipped", out)
+        book = Book.objects.get(isbn="978-1-4028-9462-6")
+        self.assertEqual((book.stars_4, book.stars_2), (0, 1))
+
+    def test_unresolved_rows_are_skipped(self):
+        path = self.write_csv(
+            "content:Book\n"
+            "book_title,book_publication_date,book_isbn,book_publisher_name\n"
+            "Orphan,2021/05/01,978-1-4028-9462-6,Nobody\n"
+            "Undated,someday,978-0-14-044913-6,Packt\n"
+        )
+        out = run_quietly("loadcsv", csv=path, diff=True)
+        self.assertIn("Book: 0 unchanged, 0 inserted, 0 updated, 2 skipped", out)
+        self.assertIn('Publisher "nobody" not found', out)
+
+    def test_sections_must_implement_the_interface(self):
+        class Incomplete(diff_import._Section):
+            def parse(self, data):
+                return None, {}
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+class ValidateOnlyTests(CsvFileMixin, TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def validate(self, text):
+        report_path = self.write_csv("")
+        try:
+            run_quietly("loadcsv", csv=self.write_csv(text), validate_only=True, report=report_path)
+        except CommandError:
+            pass
+        with open(report_path, encoding="utf-8") as report_file:
+            return json.load(report_file)
+
+    def test_valid_file(self):
+        Publisher.objects.create(name="Ärzte Verlag", website="https://aerzte.example.com",
+                                 email="info@aerzte.example.com")
+        report = self.validate(
+            "content:Publisher\n"
+            "publisher_name,publisher_website,publisher_email\n"
+            "Éditions Zoé,https://zoe.example.com,info@zoe.example.com\n"
+            "\ncontent:Book\n"
+            "book_title,book_publication_date,book_isbn,book_publisher_name\n"
+            "Le Livre,2021/05/01,978-1-4028-9462-6,Éditions Zoé\n"
+            "Second,2021-06-01,0-14-044913-2,PACKT\n"
+            "Third,2021-07-01,978-0-262-03384-8,Ärzte Verlag\n"
+            "\ncontent:Review\n"
+            "review_book_title,review_creator,review_rating,review_content\n"
+            "LE LIVRE,reader0,4,Bien\n"
+            "book 0,reader0,5,Again\n"
+        )
+        self.assertTrue(report["valid"], report["errors"])
+        self.assertEqual(report["rows"], {"Publisher": 1, "Book": 3, "Review": 2})
+
+    def test_errors_are_reported_per_row(self):
+        report = self.validate(
+            "content:Book\n"
+            "book_title,book_publication_date,book_isbn,book_publisher_name\n"
+            "One,2021/13/01,978-1-4028-9462-6,Packt\n"
+            "Two,2021/05/01,978-1-4028-9462-7,Nobody\n"
+            "Three,2021/05/01,1-4028-9462-7,Packt\n"
+            "\ncontent:Review\n"
+            "review_book_title,review_creator,review_rating,review_content\n"
+            "One,reader0,6,Hmm\n"
+            "\ncontent:Shelf\n"
+            "shelf_name\n"
+        )
+        self.assertFalse(report["valid"])
+        self.assertEqual(report["errors_by_code"], {
+            "invalid_date": 1, "invalid_isbn": 1, "unknown_reference": 1, "duplicate_key": 1,
+            "invalid_rating": 1, "unknown_section": 1,
+        })
+        lines = {(error["code"], error["line"]) for error in report["errors"]}
+        self.assertIn(("invalid_date", 3), lines)
+        self.assertIn(("duplicate_key", 5), lines)
+
+    def test_review_dates_are_checked_like_the_importer_reads_them(self):
+        report = self.validate(
+            "content:Review\n"
+            "review_book,review_content,review_creator,review_rating,review_date_created,review_date_edited\n"
+            "Book 0,Fine,reader0,4,2025-09-09,2025-10-13\n"
+            "Book 0,Odd,reader1,4,not-a-date,2025-10-13\n"
+        )
+        self.assertEqual(report["errors_by_code"], {"invalid_date": 1})
+        self.assertEqual(
+            (report["errors"][0]["line"], report["errors"][0]["column"]), (4, "review_date_created")
+        )
+
+    def test_nothing_is_written(self):
+        self.validate(
+            "content:Publisher\n"
+            "publisher_name,publisher_website,publisher_email\n"
+            "New,https://new.example.com,info@new.example.com\n"
+        )
+        self.assertFalse(Publisher.objects.filter(name="New").exists())
+
+
+def succeed(job, value):
+    return f"Got {value}."
+
+
+def fail(job):
+    raise RuntimeError("Broken")
+
+
+@override_settings(REVIEWS_JOB_QUEUE_LIMITS={"data": 1})
+class JobQueueTests(TestCase):
+    def test_claims_most_urgent_job_and_runs_it(self):
+        enqueue(succeed, value=1)
+        urgent = enqueue("reviews.tests.succeed", priority=5, value=2)
+
+        job = claim_next_job()
+        self.assertEqual(job.pk, urgent.pk)
+        self.assertEqual((job.status, job.attempts), (Job.Status.RUNNING, 1))
+        self.assertGreater(job.locked_until, timezone.now())
+
+        with self.assertLogs("reviews.jobs", "INFO"):
+            job = run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message, job.locked_until), (Job.Status.DONE, "Got 2.", None))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        enqueue(fail, max_attempts=2)
+        with self.assertLogs("reviews.jobs", "ERROR"):
+            job = run_job(claim_next_job())
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_next_job())
+
+    def test_queue_limit(self):
+        enqueue(succeed, queue="data", value=1)
+        second = enqueue(succeed, queue="data", value=2)
+        other = enqueue(succeed, queue="default", value=3)
+
+        claim_next_job()
+        self.assertEqual(claim_next_job().pk, other.pk)
+        self.assertIsNone(claim_next_job(["data"]))
+        Job.objects.filter(queue="data", status=Job.Status.RUNNING).update(status=Job.Status.DONE)
+        self.assertEqual(claim_next_job().pk, second.pk)
+
+    def test_expired_lease_is_reclaimed(self):
+        job = enqueue(succeed, queue="data", value=1)
+        claim_next_job()
+        # The worker died: nothing renews the lease
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.attempts), (job.pk, 2))
+
+    def test_expired_job_without_attempts_left_fails(self):
+        job = enqueue(succeed, max_attempts=1, value=1)
+        claim_next_job()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.FAILED)
+
+    def test_progress_renews_the_lease(self):
+        enqueue(succeed, value=1)
+        job = claim_next_job()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+        job.set_progress(5, total=10)
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.total), (5, 10))
+        self.assertGreater(job.locked_until, timezone.now() + timedelta(seconds=60))
+
+    def test_admin_requeues_finished_and_expired_jobs_only(self):
+        live, expired, failed = (enqueue(succeed, value=n) for n in range(3))
+        Job.objects.filter(pk__in=[live.pk, expired.pk]).update(
+            status=Job.Status.RUNNING, attempts=1, locked_until=timezone.now() + timedelta(minutes=5)
+        )
+        Job.objects.filter(pk=expired.pk).update(locked_until=timezone.now() - timedelta(minutes=5))
+        Job.objects.filter(pk=failed.pk).update(status=Job.Status.FAILED, attempts=3)
+
+        modeladmin = admin_site._registry[Job]
+        modeladmin.message_user = lambda request, message: None
+        requeue_jobs(modeladmin, None, Job.objects.all())
+
+        statuses = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(statuses[live.pk], Job.Status.RUNNING)
+        self.assertEqual(statuses[expired.pk], Job.Status.PENDING)
+        self.assertEqual(statuses[failed.pk], Job.Status.PENDING)
+
+    def test_requeue_needs_the_change_permission(self):
+        staff = get_user_model().objects.create_user("staff", "staff@example.com", "password", is_staff=True)
+        staff.user_permissions.add(Permission.objects.get(codename="view_job"))
+        request = RequestFactory().get("/")
+        request.user = staff
+        modeladmin = admin_site._registry[Job]
+        self.assertNotIn("requeue_jobs", modeladmin.get_actions(request))
+
+        staff.user_permissions.add(Permission.objects.get(codename="change_job"))
+        request.user = get_user_model().objects.get(pk=staff.pk)  # Fresh permission cache
+        self.assertIn("requeue_jobs", modeladmin.get_actions(request))
+
+    def test_claim_creates_the_queue_lock_row(self):
+        enqueue(succeed, queue="data", value=1)
+        claim_next_job()
+        self.assertEqual(list(JobQueue.objects.values_list("name", flat=True)), ["data"])
+
+
+@skipUnlessDBFeature("has_select_for_update")
+@override_settings(REVIEWS_JOB_QUEUE_LIMITS={"data": 1})
+class ConcurrentClaimTests(TransactionTestCase):
+    def test_queue_limit_holds_for_concurrent_workers(self):
+        for value in range(4):
+            enqueue(succeed, queue="data", value=value)
+        count_running = jobs.full_queues
+
+        def slow_count(limits):
+            full = count_running(limits)
+            time.sleep(0.2)  # Every worker counts before any claim commits, without the lock
+            return full
+
+        claimed = []
+
+        def worker():
+            try:
+                claimed.append(claim_next_job(["data"]))
+            finally:
+                connection.close()
+
+        with mock.patch.object(jobs, "full_queues", slow_count):
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len([job for job in claimed if job is not None]), 1)
+        self.assertEqual(Job.objects.filter(status=Job.Status.RUNNING).count(), 1)
+
+
+@plain_static_files
+class AdminAutocompleteTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+
+    def autocomplete(self, model_name, field_name, term):
+        return self.client.get(reverse("bookrevadmin:autocomplete"), {
+            "app_label": "reviews", "model_name": model_name, "field_name": field_name, "term": term,
+        })
+
+    def test_change_forms_render_no_options(self):
+        review = Review.objects.filter(book=self.books[0]).first()
+        for url in (
+            reverse("bookrevadmin:reviews_review_change", args=[review.pk]),
+            reverse("bookrevadmin:reviews_book_change", args=[self.books[0].pk]),
+            reverse("bookrevadmin:reviews_bookcontributor_add"),
+        ):
+            response = self.client.get(url)
+            selects = re.findall(r'<select [^>]*class="admin-autocomplete".*?</select>',
+                                 response.content.decode(), re.S)
+            self.assertTrue(selects)
+            # Only the selected row is rendered, never the whole table
+            for select in selects:
+                self.assertLessEqual(select.count("<option"), 1, url)
+
+    def test_endpoints_search_the_target_admins(self):
+        isbn = Book.objects.get(pk=self.books[2].pk).isbn
+        results = self.autocomplete("review", "book", isbn).json()["results"]
+        self.assertEqual(results, [{"id": str(self.books[2].pk), "text": "Book 2"}])
+        results = self.autocomplete("review", "creator", "reader1").json()["results"]
+        self.assertEqual([result["text"] for result in results], ["reader1"])
+        results = self.autocomplete("book", "publisher", "Pen").json()["results"]
+        self.assertEqual([result["text"] for result in results], ["Penguin"])
+        results = self.autocomplete("bookcontributor", "contributor", "Love").json()["results"]
+        self.assertEqual([result["id"] for result in results], [str(self.contributor.pk)])
+
+    def test_endpoint_returns_one_page(self):
+        Book.objects.bulk_create(
+            Book(title=f"Bulk {n}", publication_date=date(2021, 1, 1), isbn=f"bulk-{n}",
+                 publisher=self.publishers[0])
+            for n in range(30)
+        )
+        page = self.autocomplete("review", "book", "Bulk").json()
+        self.assertEqual(len(page["results"]), AutocompleteJsonView.paginate_by)
+        self.assertTrue(page["pagination"]["more"])
+
+
+@plain_static_files
+class BulkAdminActionTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        self.url = reverse("bookrevadmin:reviews_book_changelist")
+
+    def reassign(self, publisher_id, select_across=False, query=""):
+        return self.client.post(f"{self.url}{query}", {
+            "action": "reassign_publisher",
+            "_selected_action": [self.books[0].pk],
+            "select_across": "1" if select_across else "0",
+            "index": "0",
+            "publisher_id": publisher_id,
+        }, follow=True)
+
+    def test_invalid_publisher_id_is_rejected(self):
+        # Values that aren't ids fail the bound action form
+        for publisher_id in ("abc", "0", "-3"):
+            self.assertEqual(self.reassign(publisher_id).status_code, 200)
+        self.assertContains(self.reassign("999999"), "Enter a valid target publisher ID.")
+        self.assertFalse(Job.objects.exists())
+
+    def test_changelist_filters_by_publisher_without_listing_publishers(self):
+        response = self.client.get(f"{self.url}?publisher__id__exact={self.publishers[1].pk}")
+        self.assertEqual(response.context["cl"].result_count, 2)
+        self.assertNotContains(response, f"?publisher__id__exact={self.publishers[0].pk}")
+
+    def test_selected_rows_are_queued_by_pk(self):
+        self.reassign(self.publishers[1].pk)
+        job = Job.objects.get()
+        self.assertEqual(job.params, {"publisher_id": self.publishers[1].pk, "ids": [self.books[0].pk]})
+
+    def test_select_all_queues_the_changelist_filter(self):
+        target = self.publishers[1]
+        querystring = "publication_date__gte=2020-01-01&publication_date__lt=2020-02-01"
+        self.reassign(target.pk, select_across=True, query=f"?{querystring}")
+
+        job = Job.objects.get()
+        self.assertEqual(job.params["query"], {
+            "model": "reviews.Book", "querystring": querystring, "pk_max": self.books[0].pk,
+        })
+        # Rows added after the admin's "select all" are not part of it
+        late = Book.objects.create(title="Book 0, second edition", publication_date=date(2020, 1, 15),
+                                   isbn="978-1-4028-9462-6", publisher=self.publishers[0])
+        message = bulk.reassign_publisher(job, **job.params)
+
+        self.assertEqual(message, f"Moved 1 books to {target}.")
+        self.assertEqual(
+            set(Book.objects.filter(publisher=target).values_list("pk", flat=True)),
+            {self.books[1].pk, self.books[3].pk, self.books[0].pk},
+        )
+        self.assertEqual(Book.objects.get(pk=late.pk).publisher, self.publishers[0])
+
+    def test_select_all_with_a_search(self):
+        self.reassign(self.publishers[1].pk, select_across=True, query=f"?q={ISBNS[2]}")
+        job = Job.objects.get()
+        self.assertEqual(bulk.reassign_publisher(job, **job.params), f"Moved 1 books to {self.publishers[1]}.")
+        self.assertEqual(Book.objects.get(pk=self.books[2].pk).publisher, self.publishers[1])
+
+
+@plain_static_files
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+
+    def get(self, path="/books/", **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_hit_until_purged(self):
+        self.assertEqual(self.get()["X-Page-Cache"], "MISS")
+        self.assertEqual(self.get()["X-Page-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.get(pk=self.books[0].pk)
+            book.title = "Renamed"
+            book.save()
+        response = self.get()
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "Renamed")
+
+    def test_bulk_job_purges_book_pages(self):
+        paths = [reverse("book_detail", args=[book.pk]) for book in self.books[:2]]
+        for path in paths + paths:
+            self.get(path)
+        self.assertEqual(self.get(paths[0])["X-Page-Cache"], "HIT")
+
+        # Only the drifted book's page changes
+        Book.objects.filter(pk=self.books[0].pk).update(stars_5=0)
+        ids = [book.pk for book in self.books[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            message = bulk.recompute_ratings(enqueue(bulk.recompute_ratings, ids=ids), ids)
+        self.assertEqual(message, "Recomputed ratings; corrected 1 books.")
+        self.assertEqual(self.get(paths[0])["X-Page-Cache"], "MISS")
+        self.assertEqual(self.get(paths[1])["X-Page-Cache"], "HIT")
+
+    def test_compressed_pages_are_cached_compressed(self):
+        first = self.get(accept_encoding="gzip")
+        self.assertEqual((first["X-Page-Cache"], first["Content-Encoding"]), ("MISS", "gzip"))
+        hit = self.get(accept_encoding="gzip")
+        self.assertEqual((hit["X-Page-Cache"], hit["Content-Encoding"]), ("HIT", "gzip"))
+        self.assertEqual(hit.content, first.content)
+        self.assertIn("Accept-Encoding", hit["Vary"])
+
+        # Each encoding is its own entry
+        plain = self.get()
+        self.assertEqual(plain["X-Page-Cache"], "MISS")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+
+    def test_warm_page_cache(self):
+        job = enqueue(tasks.warm_page_cache, host="testserver", limit=2)
+        self.assertEqual(tasks.warm_page_cache(job, host="testserver", limit=2), "Warmed 3 pages (0 failed).")
+        for path in ("/books/", reverse("book_detail", args=[self.books[0].pk])):
+            response = self.get(path, accept_encoding=tasks.BROWSER_ACCEPT_ENCODING)
+            self.assertEqual(response["X-Page-Cache"], "HIT")
+
+    def test_local_memory_page_cache_is_reported_in_production(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual([e.id for e in check_page_cache(None)], ["reviews.W002"])
+            shared = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "cache"}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(check_page_cache(None), [])
+            without = [m for m in settings.MIDDLEWARE if not m.endswith("PageCacheMiddleware")]
+            with override_settings(MIDDLEWARE=without):
+                self.assertEqual(check_page_cache(None), [])
+
+
+@plain_static_files
+class AsyncStackTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+
+    async def test_middleware_runs_under_asgi(self):
+        first = await self.async_client.get("/books/", headers={"accept-encoding": "gzip"})
+        self.assertEqual((first["X-Page-Cache"], first["Content-Encoding"]), ("MISS", "gzip"))
+        hit = await self.async_client.get("/books/", headers={"accept-encoding": "gzip"})
+        self.assertEqual(hit["X-Page-Cache"], "HIT")
+        self.assertEqual(hit.content, first.content)
+
+    async def test_async_views(self):
+        response = await self.async_client.get(reverse("async_book_list"))
+        self.assertContains(response, "Book 3")
+        response = await self.async_client.get(reverse("async_book_detail", args=[self.books[0].pk]))
+        self.assertContains(response, "Details of Book 0")
+        response = await self.async_client.get(reverse("async_book_detail", args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+
+@plain_static_files
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+        run_quietly("build_recommendations")
+        self.path = reverse("book_detail", args=[self.books[0].pk])
+
+    def test_not_modified_until_the_book_changes(self):
+        self.client.force_login(self.users[0])  # No page cache: the view's own condition()
+        etag = self.client.get(self.path)["ETag"]
+        self.assertEqual(self.client.get(self.path, headers={"if-none-match": etag}).status_code, 304)
+
+        book = Book.objects.get(pk=self.books[0].pk)
+        book.title = "Renamed"
+        book.save()
+        self.assertEqual(self.client.get(self.path, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_rating_correction_changes_validators(self):
+        self.client.force_login(self.users[0])
+        Book.objects.filter(pk=self.books[0].pk).update(stars_5=0)
+        etag = self.client.get(self.path)["ETag"]
+        list_etag = self.client.get("/books/")["ETag"]
+        run_quietly("rebuild_ratings")
+        self.assertEqual(self.client.get(self.path, headers={"if-none-match": etag}).status_code, 200)
+        self.assertEqual(self.client.get("/books/", headers={"if-none-match": list_etag}).status_code, 200)
+
+    def test_recommendation_rebuild_changes_validators(self):
+        first = self.client.get(self.path)
+        etag, last_modified = first["ETag"], first["Last-Modified"]
+        self.assertEqual(self.client.get(self.path, headers={"if-none-match": etag}).status_code, 304)
+
+        RollupState.objects.filter(name="recommendations").update(
+            high_water_mark=timezone.now() - timedelta(days=1)
+        )
+        self.client.force_login(self.users[0])
+        etag = self.client.get(self.path)["ETag"]
+        run_quietly("build_recommendations")
+        response = self.client.get(self.path, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.client.logout()
+        self.assertGreaterEqual(self.client.get(self.path)["Last-Modified"], last_modified)
+
+    def test_rebuild_purges_books_whose_neighbours_changed(self):
+        other = reverse("book_detail", args=[self.books[1].pk])
+        for path in (self.path, other, self.path, other):
+            self.client.get(path)
+        self.assertEqual(self.client.get(self.path)["X-Page-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            run_quietly("build_recommendations")
+        self.assertEqual(self.client.get(self.path)["X-Page-Cache"], "HIT")
+
+        BookSimilarity.objects.filter(book=self.books[0]).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            run_quietly("build_recommendations")
+        self.assertEqual(self.client.get(self.path)["X-Page-Cache"], "MISS")
+        self.assertEqual(self.client.get(other)["X-Page-Cache"], "HIT")
+
+
+class StarCounterTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def test_saving_a_stale_book_keeps_the_counters(self):
+        book = self.books[1]  # Loaded before its reviews were added
+        self.assertEqual(book.stars_4, 0)
+        book.title = "Renamed"
+        book.save()
+        book.refresh_from_db()
+        self.assertEqual((book.title, book.stars_4), ("Renamed", 2))
+
+    def test_review_changes_update_the_counters(self):
+        review = Review.objects.filter(book=self.books[0]).first()
+        review.rating = 1
+        review.save()
+        book = Book.objects.get(pk=self.books[0].pk)
+        self.assertEqual((book.stars_5, book.stars_1), (2, 1))
+        review.delete()
+        book.refresh_from_db()
+        self.assertEqual((book.stars_5, book.stars_1), (2, 0))
+
+    def test_rebuild_only_writes_drifted_books(self):
+        Book.objects.filter(pk=self.books[0].pk).update(stars_5=0, stars_2=4)
+        edited = dict(Book.objects.values_list("pk", "date_edited"))
+        self.assertEqual(Book.objects.all().rebuild_rating_counts(), [self.books[0].pk])
+        self.assertEqual(Book.objects.all().rebuild_rating_counts(), [])
+        book = Book.objects.get(pk=self.books[0].pk)
+        self.assertEqual((book.stars_5, book.stars_2), (3, 0))
+        # Derived data: the books' own edit times stay as they were
+        self.assertEqual(dict(Book.objects.values_list("pk", "date_edited")), edited)
+
+
+@plain_static_files
+class StreamingBookListTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+
+    @mock.patch.object(views, "STREAM_CHUNK_SIZE", 3)
+    def test_streamed_page_matches_the_rendered_one(self):
+        response = self.client.get("/books/", {"stream": "1"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        # Shell, cards in chunks of three, footer
+        self.assertEqual(len(chunks), 4)
+        self.assertIn("List of all books", chunks[0])
+        self.assertEqual([chunk.count("Book ") for chunk in chunks[1:3]], [3, 1])
+
+        rendered = self.client.get("/books/").content.decode()
+        titles = re.compile(r"Book \d")
+        self.assertEqual(titles.findall("".join(chunks)), titles.findall(rendered))
+
+    def test_empty_catalogue(self):
+        Book.objects.all().delete()
+        response = self.client.get("/books/", {"stream": "1"})
+        self.assertNotIn("Book 0", b"".join(response.streaming_content).decode())
+
+    def test_export_counts_the_rows_it_writes(self):
+        output = run_quietly("import_organised_data")
+        # Single file exports are written next to the command
+        self.addCleanup(os.remove, re.search(r"export to (\S+?)\.\.\.", output)[1])
+        self.assertIn("Wrote 4 records for Book", output)
+        self.assertIn("Wrote 10 records for Review", output)
+
+
+@plain_static_files
+class SessionProfileTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+
+    def assertNoSessionQueries(self, queries):
+        self.assertFalse([query["sql"] for query in queries if "django_session" in query["sql"]])
+
+    def test_anonymous_pages_use_no_session(self):
+        with CaptureQueriesContext(connection) as queries:
+            for path in ("/books/", reverse("book_detail", args=[self.books[0].pk]), reverse("home")):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNoSessionQueries(queries)
+
+    def test_flash_messages_travel_in_a_cookie(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("publisher_create"), {
+                "name": "Orbit", "website": "https://orbit.example.com", "email": "info@orbit.example.com",
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("messages", response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNoSessionQueries(queries)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_profile_stores_no_sessions(self):
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get(reverse("home")).wsgi_request.user, self.users[0])
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(DEBUG=False, SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+    def test_cached_sessions_on_local_memory_are_reported(self):
+        self.assertEqual([e.id for e in check_session_cache(None)], ["reviews.W001"])
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"):
+            self.assertEqual(check_session_cache(None), [])
+
+
+class TemplateProfileTests(SimpleTestCase):
+    def test_shipped_templates_compile_into_the_cache(self):
+        self.assertEqual(check_reviews_templates(None), [])
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertIn("reviews/books.html", loader.get_template_cache)
+
+    def test_broken_template_is_reported(self):
+        templates = [{
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "OPTIONS": {"loaders": [("django.template.loaders.locmem.Loader", {
+                "reviews/fine.html": "{{ value|floatformat:1 }}",
+                "reviews/broken.html": "{% if %}",
+            })]},
+        }]
+        names = ["reviews/broken.html", "reviews/fine.html"]
+        with override_settings(TEMPLATES=templates), \
+                mock.patch("reviews.template_tools.app_template_names", return_value=names):
+            errors = check_reviews_templates(None)
+        self.assertEqual([(e.id, e.msg.split(":")[0]) for e in errors],
+                         [("reviews.E001", "Template reviews/broken.html does not compile")])
+
+    def test_timed_backend_logs_render_time(self):
+        backend = TimedDjangoTemplates({
+            "NAME": "timed", "DIRS": [], "APP_DIRS": True, "OPTIONS": {},
+        })
+        with self.assertLogs("reviews.template_tools", "INFO") as logs:
+            self.assertEqual(backend.from_string("{{ value|floatformat:1 }}").render({"value": 2.25}), "2.3")
+        self.assertRegex(logs.output[0], r"Rendered .* in \d+\.\d\dms")
+
+
+class RatingAnnotationTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        Review.objects.create(book=self.books[1], creator=self.users[2], rating=1, content="Poor")
+        self.unreviewed = Book.objects.create(
+            title="Unreviewed", publication_date=date(2021, 1, 1), isbn="978-0-00-000000-2",
+            publisher=self.publishers[0],
+        )
+
+    def test_with_ratings_in_one_query(self):
+        with self.assertNumQueries(1):
+            books = list(Book.objects.with_ratings().order_by("pk"))
+            ratings = [(book.avg_rating, book.review_count, book.get_average_rating()) for book in books]
+        self.assertEqual(ratings, [
+            (5.0, 3, 5.0), (3.0, 3, 3.0), (3.0, 3, 3.0), (2.0, 2, 2.0), (None, 0, 0),
+        ])
+
+    def test_annotations_on_filtered_and_joined_querysets(self):
+        # Two contributor rows per book must not double the counts
+        second = Contributor.objects.create(first_names="Alan", last_names="Turing", email="alan@example.com")
+        for book in self.books:
+            BookContributor.objects.create(book=book, contributor=second,
+                                           role=BookContributor.ContributionRole.EDITOR)
+        joined = Book.objects.filter(contributors__email__endswith="@example.com").distinct()
+        with self.assertNumQueries(1):
+            rows = list(
+                joined.filter(search_filter("Book", ["title"])).with_ratings().with_rating_histogram()
+                .order_by("pk").values_list("review_count", "rating_1_count", "rating_4_count")
+            )
+        self.assertEqual(rows, [(3, 0, 0), (3, 1, 2), (3, 0, 0), (2, 0, 0)])
+
+
+@plain_static_files
+class TopBooksTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+        build_leaderboards()
+
+    def titles(self, **params):
+        caches["default"].clear()  # Cached pages come back without a context
+        response = self.client.get(reverse("top_books"), params)
+        self.assertEqual(response.status_code, 200)
+        return [item["book"].title for item in response.context["book_list"]]
+
+    def test_boards_and_scopes(self):
+        self.assertEqual(self.titles(), ["Book 0", "Book 1", "Book 2", "Book 3"])
+        self.assertEqual(self.titles(board="nonsense"), self.titles(board="top"))
+        self.assertEqual(self.titles(publisher=self.publishers[1].pk), ["Book 1", "Book 3"])
+        self.assertEqual(self.titles(year=2020), self.titles())
+        self.assertEqual(self.titles(year=1999), [])
+        # Every review is from today: the books with three reviews lead
+        self.assertEqual(sorted(self.titles(board="trending")[:2]), ["Book 0", "Book 2"])
+
+    def test_queries_do_not_grow_with_the_board(self):
+        def queries():
+            caches["default"].clear()
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse("top_books"))
+            return len(captured)
+
+        build_leaderboards(size=1)
+        small = queries()
+        build_leaderboards(size=4)
+        self.assertEqual(queries(), small)
+
+    def test_rebuild_purges_the_page(self):
+        self.client.get(reverse("top_books"))
+        self.assertEqual(self.client.get(reverse("top_books"))["X-Page-Cache"], "HIT")
+        with self.captureOnCommitCallbacks(execute=True):
+            build_leaderboards()
+        self.assertEqual(self.client.get(reverse("top_books"))["X-Page-Cache"], "MISS")
+
+
+@plain_static_files
+class BookDetailTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        make_catalogue(self)
+
+    def test_reviews_without_counters(self):
+        # As after a raw SQL import, before rebuild_ratings
+        Book.objects.filter(pk=self.books[0].pk).update(stars_5=0)
+        response = self.client.get(reverse("book_detail", args=[self.books[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["book_rating"])
+        self.assertEqual(len(response.context["reviews"]), 3)
+
+
+class MinifyJsTests(SimpleTestCase):
+    def test_code_lines_are_stripped(self):
+        source = "function f() {\n    // Comment\n\n    return 1;   \n}\n"
+        self.assertEqual(minify_js(source), "function f() {\nreturn 1;\n}")
+
+    def test_template_literals_are_left_alone(self):
+        source = (
+            "    const html = `<ul>\n"
+            "        // not a comment\n"
+            "\n"
+            "        <li>${ {name: 'x'}.name }</li>  \n"
+            "    </ul>`;\n"
+            "    const nested = `a${ `b ${1}` }c`;\n"
+        )
+        self.assertEqual(minify_js(source), (
+            "const html = `<ul>\n"
+            "        // not a comment\n"
+            "\n"
+            "        <li>${ {name: 'x'}.name }</li>  \n"
+            "    </ul>`;\n"
+            "const nested = `a${ `b ${1}` }c`;"
+        ))
+
+    def test_strings_regexes_and_comments_are_left_alone(self):
+        source = (
+            "  const url = 'http://example.com';\n"
+            "  const joined = \"a \\\n  // b\";\n"
+            "  const quote = /[`'\"]/g, half = total / 2 / 1;\n"
+            "  /* Keep\n     this */\n"
+        )
+        self.assertEqual(minify_js(source), (
+            "const url = 'http://example.com';\n"
+            "const joined = \"a \\\n  // b\";\n"
+            "const quote = /[`'\"]/g, half = total / 2 / 1;\n"
+            "/* Keep\n     this */"
+        ))
+
+    def test_unbalanced_source_is_unchanged(self):
+        source = "  const html = `<p>\n    ${ value\n"
+        self.assertEqual(minify_js(source), source)
+
+
+@plain_static_files
+class IsbnTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+
+    def test_canonical_forms(self):
+        self.assertEqual(canonical_isbn("0-306-40615-2"), "9780306406157")
+        self.assertEqual(canonical_isbn("978 0 306 40615 7"), "9780306406157")
+        self.assertIsNone(canonical_isbn("978-0-306-40615-8"))
+        self.assertEqual(book_by_isbn("0306406152"), self.books[1])
+
+    def test_same_isbn_written_differently_is_rejected(self):
+        book = Book(title="Copy", publication_date=date(2021, 1, 1), isbn="0-306-40615-2",
+                    publisher=self.publishers[0])
+        with self.assertRaises(ValidationError) as caught:
+            book.full_clean()
+        self.assertIn("isbn", caught.exception.message_dict)
+
+    def test_checksum_is_checked_on_new_and_changed_isbns_only(self):
+        Book.objects.filter(pk=self.books[0].pk).update(isbn="9780000000005", isbn13=None)
+        book = Book.objects.get(pk=self.books[0].pk)
+        book.title = "Renamed"
+        book.full_clean()  # Stored before validation: still editable
+        book.isbn = "9780000000006"
+        with self.assertRaises(ValidationError):
+            book.full_clean()
+        book.isbn = "978-0-14-044913-6"
+        book.full_clean()
+
+    def test_admin_saves_a_legacy_isbn(self):
+        Book.objects.filter(pk=self.books[0].pk).update(isbn="9780000000005", isbn13=None)
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        response = self.client.post(reverse("bookrevadmin:reviews_book_change", args=[self.books[0].pk]), {
+            "title": "Renamed", "publication_date": "2020-01-01", "isbn": "9780000000005",
+            "publisher": self.publishers[0].pk,
+            "book_contributors-TOTAL_FORMS": "0", "book_contributors-INITIAL_FORMS": "0",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).title, "Renamed")
+
+    def test_sample_exports_load_with_canonical_isbns(self):
+        commands = os.path.dirname(import_organised_data.__file__)
+        out = run_quietly("loadcsv", csv=os.path.join(commands, "ALL_MODELS_SECTIONAL_EXPORT_20251013_195851.csv"),
+                          diff=True)
+        self.assertIn("Book: 0 unchanged, 10 inserted, 0 updated, 0 skipped", out)
+        samples = Book.objects.exclude(pk__in=[book.pk for book in self.books])
+        for book in samples:
+            self.assertEqual(book.isbn13, book.isbn)
+            book.full_clean()
+
+        with open(os.path.join(commands, "book_export_20251013_195353.csv"), encoding="utf-8", newline="") as export:
+            isbns = {row["book_isbn"] for row in csv.DictReader(export)}
+        self.assertEqual(isbns, {book.isbn13 for book in samples})
+
+    def test_migration_backfills_duplicates(self):
+        backfill = import_module("reviews.migrations.0017_book_isbn13_duplicates").backfill_duplicates
+        duplicate = Book.objects.create(title="Copy", publication_date=date(2021, 1, 1),
+                                        isbn="0-306-40615-2", publisher=self.publishers[0])
+        Book.objects.filter(pk=duplicate.pk).update(isbn13=None)
+        backfill(django_apps, None)
+        self.assertEqual(Book.objects.filter(isbn13="9780306406157").count(), 2)
+        self.assertEqual(book_by_isbn("978-0-306-40615-7"), self.books[1])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        make_catalogue(self)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, **options):
+        return run_quietly("import_organised_data", workers=1, output_dir=self.directory, **options)
+
+    def test_sharded_export_with_manifest_and_merge(self):
+        self.export(shard_size=2, merge_shards=True)
+        with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(manifest["rows"], {
+            "Publisher": 2, "Book": 4, "Contributor": 1, "BookContributor": 4, "Review": 10,
+        })
+        self.assertEqual([shard["section"] for shard in manifest["shards"]].count("Book"), 2)
+
+        merged = os.path.join(self.directory, manifest["merged"])
+        with open(merged, encoding="utf-8") as merged_file:
+            text = merged_file.read()
+        self.assertEqual(text.count("content:Book\n"), 1)
+        self.assertTrue(validate_file(merged)["valid"])
+
+        with open(merged, encoding="utf-8", newline="") as merged_file:
+            rows = list(csv.reader(merged_file))
+        header = next(row for row in rows if row and row[0] == "review_id")
+        review = rows[rows.index(header) + 1]
+        # DateTimeFields in ISO 8601, dates as YYYY/MM/DD
+        date_created = datetime.fromisoformat(review[header.index("review_date_created")])
+        self.assertIsNotNone(date_created.tzinfo)
+        self.assertIn("2020/01/01", text)
+
+    def test_shards_hold_equal_row_counts_with_sparse_pks(self):
+        for pk in (10_000, 10_001, 10_002, 500_000, 500_001):
+            Publisher.objects.create(pk=pk, name=f"Publisher {pk}", website="https://example.com",
+                                     email="info@example.com")
+        self.export(shard_size=2)
+        with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as manifest_file:
+            shards = [shard for shard in json.load(manifest_file)["shards"] if shard["section"] == "Publisher"]
+        self.assertEqual([shard["rows"] for shard in shards], [2, 2, 2, 1])
+        self.assertEqual((shards[-1]["pk_min"], shards[-1]["pk_max"]), (500_001, 500_001))
+
+    def test_timestamps_round_trip_into_loadcsv(self):
+        self.export(shard_size=100, merge_shards=True)
+        with open(os.path.join(self.directory, "merged.csv"), encoding="utf-8", newline="") as merged_file:
+            rows = list(csv.reader(merged_file))
+        header = next(row for row in rows if row and row[0] == "review_id")
+        start = rows.index(header) + 1
+        reviews = [dict(zip(header, row)) for row in rows[start:start + Review.objects.count()]]
+        for row in reviews:
+            stored = Review.objects.get(pk=row["review_id"])
+            self.assertEqual(parse_timestamp(row["review_date_created"]), stored.date_created)
+            self.assertEqual(parse_timestamp(row["review_date_edited"]), stored.date_edited)
+
+        # The default import path reads the exported values
+        exported = reviews[0]
+        Review.objects.all().delete()
+        path = os.path.join(self.directory, "reviews.csv")
+        with open(path, "w", encoding="utf-8", newline="") as review_file:
+            writer = csv.writer(review_file)
+            writer.writerows([
+                ["content:Review"],
+                ["review_book", "review_content", "review_creator", "review_rating",
+                 "review_date_created", "review_date_edited"],
+                ["Book 0", "Again", "reader0@example.com", "4",
+                 exported["review_date_created"], exported["review_date_edited"]],
+            ])
+        self.assertNotIn("Error", run_quietly("loadcsv", csv=path))
+        self.assertEqual(Review.objects.get().rating, 4)
+
+    def test_incremental_export_advances_the_high_water_mark(self):
+        self.export(shard_size=100, incremental=True)
+        mark = RollupState.objects.get(name=EXPORT_STATE_NAME).high_water_mark
+
+        book = Book.objects.get(pk=self.books[0].pk)
+        book.title = "Renamed"
+        book.save()
+        self.books[1].delete()
+        self.export(shard_size=100, incremental=True)
+        with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as manifest_file:
+            rows = json.load(manifest_file)["rows"]
+        self.assertEqual((rows["Book"], rows["Deleted"]), (1, 1 + 1 + 2))  # Book, link, reviews
+        self.assertGreater(RollupState.objects.get(name=EXPORT_STATE_NAME).high_water_mark, mark)
+
+    def test_failed_export_raises_and_keeps_the_high_water_mark(self):
+        mark = timezone.now() - timedelta(days=1)
+        RollupState.objects.create(name=EXPORT_STATE_NAME, high_water_mark=mark)
+        commands = os.path.dirname(import_organised_data.__file__)
+        before = set(os.listdir(commands))
+        with mock.patch.object(import_organised_data.Command, "_write_model_section",
+                               side_effect=OSError("No space left on device")):
+            with self.assertRaisesMessage(CommandError, "No space left on device"):
+                run_quietly("import_organised_data", incremental=True)
+        self.assertEqual(RollupState.objects.get(name=EXPORT_STATE_NAME).high_water_mark, mark)
+        self.assertEqual(set(os.listdir(commands)), before)
@@ -1,7 +1,7 @@
 from django.urls import path
 
 # from django.contrib import admin
-from . import views
+from . import api, async_views, views
 
 # from .admin import admin_site
 # change back to above if it does not work
@@ -22,4 +22,15 @@ urlpatterns = [
     path("search-result/", views.search_result, name="search_result"),
     path("book-search/", views.book_search, name="book_search"),
     path("books/<int:pk>/", views.book_detail, name="book_detail"),
+    path("books/top/", views.top_books, name="top_books"),
+    # Async versions of the read-heavy pages, for use under mysite.asgi
+    path("async/books/", async_views.book_list, name="async_book_list"),
+    path("async/books/<int:pk>/", async_views.book_detail, name="async_book_detail"),
+    path("async/search-result/", async_views.search_result, name="async_search_result"),
+    path("async/books/autocomplete/", async_views.book_autocomplete, name="async_book_autocomplete"),
+    # Read-only JSON API
+    path("api/books/", api.book_list, name="api_book_list"),
+    path("api/books/<int:pk>/reviews/", api.book_reviews, name="api_book_reviews"),
+    path("api/search/", api.book_search, name="api_book_search"),
+    path("api/changes/", api.changes, name="api_changes"),
 ]
@@ -2,3 +2,36 @@ def average_rating(rating_list):
     if not rating_list:
         return 0
     return round(sum(rating_list) / len(rating_list))
+
+
+def rating_stats(histogram):
+    """
+    Summary statistics from a {stars: number of reviews} histogram.
+
+    Returns None without reviews, otherwise the review count, the exact mean,
+    the median and a 95% confidence interval for the mean (normal
+    approximation, clamped to the 1-5 scale).
+    """
+    count = sum(histogram.values())
+    if not count:
+        return None
+    mean = sum(stars * n for stars, n in histogram.items()) / count
+    variance = (
+        sum(n * (stars - mean) ** 2 for stars, n in histogram.items()) / (count - 1)
+        if count > 1 else 0.0
+    )
+    margin = 1.96 * (variance / count) ** 0.5
+
+    # The middle one or two ratings, walking the histogram in star order
+    middle = {(count - 1) // 2, count // 2}
+    seen, median_values = 0, []
+    for stars in sorted(histogram):
+        n = histogram[stars]
+        median_values += [stars for position in middle if seen <= position < seen + n]
+        seen += n
+    return {
+        "count": count,
+        "mean": mean,
+        "median": sum(median_values) / len(median_values),
+        "ci95": (max(1.0, mean - margin), min(5.0, mean + margin)),
+    }
@@ -1,11 +1,20 @@
 # views.py
 from django.urls import reverse # Import reverse at the top of your views.py
-from django.db.models import Q # Needed for combining filters with OR logic
 from django.shortcuts import get_object_or_404, render, redirect
 from reviews.forms.forms import SearchForm, NewsletterForm, OrderForm, PublisherForm
 from django.contrib import messages
-from .models import Book, Review, Publisher
-from .utils import average_rating
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.views.decorators.http import condition
+from . import conditional, leaderboards
+from .recommendations import similar_books
+from .models import Book, LeaderboardEntry, Review, Publisher
+from .page_cache import cache_page_tagged
+from .search import search_books
+
+# Rows fetched and rendered per chunk by the streaming book list
+STREAM_CHUNK_SIZE = 200
+BOOK_CARDS_MARKER = "<!-- book-cards -->"
 
 
 def home(request):
@@ -115,34 +124,7 @@ def search_result(request):
 
         if query and search_fields:
             search_term = query
-
-            # Build dynamic Q object for all search conditions
-            q_objects = Q()
-
-            for field_name in search_fields:
-                if field_name == 'title':
-                    q_objects = q_objects | Q(title__icontains=query)
-
-                elif field_name == 'isbn':
-                    q_objects |= Q(isbn__icontains=query)
-
-                elif field_name == 'publisher':
-                    q_objects |= Q(publisher__name__icontains=query)
-
-                elif field_name == 'contributor':
-                    q_objects |= (
-                        Q(contributors__first_names__icontains=query) |
-                        Q(contributors__last_names__icontains=query)
-                    )
-
-            # Single optimized query with all joins
-            books_list = (
-                Book.objects
-                .filter(q_objects)
-                .select_related('publisher')  # Join publisher table
-                .prefetch_related('contributors')  # Efficiently load contributors
-                .distinct()  # Remove duplicates from many-to-many
-            )
+            books_list = search_books(query, search_fields)
         else:
             search_term = "Please enter a search term and select search criteria"
 
@@ -154,55 +136,133 @@ def search_result(request):
     }
     return render(request, "reviews/book-search_form.html", context)
 
-def book_list(request):
-    """View to list all books in the database with their details"""
-    books = Book.objects.all()
-    title = "List of all books"
-    count = len(books)
-    book_list = []
-    for book in books:
-        reviews = Review.objects.filter(book=book)
-        # reviews = book.reviews.all()  # type: ignore[attr-defined]
+def _book_list_keys(request):
+    return ["list:books"]
 
-        # The expression reviews = book.review_set.all() works because of Django's automatic reverse relationship lookup for ForeignKey fields.
 
-        # Since your Review model has a ForeignKey pointing to the Book model, Django automatically gives the Book object a property to access all related Review objects.
-        # This establishes a one-to-many relationship: one Book can have many Review objects. The Review model is on the "many" side and holds the foreign key.
+def _book_detail_keys(request, pk):
+    # The detail page also shows the publisher's name; build_recommendations
+    # purges "book:<pk>" when the book's neighbours change
+    publisher_id = Book.objects.filter(pk=pk).values_list("publisher_id", flat=True).first()
+    return [f"book:{pk}", f"publisher:{publisher_id}"]
 
-        # 2. Django Creates the Reverse Manager
 
-        # Because the Review model has a ForeignKey pointing to Book, Django automatically creates a reverse relationship manager on the Book model instances.
+@cache_page_tagged(_book_list_keys)
+@condition(etag_func=conditional.book_list_etag, last_modified_func=conditional.book_list_last_modified)
+def book_list(request):
+    """
+    View to list all books in the database with their details.
 
-        #   By default, this manager is named using the lowercase name of the related model (Review) followed by _set.
+    With ?stream=1 the page is streamed instead (see _stream_book_list).
+    """
+    title = "List of all books"
+    # One query for every book with its rating and number of reviews
+    books = Book.objects.select_related("publisher").with_ratings()
 
-        #   Therefore, an instance of the Book model (book) gains a property called review_set.
+    if request.GET.get("stream"):
+        return _stream_book_list(request, books, title)
 
-        # If you wanted to rename this manager for clarity (e.g., to avoid the default _set name), you could define a related_name on the ForeignKey field in the Review model:
-
-        if reviews:
-            book_rating = average_rating([review.rating for review in reviews])
-            number_of_reviews = len(reviews)
-        else:
-            book_rating = None
-            number_of_reviews = 0
-        book_list.append(
-            {
-                "book": book,
-                "book_pub": book.publisher,
-                "book_pub_date": book.publication_date,
-                "book_rating": book_rating,
-                "number_of_reviews": number_of_reviews,
-            }
-        )
-    context = {"book_list": book_list, "title": title, "count": count}
+    book_list = list(_book_list_rows(books))
+    context = {"book_list": book_list, "title": title, "count": len(book_list)}
 
     # Render the HTML template, passing the context
     return render(request, "reviews/books.html", context)
 
 
+def _book_list_rows(books):
+    """Turn annotated books into the items book-cards.html renders."""
+    for book in books:
+        yield {
+            "book": book,
+            "book_pub": book.publisher,
+            "book_pub_date": book.publication_date,
+            # Same rounding as utils.average_rating
+            "book_rating": round(book.avg_rating) if book.review_count else None,
+            "number_of_reviews": book.review_count,
+        }
+
+
+def _stream_book_list(request, books, title):
+    """
+    Stream books.html: the page shell first, then the cards in chunks as the
+    rows arrive from the database, so time to first byte and memory use don't
+    grow with the size of the catalogue.
+    """
+    count = Book.objects.count()
+    # books-stream.html renders books.html with a marker instead of the cards
+    page = render_to_string(
+        "reviews/books-stream.html",
+        {"title": title, "count": count, "book_list": count > 0},
+        request,
+    )
+    head, marker, tail = page.partition(BOOK_CARDS_MARKER)
+    cards = get_template("reviews/book-cards.html")
+
+    def chunks():
+        yield head
+        if not marker:
+            return  # Empty inventory page, nothing to fill in
+        rows = []
+        for row in _book_list_rows(books.iterator(chunk_size=STREAM_CHUNK_SIZE)):
+            rows.append(row)
+            if len(rows) == STREAM_CHUNK_SIZE:
+                yield cards.render({"book_list": rows}, request)
+                rows = []
+        if rows:
+            yield cards.render({"book_list": rows}, request)
+        yield tail
+
+    return StreamingHttpResponse(chunks(), content_type="text/html; charset=utf-8")
+
+
+def _top_books_keys(request):
+    # Rebuilds purge "leaderboards"; the cards also show live ratings
+    return ["leaderboards", "list:books"]
+
+
+@cache_page_tagged(_top_books_keys)
+def top_books(request):
+    """
+    Precomputed leaderboards (see reviews.leaderboards).
+
+    ?board=top|trending, narrowed with ?publisher=<id> or ?year=<year>
+    (top rated only).
+    """
+    board = request.GET.get("board", LeaderboardEntry.Board.TOP)
+    if board not in LeaderboardEntry.Board.values:
+        board = LeaderboardEntry.Board.TOP
+    scope = leaderboards.ALL
+    if request.GET.get("publisher", "").isdigit():
+        scope = leaderboards.publisher_scope(request.GET["publisher"])
+    elif request.GET.get("year", "").isdigit():
+        scope = leaderboards.year_scope(request.GET["year"])
+
+    book_list = []
+    for entry in leaderboards.leaderboard(board, scope):
+        book = entry.book
+        stats = book.rating_stats()
+        book_list.append({
+            "book": book,
+            "book_pub": book.publisher,
+            "book_pub_date": book.publication_date,
+            "book_rating": round(stats["mean"]) if stats else None,
+            "number_of_reviews": stats["count"] if stats else 0,
+        })
+    context = {
+        "book_list": book_list,
+        "board": board,
+        "boards": LeaderboardEntry.Board.choices,
+        "title": LeaderboardEntry.Board(board).label,
+        "date_computed": entry.date_computed if book_list else None,
+    }
+    return render(request, "reviews/books-top.html", context)
+
+
+@cache_page_tagged(_book_detail_keys)
+@condition(etag_func=conditional.book_detail_etag, last_modified_func=conditional.book_detail_last_modified)
 def book_detail(request, pk):
     """view to display the review detail of a book"""
-    book = get_object_or_404(Book, pk=pk)
+    book = get_object_or_404(Book.objects.with_ratings(), pk=pk)
     title = f"Details of {book.title}"
 
     reviews = Review.objects.filter(book=book)
@@ -210,15 +270,23 @@ def book_detail(request, pk):
     # reviews = book.reviews.all()  # type: ignore[attr-defined]
 
     if reviews:
-        book_rating = average_rating([review.rating for review in reviews])
+        # Same rounding as utils.average_rating. avg_rating comes from the
+        # star counters, which are empty after a raw import until
+        # `manage.py rebuild_ratings` has run
+        book_rating = round(book.avg_rating) if book.avg_rating is not None else None
         context = {
             "book": book,
             "title": title,
             "book_rating": book_rating,
+            # From the stored star counters, no pass over the reviews
+            "rating_stats": book.rating_stats(),
+            "rating_histogram": sorted(book.rating_histogram.items(), reverse=True),
             "reviews": reviews,
         }
     else:
         context = {"book": book, "book_rating": None, "reviews": None, "title": title}
+    # Precomputed by build_recommendations: one indexed read
+    context["similar_books"] = similar_books(book.pk)
     return render(request, "reviews/book-detail.html", context)
 
 